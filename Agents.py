@@ -3,11 +3,14 @@
 from abc import ABC, abstractmethod
 
 from Globals_ import *
+import Globals_
 
 
 
 
 class Agent(ABC):
+    # the fields whose changes are written to message traces (see Trace)
+    trace_fields = ("variable", "anytime_variable", "local_clock")
 
     def __init__(self,id_,D):
         self.global_clock = 0
@@ -19,28 +22,33 @@ class Agent(ABC):
         self.domain = []
         for i in range(D): self.domain.append(i)
         self.neighbors_obj = None
+        self.neighbors_obj_dict = {}
         self.neighbors_agents_id = []
         self.inbox = None
         self.outbox = None
         self.local_clock = 0
+        self.atomic_operations = 0  # constraint checks, counted for the NCLO metric of asynchronous runs
         self.records = []
         self.records_dict = {}
         self.unary_constraint = {}
 
-    def create_unary_costs(self,dcop_id):
+    def get_preferred_time_slot(self,dcop_id):
         rnd_pref_time = random.Random((self.id_+23)*17+dcop_id*97)
         for _ in range(5): rnd_pref_time.randint(1,5)
-        pref_domain = rnd_pref_time.choice(self.domain)
+        return rnd_pref_time.choice(self.domain)
+
+    def create_unary_costs(self,dcop_id):
+        pref_domain = self.get_preferred_time_slot(dcop_id)
         self.unary_constraint = {}
         for d in self.domain:
             self.unary_constraint[d] =10*abs(d-pref_domain)
 
 
-    def set_neighbors(self,neighbors):
-        self.neighbors_obj = neighbors
-        for n in neighbors:
-            a_other = n.get_other_agent(self)
-            self.neighbors_agents_id.append(a_other)
+    def set_neighbors(self,neighbors_dict):
+        """neighbors_dict maps each neighbor id to the Neighbors object of the shared edge."""
+        self.neighbors_obj_dict = neighbors_dict
+        self.neighbors_obj = list(neighbors_dict.values())
+        self.neighbors_agents_id = list(neighbors_dict.keys())
 
     def get_neighbors_tuples(self):
         ans = []
@@ -54,6 +62,7 @@ class Agent(ABC):
         for n_id, current_value in current_context.items():
             neighbor_obj = self.get_n_obj(n_id)
             local_cost = local_cost + neighbor_obj.get_cost(self.id_, self.variable, n_id, current_value)
+        self.atomic_operations = self.atomic_operations + len(current_context)
         return local_cost
 
     def get_general_info_for_records(self):
@@ -61,17 +70,15 @@ class Agent(ABC):
 
 
     def get_n_obj(self, n_id):
-        for ans in self.neighbors_obj:
-            if ans.is_agent_in_obj(agent_id_input=n_id):
-                return ans
-        if ans is None:
-            raise Exception("n_id is not correct")
+        """Returns the Neighbors object shared with n_id, or None if n_id is not a neighbor."""
+        return self.neighbors_obj_dict.get(n_id)
 
     def calc_potential_cost(self, potential_domain, current_context):
         local_cost = 0
         for n_id, current_value in current_context.items():
             neighbor_obj = self.get_n_obj(n_id)
             local_cost = local_cost + neighbor_obj.get_cost(self.id_, potential_domain, n_id, current_value)
+        self.atomic_operations = self.atomic_operations + len(current_context)
         return local_cost
 
 
@@ -125,6 +132,7 @@ class Agent(ABC):
                 second_tuple = (n_id,n_value)
                 k, v = neighbor.get_constraint(first_tuple,second_tuple)
                 ans[k] =v
+        self.atomic_operations = self.atomic_operations + len(ans)
         return ans
 
 
@@ -141,15 +149,12 @@ class CompleteAlgorithm(Completeness,ABC):
 
 class IncompleteAlgorithm(Completeness,ABC):
     def is_algorithm_complete(self):
-        if self.local_clock == incomplete_iterations:
+        if self.local_clock == Globals_.incomplete_iterations:
             return True
         else:
             return False
 
 
 
-class DSA_C(IncompleteAlgorithm):
-    pass
-
 class MGM(IncompleteAlgorithm):
     pass
\ No newline at end of file
@@ -58,6 +58,8 @@ class GlobalUBPruneException(Exception):
 
 
 class BranchAndBoundToken:
+    __slots__ = ("best_UB", "UB", "LB", "heights")
+
     def __init__(self,heights = None, best_UB:SingleInformation = None, UB:SingleInformation = None, LB:SingleInformation = None):
         self.best_UB= best_UB
         self.UB = UB
@@ -130,6 +132,8 @@ class BranchAndBoundToken:
 
 
 class BranchAndBound(DFS,CompleteAlgorithm):
+    trace_fields = DFS.trace_fields + ("domain_index", "my_height", "best_global_UB")
+
     def __init__(self, id_, D):
         DFS.__init__(self, id_, D)
         self.domain_index = -1
@@ -399,7 +403,7 @@ class BranchAndBound(DFS,CompleteAlgorithm):
         return ans
     # select_next_value #################################################################################################
     def get_lb_to_update(self,variable_input):
-        current_context = self.token.get_lb_copy().context
+        current_context = self.token.LB.context
         constraints = self.get_constraints(current_context = current_context,my_current_value=variable_input)
         token_lb = self.token.get_lb_copy()
         token_lb.update_constraints(self.id_, constraints)
@@ -438,17 +442,15 @@ class BranchAndBound(DFS,CompleteAlgorithm):
 
 
 
-    def get_n_obj(self,n_id):
-        for n in self.neighbors_obj:
-            if n.is_ids_this_object(self.id_,n_id):
-                return n
     # send msgs #################################################################################################
 
     def send_msgs_finished_algorithm(self):
         sender = self.id_
         msgs = []
+        # the children copy the token they receive, so a single copy is shared by all of them
+        token = self.token.__deepcopy__()
         for receiver in self.dfs_children:
-            msg = Msg(sender=sender, receiver=receiver, information=self.token.__deepcopy__(),
+            msg = Msg(sender=sender, receiver=receiver, information=token,
                       msg_type=BNB_msg_type.finish_algorithm)
 
             msgs.append(msg)
@@ -460,8 +462,8 @@ class BranchAndBound(DFS,CompleteAlgorithm):
     def sends_msgs_token_down_the_tree(self):
         sender = self.id_
         msgs = []
+        temp_token = self.token.__deepcopy__()
         for receiver in self.dfs_children:
-            temp_token = self.token.__deepcopy__()
             msg = Msg(sender=sender, receiver=receiver, information=temp_token,
                       msg_type=BNB_msg_type.token_from_father)
             msgs.append(msg)
@@ -0,0 +1,223 @@
+"""
+Asynchronous simulation of a DCOP run on asyncio: every agent is a coroutine and every message is delivered after a
+delay drawn from a seeded delay model. The agents keep the synchronous semantics of the algorithms through a
+synchronizer: after each of its iterations an agent sends every neighbor an envelope with the messages of that
+iteration (possibly none), and it starts its next iteration once the envelopes of all its neighbors arrived. The
+assignments are therefore those of DCOP.execute, while the simulated time and the NCLOs (non-concurrent logic
+operations, counted in constraint checks) measure the run under latency.
+"""
+import asyncio
+import math
+from abc import ABC, abstractmethod
+
+from Globals_ import get_cost_key, splitmix64
+
+
+class DelayModel(ABC):
+    """Gives the delay of the envelope sent from sender to receiver after the sender's iteration tick."""
+
+    @abstractmethod
+    def get_delay(self, sender, receiver, tick): pass
+
+
+class RandomDelayModel(DelayModel, ABC):
+    """Delay models whose draws depend only on the seed and on (sender, receiver, tick), so they do not depend on
+    the order in which the event loop runs the agents."""
+
+    def __init__(self, seed):
+        self.seed = seed
+
+    def get_uniform(self, sender, receiver, tick):
+        return splitmix64(get_cost_key(self.seed, sender, receiver) ^ tick) / 2.0 ** 64
+
+
+class ConstantDelay(DelayModel):
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get_delay(self, sender, receiver, tick):
+        return self.delay
+
+
+class UniformDelay(RandomDelayModel):
+
+    def __init__(self, low, high, seed=0):
+        RandomDelayModel.__init__(self, seed)
+        self.low = low
+        self.high = high
+
+    def get_delay(self, sender, receiver, tick):
+        return self.low + (self.high - self.low) * self.get_uniform(sender, receiver, tick)
+
+
+class ExponentialDelay(RandomDelayModel):
+    """Exponential delays with the given mean on top of a fixed minimal delay."""
+
+    def __init__(self, mean, min_delay=0.0, seed=0):
+        RandomDelayModel.__init__(self, seed)
+        self.mean = mean
+        self.min_delay = min_delay
+
+    def get_delay(self, sender, receiver, tick):
+        u = self.get_uniform(sender, receiver, tick)
+        return self.min_delay - self.mean * math.log1p(-u)
+
+
+class Envelope():
+    __slots__ = ("tick", "sender", "msgs", "arrival_time", "nclo")
+
+    def __init__(self, tick, sender, msgs, arrival_time, nclo):
+        self.tick = tick
+        self.sender = sender
+        self.msgs = msgs
+        self.arrival_time = arrival_time
+        self.nclo = nclo
+
+
+class AsyncOutbox():
+    """Outbox of an agent in an asynchronous run, it keeps the messages of the current iteration."""
+
+    def __init__(self):
+        self.sent = []
+
+    def insert(self, list_of_msgs):
+        self.sent.extend(list_of_msgs)
+
+
+class AsyncRunner():
+    """
+    Runs a DCOP as one coroutine per agent (see the module docstring). operation_time is the simulated time of a
+    constraint check. The run stops like DCOP.execute, when all agents are complete or an iteration sent no messages;
+    the decision is taken by an omniscient coordinator and costs no simulated time. The amount of messages delivered at
+    every tick is appended to dcop.mailer.msgs_per_tick, and the agents send through the mailer again after the run.
+    The best assignment of anytime algorithms is tracked after every tick, as in DCOP.execute.
+    """
+
+    def __init__(self, dcop, delay_model, operation_time=0.0):
+        self.dcop = dcop
+        self.delay_model = delay_model
+        self.operation_time = operation_time
+        self.agents_position = {a.id_: i for i, a in enumerate(dcop.agents)}
+
+    def execute(self):
+        return asyncio.run(self.run())
+
+    async def run(self):
+        dcop = self.dcop
+        self.envelopes = {a.id_: asyncio.Queue() for a in dcop.agents}
+        self.verdicts = {}
+        self.ticks_reports = {}
+        self.finish_times = {}
+        self.nclos = {}
+        self.amount_of_msgs = 0
+        self.last_tick = None
+        self.anytime = dcop.create_anytime_tracker()
+        for a in dcop.agents:
+            a.outbox = AsyncOutbox()
+        try:
+            await asyncio.gather(*[self.run_agent(a) for a in dcop.agents])
+        finally:
+            # the agents send through the mailer again, so the dcop can be executed after the simulation
+            for a in dcop.agents:
+                a.outbox = dcop.mailer
+
+        last_tick = self.last_tick
+        finish_times = self.finish_times[last_tick]
+        dcop.global_clock = last_tick if self.stopped_complete else last_tick + 1
+        for a in dcop.agents:
+            a.global_clock = last_tick
+        if self.anytime is not None:
+            self.anytime.write_back()
+            dcop.anytime = self.anytime
+        dcop.async_metrics = {"global_clock": dcop.global_clock,
+                              "simulated_time": max(finish_times) if len(finish_times) != 0 else 0.0,
+                              "nclos": max(self.nclos[last_tick]) if len(self.nclos[last_tick]) != 0 else 0,
+                              "msgs": self.amount_of_msgs}
+        if not self.stopped_complete:
+            print("DCOP:",str(dcop.dcop_id),"global clock:",str(dcop.global_clock), "is over because there are no messages in system ")
+        return dcop.async_metrics
+
+    def get_verdict(self, tick):
+        if tick not in self.verdicts:
+            self.verdicts[tick] = asyncio.get_running_loop().create_future()
+        return self.verdicts[tick]
+
+    async def run_agent(self, a):
+        a.initialize()
+        finish_time = a.atomic_operations * self.operation_time
+        nclo = a.atomic_operations
+        self.send_envelopes(a, 0, finish_time, nclo)
+
+        received = {}
+        tick = 0
+        while True:
+            if not await self.get_verdict(tick):
+                return
+            tick = tick + 1
+            tick_envelopes = received.pop(tick - 1, [])
+            while len(tick_envelopes) < len(a.neighbors_agents_id):
+                envelope = await self.envelopes[a.id_].get()
+                if envelope.tick == tick - 1:
+                    tick_envelopes.append(envelope)
+                else:
+                    received.setdefault(envelope.tick, []).append(envelope)
+
+            tick_envelopes.sort(key=lambda e: self.agents_position[e.sender])
+            msgs = []
+            for envelope in tick_envelopes:
+                msgs.extend(envelope.msgs)
+                finish_time = max(finish_time, envelope.arrival_time)
+                nclo = max(nclo, envelope.nclo)
+            if len(msgs) != 0:
+                a.inbox.insert(msgs)
+                a.inbox.swap()
+            operations_before = a.atomic_operations
+            a.execute_iteration(tick)
+            operations = a.atomic_operations - operations_before
+            finish_time = finish_time + operations * self.operation_time
+            nclo = nclo + operations
+            self.send_envelopes(a, tick, finish_time, nclo)
+            # let the other agents run between iterations
+            await asyncio.sleep(0)
+
+    def send_envelopes(self, a, tick, finish_time, nclo):
+        msgs_by_receiver = {n_id: [] for n_id in a.neighbors_agents_id}
+        for msg in a.outbox.sent:
+            if msg.receiver not in msgs_by_receiver:
+                raise Exception("A_" + str(a.id_) + " sent a message to A_" + str(msg.receiver) + " which is not its neighbor")
+            msgs_by_receiver[msg.receiver].append(msg)
+        amount_of_msgs = len(a.outbox.sent)
+        a.outbox.sent = []
+        for receiver, msgs in msgs_by_receiver.items():
+            arrival_time = finish_time + self.delay_model.get_delay(a.id_, receiver, tick)
+            self.envelopes[receiver].put_nowait(Envelope(tick, a.id_, msgs, arrival_time, nclo))
+        self.report(a, tick, finish_time, nclo, amount_of_msgs)
+
+    def report(self, a, tick, finish_time, nclo, amount_of_msgs):
+        """Collects the iteration reports of the agents and decides whether the next iteration runs once all of them
+        finished the iteration."""
+        if tick not in self.ticks_reports:
+            self.ticks_reports[tick] = [0, 0, 0]
+            self.finish_times[tick] = []
+            self.nclos[tick] = []
+        reports = self.ticks_reports[tick]
+        reports[0] = reports[0] + 1
+        if not a.is_algorithm_complete():
+            reports[1] = reports[1] + 1
+        reports[2] = reports[2] + amount_of_msgs
+        self.amount_of_msgs = self.amount_of_msgs + amount_of_msgs
+        self.finish_times[tick].append(finish_time)
+        self.nclos[tick].append(nclo)
+        if reports[0] == len(self.dcop.agents):
+            # no agent runs the next iteration before the verdict, so the assignments are those of the tick
+            if self.anytime is not None:
+                self.anytime.update(tick)
+            self.stopped_complete = reports[1] == 0
+            proceed = reports[1] != 0 and reports[2] != 0
+            if proceed:
+                # the messages of the iteration are delivered at the next tick, counted as DCOP.execute does
+                self.dcop.mailer.msgs_per_tick.append(reports[2])
+            else:
+                self.last_tick = tick
+            self.get_verdict(tick).set_result(proceed)
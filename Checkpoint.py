@@ -0,0 +1,94 @@
+"""
+Checkpoints of DCOP.execute. A checkpoint taken after a tick holds the state of every agent (status, tokens, records,
+dfs tree, random generators...), the messages waiting in the mailer, the clocks, the state of the random module and the
+best assignment of anytime runs.
+The DCOP itself is not stored: it is created again from the parameters in the header, and the objects of its
+structure (agents, neighbors, cost tables) are pickled as references into it.
+
+File format: the magic bytes, a pickled header dict (with the format version) and the pickled state.
+"""
+import hashlib
+import importlib
+import io
+import os
+import pickle
+import random
+
+from ShardedExecution import RefPickler, RefUnpickler, get_structure_registry
+from VectorizedDSA import AnytimeTracker
+
+checkpoint_magic = b"DCOPCKPT"
+checkpoint_version = 1
+not_saved = ("inbox", "outbox")
+
+
+def get_structure_digest(dcop):
+    return hashlib.sha256(dcop.neighbors_indptr.tobytes() + dcop.neighbors_ids.tobytes()).hexdigest()
+
+
+def save_checkpoint(dcop, path, last_iteration_clock):
+    header = {"version": checkpoint_version,
+              "dcop_module": type(dcop).__module__,
+              "dcop_class": type(dcop).__name__,
+              "dcop_id": dcop.dcop_id,
+              "A": dcop.A,
+              "D": dcop.D,
+              "dcop_name": dcop.dcop_name,
+              "algorithm": dcop.algorithm,
+              "structure_digest": get_structure_digest(dcop)}
+    mailer_msgs = []
+    for receiver in dcop.mailer.receivers:
+        mailer_msgs.extend(dcop.mailer.agents_outbox[receiver].pending)
+    state = {"global_clock": dcop.global_clock,
+             "last_iteration_clock": last_iteration_clock,
+             "agents": [{k: v for k, v in vars(a).items() if k not in not_saved} for a in dcop.agents],
+             "mailer_msgs": mailer_msgs,
+             "msgs_in_tick": dcop.mailer.msgs_in_tick,
+             "msgs_per_tick": dcop.mailer.msgs_per_tick,
+             "random_state": random.getstate(),
+             "anytime": dcop.anytime.get_state() if dcop.anytime is not None else None}
+
+    registry = get_structure_registry(dcop)
+    file = io.BytesIO()
+    file.write(checkpoint_magic)
+    pickle.dump(header, file, pickle.HIGHEST_PROTOCOL)
+    RefPickler(file, {id(obj): i for i, obj in enumerate(registry)}).dump(state)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(file.getvalue())
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path):
+    """Creates the DCOP of the checkpoint and restores the run state into it. Returns the DCOP and the clock of the
+    last iteration that ran.
+    The DCOP is generated again from (dcop_id, A, D, dcop_name, algorithm) and the current Globals_ flags, which is all
+    the header stores, so the runs of DCOPs built from a stored instance (see InstanceStore) and of meeting scheduling
+    with meeting parameters other than the defaults cannot be resumed: their DCOP does not match the structure digest
+    of the checkpoint."""
+    with open(path, "rb") as f:
+        if f.read(len(checkpoint_magic)) != checkpoint_magic:
+            raise Exception(path + " is not a DCOP checkpoint")
+        header = pickle.load(f)
+        if header["version"] != checkpoint_version:
+            raise Exception("checkpoint version " + str(header["version"]) + " is not supported")
+        dcop_class = getattr(importlib.import_module(header["dcop_module"]), header["dcop_class"])
+        dcop = dcop_class(header["dcop_id"], header["A"], header["D"], header["dcop_name"], header["algorithm"])
+        if get_structure_digest(dcop) != header["structure_digest"]:
+            raise Exception("the DCOP created for " + path + " does not match the checkpoint, check the Globals_ flags "
+                            "(runs of stored instances and of meeting scheduling with other meeting parameters cannot "
+                            "be resumed)")
+        state = RefUnpickler(f, get_structure_registry(dcop)).load()
+
+    for a, agent_state in zip(dcop.agents, state["agents"]):
+        for k, v in agent_state.items():
+            setattr(a, k, v)
+    dcop.mailer.insert(state["mailer_msgs"])
+    dcop.mailer.msgs_in_tick = state["msgs_in_tick"]
+    dcop.mailer.msgs_per_tick = state["msgs_per_tick"]
+    dcop.global_clock = state["global_clock"]
+    if state.get("anytime") is not None:
+        dcop.anytime = AnytimeTracker(dcop)
+        dcop.anytime.set_state(state["anytime"])
+    random.setstate(state["random_state"])
+    return dcop, state["last_iteration_clock"]
@@ -0,0 +1,140 @@
+from Agents import Agent, IncompleteAlgorithm
+from enum import Enum
+from Globals_ import Msg, get_cost_key, splitmix64
+import Globals_
+import numpy as np
+import random
+
+
+class DSA_Msg(Enum):
+    assignment = 1  # Message type for sending variable assignments
+
+
+dsa_variants = ("A", "B", "C")
+
+
+def get_activation_draws(activation_keys, iteration):
+    """Uniform draws in [0, 1) of the agents with the given activation keys at an iteration, a python float for a
+    python int key and an array for an uint64 array of keys. A draw depends only on the key and the iteration, so the
+    message passing agents and VectorizedDSA draw the same numbers."""
+    if isinstance(activation_keys, np.ndarray):
+        bits = splitmix64(activation_keys ^ np.uint64(iteration))
+        return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+    return (splitmix64(activation_keys ^ iteration) >> 11) * (1.0 / (1 << 53))
+
+
+class DSA_C(Agent, IncompleteAlgorithm):
+    """
+    Distributed Stochastic Algorithm. Every iteration the agent receives the assignments of all its neighbors, finds
+    the first value with the lowest local cost and sends its assignment, so a round takes a single tick and one message
+    per neighbor. The agent moves with the activation probability when its variant allows it:
+        A: the best value is lower than the cost of the current value
+        B: as A, or another value has the same cost as the current value and the current value still costs something
+        C: as A, or another value has the same cost as the current value
+    On a tie the agent moves to the first other value with the lowest cost. The agent stops after
+    incomplete_iterations iterations.
+    """
+    trace_fields = Agent.trace_fields
+
+    def __init__(self, id_, D, dcop_id, variant=None, activation_probability=None):
+        Agent.__init__(self,id_,D)
+        self.variant = variant if variant is not None else Globals_.dsa_variant
+        if self.variant not in dsa_variants:
+            raise ValueError("unknown DSA variant " + str(self.variant))
+        self.activation_probability = activation_probability if activation_probability is not None \
+            else Globals_.dsa_activation_probability
+        self.neighbors_assignments = {}
+        self.constraints = {}
+        # the same generator as MGM.agent_random, so DSA and MGM start from the same assignment
+        self.agent_random = random.Random((((dcop_id+1)+100)+((self.id_+1)+10))*17)
+        self.variable = self.agent_random.randint(0, D-1)
+        self.activation_key = get_cost_key(dcop_id, self.id_, 0)
+        self.values_costs = np.zeros(D, dtype=np.int64)  # Cost of every value with the neighbors' assignments
+
+    def set_constraints(self):
+        """Stores the (shared, read-only) cost tables of the neighbors and computes the cost of every value again from
+        the known neighbors' assignments (see MGM.set_constraints)."""
+        for neighbor_id, n_obj in self.neighbors_obj_dict.items():
+            self.constraints[neighbor_id] = n_obj.cost_table
+        self.values_costs = np.zeros(len(self.values_costs), dtype=np.int64)
+        for neighbor_id, neighbor_asgmt in self.neighbors_assignments.items():
+            self.values_costs += self.get_values_costs_with(neighbor_id, neighbor_asgmt)
+
+    def get_values_costs_with(self, neighbor_id, neighbor_asgmt):
+        constraint = self.constraints[neighbor_id]
+        if self.id_ < neighbor_id:
+            return constraint[:, neighbor_asgmt]
+        return constraint[neighbor_asgmt, :]
+
+    def initialize(self):
+        """Sets up constraints and sends initial variable assignments to neighbors."""
+        self.set_constraints()
+        self.send_msgs()
+
+    def send_msgs(self):
+        """Sends the agent's current variable assignment to all neighbors."""
+        msgs = []
+        for n_id in self.neighbors_agents_id:
+            msgs.append(Msg(sender=self.id_, receiver=n_id, information=self.variable, msg_type=DSA_Msg.assignment))
+        self.outbox.insert(msgs)
+
+    def update_msgs_in_context(self, msgs):
+        """Updates the cost of every value by the previous and new assignments of the neighbors that changed."""
+        for msg in msgs:
+            neighbor_id = msg.sender
+            neighbor_assignment = msg.information
+            previous_assignment = self.neighbors_assignments.get(neighbor_id)
+            if previous_assignment != neighbor_assignment:
+                self.values_costs += self.get_values_costs_with(neighbor_id, neighbor_assignment)
+                if previous_assignment is not None:
+                    self.values_costs -= self.get_values_costs_with(neighbor_id, previous_assignment)
+            self.neighbors_assignments[neighbor_id] = neighbor_assignment
+
+    def change_status_after_update_msgs_in_context(self, msgs):
+        pass
+
+    def is_compute_in_this_iteration(self):
+        return not self.is_algorithm_complete()
+
+    def compute(self):
+        """Finds the value the variant allows to move to, and moves to it with the activation probability."""
+        local_costs = self.get_local_costs()
+        current_local_cost = local_costs[self.variable]
+        domain_costs = local_costs if len(self.domain) == len(local_costs) else local_costs[self.domain]
+        min_possible_local_cost = domain_costs.min()
+
+        # the constraint checks of the full computation, as in MGM.compute
+        self.atomic_operations = self.atomic_operations + (len(self.domain) + 1) * len(self.neighbors_assignments)
+        candidate = None
+        if min_possible_local_cost < current_local_cost:
+            candidate = self.domain[int(np.argmin(domain_costs))]
+        elif min_possible_local_cost == current_local_cost and \
+                (self.variant == "C" or (self.variant == "B" and current_local_cost > 0)):
+            for index in np.flatnonzero(domain_costs == min_possible_local_cost).tolist():
+                if self.domain[index] != self.variable:
+                    candidate = self.domain[index]
+                    break
+        if candidate is not None and \
+                get_activation_draws(self.activation_key, self.local_clock) < self.activation_probability:
+            self.variable = candidate
+
+    def get_local_costs(self):
+        """The local cost of every value of the agent."""
+        return self.values_costs
+
+    def change_status_after_send_msgs(self):
+        pass
+
+    def calc_local_cost(self):
+        """The local cost of the current assignment with the neighbors' assignments context."""
+        self.atomic_operations = self.atomic_operations + len(self.neighbors_assignments)
+        return self.get_local_costs()[self.variable]
+
+    def is_algorithm_complete(self):
+        """Agents without neighbors have nothing to do; the others stop after incomplete_iterations iterations."""
+        if len(self.neighbors_agents_id) == 0:
+            return True
+        return IncompleteAlgorithm.is_algorithm_complete(self)
+
+    def __str__(self):
+        return f'DSA_Agent_{self.id_} - {self.variable}'
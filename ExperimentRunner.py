@@ -0,0 +1,209 @@
+"""
+Parallel experiment runner: the (dcop_type, algorithm, dcop_id, A, D) jobs of a sweep are fanned out to a pool of
+forked worker processes, and the result of every job is appended to a results store as soon as it finishes. The
+store is a file of json lines, so a sweep that was interrupted continues from the jobs that have no result yet.
+
+Every worker keeps an InstanceCache open for its whole life, and the jobs of an instance (one per algorithm) are sent
+to a worker together, so an instance is generated once into the shared cache directory and stays mapped in the worker
+for all its algorithms. Before a job runs, the random module and numpy are seeded from the sweep seed and the job
+alone, so the results do not depend on the worker or on the order in which jobs run.
+"""
+import json
+import multiprocessing
+import os
+import random
+import time
+import traceback
+from collections import namedtuple
+
+import numpy as np
+
+from Globals_ import get_cost_key, time_slots_D
+from enums import DcopType
+from Explanation import calc_global_cost
+from InstanceStore import InstanceCache
+from MeetingScheduling import DCOP_MeetingScheduling
+from problems import DCOP_RandomUniform, DCOP_GraphColoring, DCOP_ScaleFree
+
+# dcop type: (DCOP class, default A, default D, name)
+dcop_types = {DcopType.sparse_random_uniform: (DCOP_RandomUniform, 5, 10, "Sparse Uniform"),
+              DcopType.dense_random_uniform: (DCOP_RandomUniform, 5, 10, "Dense Uniform"),
+              DcopType.graph_coloring: (DCOP_GraphColoring, 5, 10, "Graph Coloring"),
+              DcopType.scale_free_network: (DCOP_ScaleFree, 50, 10, "Scale Free"),
+              DcopType.meeting_scheduling: (DCOP_MeetingScheduling, 10, time_slots_D, "Meeting Scheduling")}
+
+ExperimentJob = namedtuple("ExperimentJob", ("dcop_type", "algorithm", "dcop_id", "A", "D"))
+
+worker_cache = None
+
+
+def get_sweep_jobs(selected_dcop_types, algorithms, repetitions):
+    """The jobs of every algorithm on repetitions instances of every dcop type, with the jobs of an instance
+    consecutive."""
+    jobs = []
+    for dcop_type in selected_dcop_types:
+        _, A, D, _ = dcop_types[dcop_type]
+        for dcop_id in range(repetitions):
+            for algorithm in algorithms:
+                jobs.append(ExperimentJob(dcop_type, algorithm, dcop_id, A, D))
+    return jobs
+
+
+def get_job_key(job):
+    return "/".join((job.dcop_type.name, job.algorithm.name, str(job.dcop_id), str(job.A), str(job.D)))
+
+
+def get_job_seed(seed, job):
+    key = get_cost_key(seed, job.dcop_type.value, job.algorithm.value)
+    return get_cost_key(key, job.dcop_id, (job.A << 32) | job.D)
+
+
+class ResultsStore():
+    """
+    The results of a sweep, one json line per finished job, flushed to disk as each job finishes. A line cut by an
+    interruption is removed when the store is opened again. Jobs that failed keep their error and run again on resume.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                if len(line.strip()) != 0:
+                    record = json.loads(line)
+                    self.results[record["key"]] = record
+            if end != len(data):
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, job):
+        record = self.results.get(get_job_key(job))
+        return record is not None and "error" not in record
+
+    def append(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.results[record["key"]] = record
+
+    def get_records(self, jobs):
+        """The records of the given jobs that have one, in the order of the jobs."""
+        keys = [get_job_key(job) for job in jobs]
+        return [self.results[key] for key in keys if key in self.results]
+
+    def close(self):
+        self.file.close()
+
+
+def init_worker(cache_dir, cache_max_bytes, max_loaded):
+    global worker_cache
+    worker_cache = None
+    if cache_dir is not None:
+        worker_cache = InstanceCache(cache_dir, cache_max_bytes, max_loaded)
+
+
+def get_global_cost(dcop):
+    """The global cost of the assignment of the agents, None when an agent has no value (branch and bound agents
+    keep their solution in the anytime fields)."""
+    if any(a.variable is None for a in dcop.agents):
+        return None
+    return int(calc_global_cost(dcop))
+
+
+def run_job(job, seed):
+    """Creates and solves the DCOP of the job; returns its record, with the traceback when the job failed."""
+    job_seed = get_job_seed(seed, job)
+    record = {"key": get_job_key(job), "dcop_type": job.dcop_type.name, "algorithm": job.algorithm.name,
+              "dcop_id": job.dcop_id, "A": job.A, "D": job.D, "seed": job_seed}
+    try:
+        random.seed(job_seed)
+        np.random.seed(job_seed & 0xffffffff)
+        dcop_class, _, _, dcop_name = dcop_types[job.dcop_type]
+        start_time = time.perf_counter()
+        if worker_cache is not None:
+            dcop = worker_cache.get_dcop(dcop_class, job.dcop_id, job.A, job.D, dcop_name, job.algorithm)
+        else:
+            dcop = dcop_class(job.dcop_id, job.A, job.D, dcop_name, job.algorithm)
+        create_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        dcop.execute()
+        run_time = time.perf_counter() - start_time
+        record.update({"global_cost": get_global_cost(dcop),
+                       "anytime_cost": dcop.anytime_cost,
+                       "global_clock": dcop.global_clock,
+                       "msgs": int(sum(dcop.mailer.msgs_per_tick)),
+                       "create_time": create_time,
+                       "run_time": run_time,
+                       "worker": os.getpid()})
+    except Exception:
+        record["error"] = traceback.format_exc()
+    return record
+
+
+def run_instance_jobs(args):
+    jobs, seed = args
+    return [run_job(job, seed) for job in jobs]
+
+
+def get_instance_groups(jobs):
+    """Groups the jobs by instance, in the order of their first job."""
+    groups = {}
+    for job in jobs:
+        groups.setdefault((job.dcop_type, job.dcop_id, job.A, job.D), []).append(job)
+    return list(groups.values())
+
+
+class ExperimentRunner():
+    """
+    Runs the jobs of a sweep on workers processes (all the cores when None) and stores their results at results_path
+    (see the module docstring). cache_dir is the directory of the instances shared by the workers, None generates
+    every instance in the job that uses it.
+    """
+
+    def __init__(self, results_path, workers=None, seed=0, cache_dir=None, cache_max_bytes=2 ** 30, max_loaded=1):
+        self.results_path = results_path
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.seed = seed
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.max_loaded = max_loaded
+        self.metrics = None
+
+    def run(self, jobs):
+        """Runs the jobs that have no result in the store yet and returns the records of all the jobs."""
+        store = ResultsStore(self.results_path)
+        pending = [job for job in jobs if not store.is_done(job)]
+        errors = 0
+        start_time = time.perf_counter()
+        try:
+            if self.workers <= 1:
+                init_worker(self.cache_dir, self.cache_max_bytes, self.max_loaded)
+                records = (run_job(job, self.seed) for job in pending)
+                errors = self.store_records(store, records)
+            else:
+                ctx = multiprocessing.get_context("fork")
+                with ctx.Pool(self.workers, initializer=init_worker,
+                              initargs=(self.cache_dir, self.cache_max_bytes, self.max_loaded)) as pool:
+                    groups = [(group, self.seed) for group in get_instance_groups(pending)]
+                    for records in pool.imap_unordered(run_instance_jobs, groups):
+                        errors = errors + self.store_records(store, records)
+            ans = store.get_records(jobs)
+        finally:
+            store.close()
+        self.metrics = {"jobs": len(jobs), "skipped": len(jobs) - len(pending), "errors": errors,
+                        "wall_time": time.perf_counter() - start_time, "workers": self.workers}
+        return ans
+
+    @staticmethod
+    def store_records(store, records):
+        errors = 0
+        for record in records:
+            store.append(record)
+            if "error" in record:
+                errors = errors + 1
+                print("job", record["key"], "failed:", record["error"].strip().splitlines()[-1])
+        return errors
@@ -1,6 +1,8 @@
 from Globals_ import *
 
 class SingleInformation:
+    __slots__ = ("context", "constraints", "constraints_readable", "cost")
+
     def __init__(self, context: {}, constraints: {}):
         self.context = context
         self.constraints = constraints
@@ -39,18 +41,11 @@ class SingleInformation:
         return variable_anytime,context_anytime,constraints_anytime
 
 
-    @staticmethod
-    def convert_str_A_number(input_str):
-        _, number_str = input_str.split('_')
-        # Convert the part after the underscore to an integer
-        return int(number_str)
-
     def get_constraints_readable(self):
         ans = []
         for list_of_constraints in self.constraints.values():
-            for context,cost in list_of_constraints.items():
-                first_agent_num = self.convert_str_A_number(context[0][0])
-                second_agent_num = self.convert_str_A_number(context[1][0])
+            for constraint_key,cost in list_of_constraints.items():
+                first_agent_num, second_agent_num = get_constraint_agents(constraint_key)
                 ans.append((first_agent_num,second_agent_num,cost))
         return ans
 
@@ -184,18 +179,18 @@ class PruneExplanation:
         loser_constraints = self.loser.constraints
         for n_id, constraints_dict in loser_constraints.items():
             if n_id not in winner_constraints:
-                for variables_tuple, cost in constraints_dict.items():
-                    self.disjoint_winner_constraints[variables_tuple] = cost
-                    self.disjoint_loser_constraints[variables_tuple] = cost
+                for constraint_key, cost in constraints_dict.items():
+                    self.disjoint_winner_constraints[constraint_key] = cost
+                    self.disjoint_loser_constraints[constraint_key] = cost
 
     def check_if_in_winner_and_not_in_loser(self):
         winner_constraints = self.winner.constraints
         loser_constraints = self.loser.constraints
         for n_id, constraints_dict in winner_constraints.items():
             if n_id not in loser_constraints:
-                for variables_tuple, cost in constraints_dict.items():
-                    self.disjoint_winner_constraints[variables_tuple] = cost
-                    self.disjoint_loser_constraints[variables_tuple] = cost
+                for constraint_key, cost in constraints_dict.items():
+                    self.disjoint_winner_constraints[constraint_key] = cost
+                    self.disjoint_loser_constraints[constraint_key] = cost
 
     @staticmethod
     def get_ids_with_different_values(winner_context, loser_context):
@@ -204,17 +199,16 @@ class PruneExplanation:
             if id_ in loser_context.keys():
                 loser_value = loser_context[id_]
                 if winner_value != loser_value:
-                    ans.append("A_" + str(id_))
+                    ans.append(id_)
         return ans
 
     def create_joint_constraints(self, ids_to_ignore):
         constraints_per_id = self.winner.constraints
         for constraints in constraints_per_id.values():
-            for tuples_, cost in constraints.items():
-                first_agent = tuples_[0][0]
-                second_agent = tuples_[1][0]
+            for constraint_key, cost in constraints.items():
+                first_agent, second_agent = get_constraint_agents(constraint_key)
                 if first_agent not in ids_to_ignore and second_agent not in ids_to_ignore:
-                    self.joint_constraints[tuples_] = cost
+                    self.joint_constraints[constraint_key] = cost
 
     @staticmethod
     def get_disjoint_agents(winner_context, loser_context):
@@ -223,11 +217,11 @@ class PruneExplanation:
 
         for id_ in winner_context.keys():
             if id_ not in loser_context.keys():
-                in_winner_disjoint_agents.append("A_" + str(id_))
+                in_winner_disjoint_agents.append(id_)
 
         for id_ in loser_context.keys():
             if id_ not in winner_context.keys():
-                in_loser_disjoint_agents.append("A_" + str(id_))
+                in_loser_disjoint_agents.append(id_)
 
         return in_winner_disjoint_agents, in_loser_disjoint_agents
 
@@ -235,25 +229,24 @@ class PruneExplanation:
         ans = {}
         constraints_per_id = single_info.constraints
         for constraints in constraints_per_id.values():
-            for tuples_, cost in constraints.items():
-                first_agent = tuples_[0][0]
-                second_agent = tuples_[1][0]
+            for constraint_key, cost in constraints.items():
+                first_agent, second_agent = get_constraint_agents(constraint_key)
                 if first_agent in ids_with_different_values or second_agent in ids_with_different_values:
-                    ans[tuples_] = cost
+                    ans[constraint_key] = cost
         return ans
 
     def get_explanation_as_dict(self):
         ans = {}
         ans["text"] = self.text
-        ans["winner_constraints"] = str(self.winner.constraints)
+        ans["winner_constraints"] = str(get_constraints_per_id_readable(self.winner.constraints))
         ans["winner_context"] = str(self.winner.context)
-        ans["loser_constraints"] = str(self.loser.constraints)
+        ans["loser_constraints"] = str(get_constraints_per_id_readable(self.loser.constraints))
         ans["loser_context"] = str(self.loser.context)
-        ans["joint_constraints"] = str(self.joint_constraints)
+        ans["joint_constraints"] = str(get_constraints_dict_readable(self.joint_constraints))
         ans["joint_cost"] = str(self.joint_cost)
-        ans["disjoint_loser_constraints"] = str(self.disjoint_loser_constraints)
+        ans["disjoint_loser_constraints"] = str(get_constraints_dict_readable(self.disjoint_loser_constraints))
         ans["disjoint_loser_cost"] = str(self.disjoint_loser_cost)
-        ans["disjoint_winner_constraints"] = str(self.disjoint_winner_constraints)
+        ans["disjoint_winner_constraints"] = str(get_constraints_dict_readable(self.disjoint_winner_constraints))
         ans["disjoint_winner_cost"] = str(self.disjoint_winner_cost)
         ans["local_clock"] = str(self.local_clock)
         ans["global_clock"] = str(self.global_clock)
@@ -2,6 +2,7 @@ import random
 
 from enums import *
 from random import Random
+import numpy as np
 import pandas as pd
 
 #import networkx as nx
@@ -16,8 +17,110 @@ from itertools import chain
 
 is_complete = None
 repetitions = 1
+# Directory of the on-disk instance cache used by main_multiple_expirements (None disables it)
+instance_cache_dir = None
+instance_cache_max_bytes = 2 ** 30
+# main_multiple_expirements runs the repetitions on experiment_workers processes when it is set (see ExperimentRunner),
+# appending the results to experiment_results_path; a sweep that was interrupted continues from the missing jobs.
+experiment_workers = None
+experiment_results_path = "results.jsonl"
+experiment_seed = 0
 incomplete_iterations = 1000
 my_inf = 1000
+cost_table_dtype = np.int32
+
+# Lazy cost tables compute a cell only when it is read instead of materializing the D1xD2 table of every edge.
+# Each lazy table keeps an LRU cache of up to lazy_cost_table_cached_rows rows (0 disables the cache).
+lazy_cost_tables = False
+lazy_cost_table_cached_rows = 64
+
+# DCOP.execute partitions the agents across sharded_workers processes when it is set to more than 1. Messages between
+# shards are exchanged every tick through sharded_transport: "shared_memory" ring buffers of sharded_ring_buffer_bytes
+# per pair of shards, or connections of "tcp" (on sharded_tcp_host) or "unix" sockets.
+sharded_workers = None
+sharded_transport = "shared_memory"
+sharded_ring_buffer_bytes = 2 ** 22
+sharded_tcp_host = "127.0.0.1"
+
+# DCOP.execute runs MGM on numpy arrays for the whole population (see VectorizedMGM) when vectorized_mgm is True;
+# the assignments are those of the message passing agents.
+vectorized_mgm = False
+
+# DSA agents (Algorithm.dsa_c, see DSA) move with dsa_activation_probability when their dsa_variant ("A", "B" or "C")
+# allows it. DCOP.execute runs them on numpy arrays (see VectorizedDSA) when vectorized_dsa is True.
+dsa_variant = "C"
+dsa_activation_probability = 0.7
+vectorized_dsa = False
+
+# Max-Sum agents (Algorithm.max_sum, see MaxSum) damp their messages with max_sum_damping (the weight of the previous
+# message) and add a random preference of up to max_sum_noise to every value to break symmetric ties. From iteration
+# max_sum_value_propagation (None disables it) a function node costs the assigned value of the neighbor with the lower
+# id instead of minimizing over its values.
+max_sum_damping = 0.5
+max_sum_noise = 0.001
+max_sum_value_propagation = None
+
+# DCOP.execute writes a message trace (see Trace) to trace_path when it is set; "{dcop_id}" is replaced by the DCOP id
+# and "{run}" by the number of the run of the DCOP (see DCOP.get_trace_path).
+trace_path = None
+
+# DCOP.execute saves a checkpoint to checkpoint_path every checkpoint_every ticks when it is set ("{dcop_id}" is replaced
+# by the DCOP id); DCOP.resume(path) continues the run.
+checkpoint_every = None
+checkpoint_path = "checkpoint_{dcop_id}.ckpt"
+
+
+######## counter based random ########
+
+uint64_mask = (1 << 64) - 1
+golden_gamma = 0x9e3779b97f4a7c15
+
+
+def splitmix64(x):
+    """splitmix64 finalizer, works on python ints and on numpy uint64 arrays."""
+    if isinstance(x, np.ndarray):
+        x = x ^ (x >> np.uint64(30))
+        x = x * np.uint64(0xbf58476d1ce4e5b9)
+        x = x ^ (x >> np.uint64(27))
+        x = x * np.uint64(0x94d049bb133111eb)
+        return x ^ (x >> np.uint64(31))
+    x = x & uint64_mask
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & uint64_mask
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & uint64_mask
+    return x ^ (x >> 31)
+
+
+def get_cost_key(dcop_id, a1_id, a2_id):
+    key = splitmix64(dcop_id + golden_gamma)
+    key = splitmix64(key ^ (a1_id + golden_gamma))
+    return splitmix64(key ^ (a2_id + golden_gamma))
+
+
+class CounterRandom:
+    """
+    Counter based replacement for numpy's Generator in the cost functions. Draw n of cell (d_a1, d_a2) is element
+    (d_a1<<32 | d_a2) of a splitmix64 stream seeded by hash(key, n), so costs do not depend on which cells are
+    generated together or in what order: a single cell, a row, or a full table give the same values in every run
+    and process.
+    """
+    def __init__(self, key, d_a1, d_a2):
+        self.key = key
+        cells = (np.asarray(d_a1, dtype=np.uint64) << np.uint64(32)) | np.asarray(d_a2, dtype=np.uint64)
+        self.cells = cells * np.uint64(golden_gamma)
+        self.draws = 0
+
+    def next_bits(self, shape):
+        self.draws = self.draws + 1
+        stream_seed = np.uint64(splitmix64(self.key ^ self.draws))
+        return np.broadcast_to(splitmix64(self.cells + stream_seed), shape)
+
+    def random(self, size):
+        return (self.next_bits(size) >> np.uint64(11)) * (1.0 / (1 << 53))
+
+    def integers(self, low, high, size, endpoint=False):
+        span = high - low + (1 if endpoint else 0)
+        return low + (self.next_bits(size) % np.uint64(span)).astype(np.int64)
+
 
 #### DCOPS_INPUT ####
 #*******************************************#
@@ -30,11 +133,10 @@ sparse_min_cost = 1
 sparse_max_cost = 100
 
 
-def sparse_random_uniform_cost_function(rnd_cost:Random,a1,a2,d_a1,d_a2):
-    if rnd_cost.random()<sparse_p2:
-        return rnd_cost.randint(sparse_min_cost, sparse_max_cost)
-    else:
-        return 0
+def sparse_random_uniform_cost_function(rnd_cost:CounterRandom,a1,a2,d_a1,d_a2):
+    shape = np.broadcast_shapes(d_a1.shape, d_a2.shape)
+    costs = rnd_cost.integers(sparse_min_cost, sparse_max_cost, size=shape, endpoint=True)
+    return np.where(rnd_cost.random(shape) < sparse_p2, costs, 0)
 
 
 # *******************************************#
@@ -46,11 +148,10 @@ dense_p2 = 1
 dense_min_cost = 1
 dense_max_cost = 100
 
-def dense_random_uniform_cost_function(rnd_cost:Random,a1,a2,d_a1,d_a2):
-    if rnd_cost.random()<dense_p2:
-        return rnd_cost.randint(dense_min_cost, dense_max_cost)
-    else:
-        return 0
+def dense_random_uniform_cost_function(rnd_cost:CounterRandom,a1,a2,d_a1,d_a2):
+    shape = np.broadcast_shapes(d_a1.shape, d_a2.shape)
+    costs = rnd_cost.integers(dense_min_cost, dense_max_cost, size=shape, endpoint=True)
+    return np.where(rnd_cost.random(shape) < dense_p2, costs, 0)
 
 
 
@@ -63,9 +164,9 @@ scale_others_number_of_neighbors = 3
 scale_min_cost = 1
 scale_max_cost = 100
 
-def scale_free_network_cost_function(rnd_cost:Random,a1,a2,d_a1,d_a2):
-    #TODO
-    raise Exception("TODO scale_free_network_cost_function")
+def scale_free_network_cost_function(rnd_cost:CounterRandom,a1,a2,d_a1,d_a2):
+    shape = np.broadcast_shapes(d_a1.shape, d_a2.shape)
+    return rnd_cost.integers(scale_min_cost, scale_max_cost, size=shape, endpoint=True)
 
 
 #*******************************************#
@@ -75,11 +176,8 @@ def scale_free_network_cost_function(rnd_cost:Random,a1,a2,d_a1,d_a2):
 graph_coloring_p1 = 0.5
 graph_coloring_constant_cost = 10
 
-def graph_coloring_cost_function(rnd_cost:Random,a1,a2,d_a1,d_a2):
-    if d_a1==d_a2:
-        return graph_coloring_constant_cost
-    else:
-        return 0
+def graph_coloring_cost_function(rnd_cost:CounterRandom,a1,a2,d_a1,d_a2):
+    return np.where(d_a1 == d_a2, graph_coloring_constant_cost, 0)
 
 
 #*******************************************#
@@ -90,22 +188,18 @@ meetings_per_agent=3
 time_slots_D=5
 
 
-def meeting_scheduling_must_be_equal_cost_function(rnd_cost:Random,a1,a2,d_a1,d_a2):
-    if d_a1==d_a2:
-        return 0
-    else:
-        return my_inf
+def meeting_scheduling_must_be_equal_cost_function(rnd_cost:CounterRandom,a1,a2,d_a1,d_a2):
+    return np.where(d_a1 == d_a2, 0, my_inf)
 
 
-def meeting_scheduling_must_be_non_equal_cost_function(rnd_cost:Random,a1,a2,d_a1,d_a2):
-    if d_a1==d_a2:
-        return my_inf
-    else:
-        return 0
+def meeting_scheduling_must_be_non_equal_cost_function(rnd_cost:CounterRandom,a1,a2,d_a1,d_a2):
+    return np.where(d_a1 == d_a2, my_inf, 0)
 
 
-def meeting_scheduling_unary_constraint_cost_function(rnd_cost:Random,a1,a2,d_a1,d_a2):
-    return a1.unary_constraint[d_a1]
+def meeting_scheduling_unary_constraint_cost_function(rnd_cost:CounterRandom,a1,a2,d_a1,d_a2):
+    shape = np.broadcast_shapes(d_a1.shape, d_a2.shape)
+    unary_costs = np.array([a1.unary_constraint[d] for d in a1.domain])
+    return np.broadcast_to(unary_costs[d_a1], shape)
 
 
 ######## dcop input ########
@@ -124,6 +218,63 @@ def get_neighbor_str_tuple(neighbors):
         return  (second_str,first_str)
 
 
+######## constraint keys ########
+# An assignment (agent id, value) is packed into a single int as agent_id<<assignment_value_bits | value,
+# and a constraint key packs the assignments of the lower id agent and the higher id agent of an edge.
+# Keys are only converted to the ("A_id", value) form at the print/CSV boundary.
+
+assignment_value_bits = 20
+assignment_key_bits = 52
+assignment_value_mask = (1 << assignment_value_bits) - 1
+assignment_key_mask = (1 << assignment_key_bits) - 1
+
+
+def encode_assignment(agent_id, value):
+    return (agent_id << assignment_value_bits) | value
+
+
+def decode_assignment(assignment_key):
+    return assignment_key >> assignment_value_bits, assignment_key & assignment_value_mask
+
+
+def encode_constraint(first_agent_id, first_value, second_agent_id, second_value):
+    """first_agent_id must be the lower id of the two agents of the edge."""
+    first_key = (first_agent_id << assignment_value_bits) | first_value
+    second_key = (second_agent_id << assignment_value_bits) | second_value
+    return (first_key << assignment_key_bits) | second_key
+
+
+def decode_constraint(constraint_key):
+    first_key = constraint_key >> assignment_key_bits
+    second_key = constraint_key & assignment_key_mask
+    return decode_assignment(first_key), decode_assignment(second_key)
+
+
+def get_constraint_agents(constraint_key):
+    first_agent_id = constraint_key >> (assignment_key_bits + assignment_value_bits)
+    second_agent_id = (constraint_key & assignment_key_mask) >> assignment_value_bits
+    return first_agent_id, second_agent_id
+
+
+def get_constraint_readable(constraint_key):
+    (first_id, first_value), (second_id, second_value) = decode_constraint(constraint_key)
+    return ("A_"+str(first_id), first_value), ("A_"+str(second_id), second_value)
+
+
+def get_constraints_dict_readable(constraints):
+    ans = {}
+    for constraint_key, cost in constraints.items():
+        ans[get_constraint_readable(constraint_key)] = cost
+    return ans
+
+
+def get_constraints_per_id_readable(constraints_per_id):
+    ans = {}
+    for id_, constraints in constraints_per_id.items():
+        ans[id_] = get_constraints_dict_readable(constraints)
+    return ans
+
+
 def draw_dcop_graph(dcop):
     filename=dcop.__str__()
     g = graphviz.Graph("G",filename=filename, format = "pdf")
@@ -137,6 +288,12 @@ def draw_dcop_graph(dcop):
 
 
 class Msg():
+    """
+    A message between two agents. The field set is fixed to sender, receiver, information and msg_type, and the
+    information is shared by every receiver of the message, so it must not be mutated after sending; receivers that
+    need to change it work on a copy (BnB copies the tokens it receives).
+    """
+    __slots__ = ("sender", "receiver", "information", "msg_type")
 
     def __init__(self, sender, receiver, information,msg_type):
         self.sender = sender
@@ -261,6 +418,11 @@ def copy_dict(dict):
 
 
 
+# Build random graphs with the legacy O(A^2) pair loop instead of geometric edge skipping,
+# to reproduce the edge sets of experiments that were run before the change.
+legacy_random_graph = False
+
+debug_generation_time = False
 debug_draw_graph = True
 debug_DFS_tree = True
 debug_DFS_draw_tree = False
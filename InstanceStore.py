@@ -0,0 +1,304 @@
+"""
+Binary store for generated DCOP instances.
+
+A file holds a fixed preamble (magic, format version, header length, data offset), a json header that describes the
+problem and the layout of the arrays, and the arrays themselves as raw contiguous buffers aligned to 64 bytes:
+    agent_ids, domain_sizes       one entry per agent (meetings in meeting scheduling)
+    edges                         (E, 2) agent ids of every Neighbors object, lower id first, in creation order
+    cost_offsets, costs           the D1xD2 cost table of edge e is costs[cost_offsets[e]:cost_offsets[e+1]]
+Meeting scheduling instances also hold the participants of each meeting (CSR), the unary costs of every
+participant and the aggregated unary costs of every meeting.
+
+Files are opened with numpy.memmap, so loading does not read the arrays, and processes that open the same file
+share its pages read-only. The DCOP constructors accept a loaded instance and take the edges and cost tables from it
+instead of generating them.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+import Globals_
+from Globals_ import cost_table_dtype
+from problems import DCOP_RandomUniform, DCOP_GraphColoring, DCOP_ScaleFree, LazyCostTable
+from MeetingScheduling import DCOP_MeetingScheduling
+
+instance_magic = b"DCOPINST"
+instance_version = 1
+# part of the cache keys of instances: increase it with every change to the generators (the cost functions of Globals_
+# and the create_neighbors of the DCOP classes) that changes the instances they generate, so that cached instances of
+# the previous generators are not used
+generator_version = 1
+instance_alignment = 64
+preamble_dtype = np.dtype([("magic", "S8"), ("version", "<u4"), ("header_length", "<u4"), ("data_offset", "<u8")])
+
+dcop_classes = {cls.__name__: cls for cls in
+                (DCOP_RandomUniform, DCOP_GraphColoring, DCOP_ScaleFree, DCOP_MeetingScheduling)}
+
+
+class DCOPInstance:
+    """A stored instance: the header fields plus read-only arrays that are views into the memory-mapped file."""
+
+    def __init__(self, path, header, arrays):
+        self.path = path
+        self.dcop_class = header["dcop_class"]
+        self.dcop_id = header["dcop_id"]
+        self.A = header["A"]
+        self.D = header["D"]
+        self.dcop_name = header["dcop_name"]
+        self.meetings = header.get("meetings")
+        self.meetings_per_agent = header.get("meetings_per_agent")
+        self.min_meeting_participant = header.get("min_meeting_participant")
+        self.arrays = arrays
+        self.edges = arrays["edges"].tolist()
+        self.cost_offsets = arrays["cost_offsets"].tolist()
+        # agent ids are consecutive from 1, as created by DCOP.create_agents and create_meetings
+        self.domain_sizes = [None] + arrays["domain_sizes"].tolist()
+
+    def get_edges(self):
+        return self.edges
+
+    def get_cost_table(self, edge_index):
+        a1_id, a2_id = self.edges[edge_index]
+        shape = (self.domain_sizes[a1_id], self.domain_sizes[a2_id])
+        return self.arrays["costs"][self.cost_offsets[edge_index]:self.cost_offsets[edge_index + 1]].reshape(shape)
+
+    def get_meeting_participants(self):
+        indptr = self.arrays["meeting_participants_indptr"].tolist()
+        participants_ids = self.arrays["meeting_participants_ids"].tolist()
+        ans = {}
+        for meeting_index in range(len(indptr) - 1):
+            ans[meeting_index + 1] = set(participants_ids[indptr[meeting_index]:indptr[meeting_index + 1]])
+        return ans
+
+    def get_agents_unary_costs(self):
+        return self.get_costs_per_id(self.arrays["agents_unary_costs"])
+
+    def get_meeting_total_costs(self):
+        return self.get_costs_per_id(self.arrays["meeting_total_costs"])
+
+    @staticmethod
+    def get_costs_per_id(costs):
+        ans = {}
+        for index, row in enumerate(costs.tolist()):
+            ans[index + 1] = {time_slot: cost for time_slot, cost in enumerate(row)}
+        return ans
+
+
+def get_costs_array(costs_per_id, amount_of_ids, D):
+    ans = np.zeros((amount_of_ids, D), dtype=np.int64)
+    for id_, costs in costs_per_id.items():
+        for time_slot, cost in costs.items():
+            ans[id_ - 1, time_slot] = cost
+    return ans
+
+
+def get_instance_arrays(dcop):
+    cost_tables = []
+    for n in dcop.neighbors:
+        if isinstance(n.cost_table, LazyCostTable):
+            cost_tables.append(n.cost_table.materialize())
+        else:
+            cost_tables.append(np.asarray(n.cost_table))
+    cost_offsets = np.zeros(len(cost_tables) + 1, dtype=np.int64)
+    np.cumsum([table.size for table in cost_tables], out=cost_offsets[1:])
+    if len(cost_tables) > 0:
+        costs = np.concatenate([table.ravel() for table in cost_tables]).astype(cost_table_dtype)
+    else:
+        costs = np.zeros(0, dtype=cost_table_dtype)
+
+    arrays = {
+        "agent_ids": np.array([a.id_ for a in dcop.agents], dtype=np.int64),
+        "domain_sizes": np.array([len(a.domain) for a in dcop.agents], dtype=np.int64),
+        "edges": np.array([(n.a1.id_, n.a2.id_) for n in dcop.neighbors], dtype=np.int64).reshape(-1, 2),
+        "cost_offsets": cost_offsets,
+        "costs": costs,
+    }
+
+    if isinstance(dcop, DCOP_MeetingScheduling):
+        participants = [sorted(dcop.meeting_participants[meeting_id]) for meeting_id in range(1, dcop.M + 1)]
+        indptr = np.zeros(dcop.M + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in participants], out=indptr[1:])
+        arrays["meeting_participants_indptr"] = indptr
+        arrays["meeting_participants_ids"] = np.array([a_id for p in participants for a_id in p], dtype=np.int64)
+        agents_unary_costs = {agent.id_: agent.unary_constraint for agent in dcop.original_agents}
+        arrays["agents_unary_costs"] = get_costs_array(agents_unary_costs, dcop.A, dcop.D)
+        arrays["meeting_total_costs"] = get_costs_array(dcop.meeting_total_costs, dcop.M, dcop.D)
+    return arrays
+
+
+def get_instance_header(dcop):
+    header = {"dcop_class": type(dcop).__name__, "dcop_id": dcop.dcop_id, "A": dcop.A, "D": dcop.D,
+              "dcop_name": dcop.dcop_name}
+    if isinstance(dcop, DCOP_MeetingScheduling):
+        header["meetings"] = dcop.M
+        header["meetings_per_agent"] = dcop.meetings_per_agent
+        header["min_meeting_participant"] = dcop.min_meeting_participant
+    return header
+
+
+def align(offset):
+    return -(-offset // instance_alignment) * instance_alignment
+
+
+def save_dcop(dcop, path):
+    """
+    Writes a freshly created DCOP (before execution, while the agents' domains are complete) to a single file.
+    """
+    arrays = get_instance_arrays(dcop)
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = align(offset + array.nbytes)
+
+    header = get_instance_header(dcop)
+    header["arrays"] = layout
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_offset = align(preamble_dtype.itemsize + len(header_bytes))
+    preamble = np.array([(instance_magic, instance_version, len(header_bytes), data_offset)], dtype=preamble_dtype)
+
+    with open(path, "wb") as f:
+        f.write(preamble.tobytes())
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_offset + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_offset + offset)
+
+
+def load_instance(path):
+    """
+    Opens an instance file with numpy.memmap. Arrays are read-only views into the mapping and are paged in on access.
+    """
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    preamble = buffer[:preamble_dtype.itemsize].view(preamble_dtype)[0]
+    if preamble["magic"] != instance_magic:
+        raise ValueError(str(path) + " is not a DCOP instance file")
+    if preamble["version"] != instance_version:
+        raise ValueError("unsupported instance version " + str(preamble["version"]))
+    header_end = preamble_dtype.itemsize + int(preamble["header_length"])
+    header = json.loads(buffer[preamble_dtype.itemsize:header_end].tobytes().decode("utf-8"))
+    data_offset = int(preamble["data_offset"])
+
+    arrays = {}
+    for name, layout in header["arrays"].items():
+        dtype = np.dtype(layout["dtype"])
+        shape = tuple(layout["shape"])
+        start = data_offset + layout["offset"]
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(shape)
+    return DCOPInstance(path, header, arrays)
+
+
+def create_dcop_from_instance(instance, algorithm):
+    """
+    Builds the DCOP stored in an instance (a path or a loaded DCOPInstance) for the given algorithm.
+    """
+    if not isinstance(instance, DCOPInstance):
+        instance = load_instance(instance)
+    dcop_class = dcop_classes[instance.dcop_class]
+    return dcop_class(instance.dcop_id, instance.A, instance.D, instance.dcop_name, algorithm, instance=instance)
+
+
+def get_generator_parameters():
+    """The Globals_ inputs that the instance generators read."""
+    names = ["my_inf", "legacy_random_graph", "sparse_p1", "sparse_p2", "sparse_min_cost", "sparse_max_cost",
+             "dense_p1", "dense_p2", "dense_min_cost", "dense_max_cost", "scale_free_hubs",
+             "scale_others_number_of_neighbors", "scale_min_cost", "scale_max_cost", "graph_coloring_p1",
+             "graph_coloring_constant_cost", "meetings", "meetings_per_agent", "time_slots_D"]
+    return {name: getattr(Globals_, name) for name in names}
+
+
+class InstanceCache:
+    """
+    On-disk cache of instance files, addressed by a hash of the DCOP class, (dcop_id, A, D, dcop_name), the generator
+    parameters in Globals_ and generator_version. Instances are algorithm independent, so the same file serves every
+    algorithm. When the files exceed max_bytes, the least recently used ones are removed. Up to
+    max_loaded loaded instances are kept open, so a process that runs several algorithms on an instance maps it once.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 ** 30, max_loaded=0):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_loaded = max_loaded
+        self.loaded = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_key(self, dcop_class, dcop_id, A, D, dcop_name):
+        key_input = {"dcop_class": dcop_class.__name__, "dcop_id": dcop_id, "A": A, "D": D, "dcop_name": dcop_name,
+                     "parameters": get_generator_parameters(), "generator_version": generator_version,
+                     "instance_version": instance_version}
+        return hashlib.sha256(json.dumps(key_input, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + ".dcop")
+
+    def get_dcop(self, dcop_class, dcop_id, A, D, dcop_name, algorithm):
+        """Returns the DCOP from its cached instance, generating and storing the instance on a miss."""
+        path = self.get_path(self.get_key(dcop_class, dcop_id, A, D, dcop_name))
+        if path in self.loaded:
+            self.hits = self.hits + 1
+            self.loaded.move_to_end(path)
+            return create_dcop_from_instance(self.loaded[path], algorithm)
+        # the workers of a sweep share the cache directory, so another worker may evict the file at any time: a file
+        # that is missing when it is loaded is a miss
+        try:
+            instance = self.load(path)
+        except FileNotFoundError:
+            instance = None
+        if instance is not None:
+            self.hits = self.hits + 1
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            return create_dcop_from_instance(instance, algorithm)
+
+        self.misses = self.misses + 1
+        dcop = dcop_class(dcop_id, A, D, dcop_name, algorithm)
+        temp_path = path + "." + str(os.getpid()) + ".tmp"
+        save_dcop(dcop, temp_path)
+        os.replace(temp_path, path)
+        self.evict()
+        return dcop
+
+    def load(self, path):
+        instance = load_instance(path)
+        if self.max_loaded > 0:
+            self.loaded[path] = instance
+            if len(self.loaded) > self.max_loaded:
+                self.loaded.popitem(last=False)
+        return instance
+
+    def evict(self):
+        """Removes the least recently used files until the cache fits in max_bytes. Files that another worker removed
+        meanwhile are skipped."""
+        files = []
+        total_bytes = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".dcop"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, name, stat.st_size))
+                total_bytes = total_bytes + stat.st_size
+        for _, name, size in sorted(files):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                self.evictions = self.evictions + 1
+            except FileNotFoundError:
+                pass
+            total_bytes = total_bytes - size
+
+    def get_statistics(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
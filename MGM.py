@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from Agents import Agent
 from enum import Enum
-from Globals_ import Msg, copy_dict
+from Globals_ import Msg
+import numpy as np
 import random
 
 
@@ -17,6 +18,7 @@ class MGM_Msg(Enum):
 
 
 class MGM(Agent,ABC):
+    trace_fields = Agent.trace_fields + ("status", "lr", "lr_potential_asgmt")
 
     def __init__(self, id_, D, dcop_id):
         Agent.__init__(self,id_,D)
@@ -28,13 +30,27 @@ class MGM(Agent,ABC):
         self.variable = self.agent_random.randint(0, D-1)
         self.lr = None  # Local reduction
         self.lr_potential_asgmt = self.variable  # Potential assignment that leads to max local reduction
+        self.values_costs = np.zeros(D, dtype=np.int64)  # Cost of every value with the neighbors' assignments
 
     def set_constraints(self):
-        """Copies constraints from neighbors' objects and stores them in the local constraints' dictionary."""
-        for n_obj in self.neighbors_obj:
-            neighbor_id = n_obj.get_other_agent(self)
-            cost_table = copy_dict(n_obj.cost_table)
-            self.constraints[neighbor_id] = cost_table
+        """Stores the cost tables of neighbors' objects in the local constraints' dictionary.
+        The tables are shared with the Neighbors objects (and with the neighbor agent) rather than copied; they are
+        read-only, so an attempt to modify one raises instead of changing the costs seen by other agents.
+        Rows of each table are indexed by the value of the agent with the lower id.
+        The cost of every value is computed again from the known neighbors' assignments."""
+        for neighbor_id, n_obj in self.neighbors_obj_dict.items():
+            self.constraints[neighbor_id] = n_obj.cost_table
+        self.values_costs = np.zeros(len(self.values_costs), dtype=np.int64)
+        for neighbor_id, neighbor_asgmt in self.neighbors_assignments.items():
+            self.values_costs += self.get_values_costs_with(neighbor_id, neighbor_asgmt)
+
+    def get_values_costs_with(self, neighbor_id, neighbor_asgmt):
+        """The costs of all the values of the agent with the neighbor assigned neighbor_asgmt (a row or a column of
+        the shared table)."""
+        constraint = self.constraints[neighbor_id]
+        if self.id_ < neighbor_id:
+            return constraint[:, neighbor_asgmt]
+        return constraint[neighbor_asgmt, :]
 
     def initialize(self):
         """Sets up constraints and sends initial variable assignments to neighbors."""
@@ -74,9 +90,15 @@ class MGM(Agent,ABC):
                 self.update_msg_in_context_neighbors_lost_reduction(msg)
 
     def update_msg_in_context_neighbors_assignment(self, msg):
-        """Updates the neighbors' assignments based on received assignment message."""
+        """Updates the neighbors' assignments based on received assignment message. The cost of every value changes
+        only by the costs of the neighbor's previous and new assignments, so unchanged neighbors cost nothing."""
         neighbor_id = msg.sender
         neighbor_assignment = msg.information
+        previous_assignment = self.neighbors_assignments.get(neighbor_id)
+        if previous_assignment != neighbor_assignment:
+            self.values_costs += self.get_values_costs_with(neighbor_id, neighbor_assignment)
+            if previous_assignment is not None:
+                self.values_costs -= self.get_values_costs_with(neighbor_id, previous_assignment)
         self.neighbors_assignments[neighbor_id]=neighbor_assignment
 
     def update_msg_in_context_neighbors_lost_reduction(self, msg):
@@ -106,32 +128,28 @@ class MGM(Agent,ABC):
         return self.status == MGM_Status.calc_local_reduction
 
     def compute(self):
-        """Calculates the maximum local reduction by exploring all possible assignments and
-         determines the best assignment that minimizes local cost."""
+        """Calculates the maximum local reduction over the domain from the cost of every value, and determines the
+        first assignment that minimizes the local cost."""
         self.lr = 0
-        current_local_cost = self.calc_local_cost()
-        min_possible_local_cost = current_local_cost
-        best_local_assignment = self.variable
-
-        for optional_asgmt in self.domain:
-            current_costs = 0
-            for neighbor_id, neighbor_asgmt in self.neighbors_assignments.items():
-                constraint = self.constraints[neighbor_id]
-                if self.id_ < neighbor_id:
-                    cost = constraint[(("A_"+str(self.id_), optional_asgmt), ("A_"+str(neighbor_id), neighbor_asgmt))]
-                else:
-                    cost = constraint[(("A_"+str(neighbor_id), neighbor_asgmt), ("A_"+str(self.id_), optional_asgmt))]
-                current_costs += cost
-
-            if current_costs < min_possible_local_cost:
-                min_possible_local_cost = current_costs
-                best_local_assignment = optional_asgmt
+        local_costs = self.get_local_costs()
+        current_local_cost = local_costs[self.variable]
+        if len(self.domain) == len(local_costs):
+            best_local_assignment = int(np.argmin(local_costs))
+        else:
+            best_local_assignment = self.domain[int(np.argmin(local_costs[self.domain]))]
+        min_possible_local_cost = local_costs[best_local_assignment]
 
+        # the constraint checks of the full computation, so that NCLOs do not depend on the implementation
+        self.atomic_operations = self.atomic_operations + (len(self.domain) + 1) * len(self.neighbors_assignments)
         # If a lower local cost is found with a different assignment, calculate the local reduction
         if min_possible_local_cost < current_local_cost:
-            self.lr = current_local_cost - min_possible_local_cost
+            self.lr = int(current_local_cost - min_possible_local_cost)
             self.lr_potential_asgmt = best_local_assignment
 
+    def get_local_costs(self):
+        """The local cost of every value of the agent."""
+        return self.values_costs
+
     def change_status_after_send_msgs(self):
         """Changes the agent's status to wait for neighbors' lost reduction after sending messages."""
         self.status = MGM_Status.wait_for_neighbors_lost_reduction
@@ -142,10 +160,11 @@ class MGM(Agent,ABC):
         for neighbor_id, neighbor_variable in self.neighbors_assignments.items():
             constraint = self.constraints[neighbor_id]
             if self.id_ < neighbor_id:
-                cost = constraint[(("A_"+str(self.id_), self.variable), ("A_"+str(neighbor_id), neighbor_variable))]
+                cost = constraint[self.variable, neighbor_variable]
             else:
-                cost = constraint[(("A_"+str(neighbor_id), neighbor_variable), ("A_"+str(self.id_), self.variable))]
+                cost = constraint[neighbor_variable, self.variable]
             local_cost += cost
+        self.atomic_operations = self.atomic_operations + len(self.neighbors_assignments)
         return local_cost
 
     def is_best_lr(self):
@@ -68,10 +68,8 @@ class MGM_Explanation(Explanation):
                     constraint = agent.constraints[neighbor]
                     if agent.id_ < neighbor:
                         # Fetch former and current implicit constraints for comparison
-                        former_implicit_constraint = constraint[(("A_" + str(agent.id_), self.context[agent.id_]),
-                                                                 ("A_" + str(neighbor), self.context[neighbor]))]
-                        current_implicit_constraint = constraint[(("A_" + str(agent.id_), self.no_good[agent.id_]),
-                                                                  ("A_" + str(neighbor), self.no_good[neighbor]))]
+                        former_implicit_constraint = constraint[self.context[agent.id_], self.context[neighbor]]
+                        current_implicit_constraint = constraint[self.no_good[agent.id_], self.no_good[neighbor]]
                         print(f"    Constraint of A_{agent.id_} and  A_{neighbor} :")
                         print(f"        Former implicit constraint {former_implicit_constraint}")
                         print(f"        Current implicit constraint {current_implicit_constraint}")
@@ -142,10 +140,8 @@ class Meeting_Scheduling_Explanation(MGM_Explanation):
                     constraint = meeting.constraints[neighbor]
                     if meeting.id_ < neighbor:  # To avoid duplicate comparisons
                         # Fetch and compare implicit constraints
-                        former_implicit_constraint = constraint[(("A_" + str(meeting.id_), meeting_former_assignment),
-                                                                 ("A_" + str(neighbor), neighbor_former_assignment))]
-                        current_implicit_constraint = constraint[(("A_" + str(meeting.id_), meeting_assignment),
-                                                                  ("A_" + str(neighbor), neighbor_assignment))]
+                        former_implicit_constraint = constraint[meeting_former_assignment, neighbor_former_assignment]
+                        current_implicit_constraint = constraint[meeting_assignment, neighbor_assignment]
                         print(f"    Constraint of Meeting_{meeting.id_} and  Meeting_{neighbor} :")
                         print(f"        Former implicit constraint {former_implicit_constraint}")
                         print(f"        Current implicit constraint {current_implicit_constraint}")
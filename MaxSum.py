@@ -0,0 +1,163 @@
+from Agents import Agent, IncompleteAlgorithm
+from enum import Enum
+from Globals_ import Msg
+import Globals_
+import numpy as np
+import random
+
+
+class MaxSum_Msg(Enum):
+    q_and_assignment = 1  # Message type for sending the variable->function message and the variable assignment
+
+
+class MaxSum(Agent, IncompleteAlgorithm):
+    """
+    Max-Sum (in its min-sum form) on the factor graph of DCOP.neighbors: a variable node per agent and a function node
+    per edge. The function node of an edge is computed by both of its agents, each for the message to itself, so an
+    iteration takes a single tick with one message per neighbor carrying the variable->function message q (a cost per
+    value of the sender) and the sender's assignment:
+
+        r[k, v]   function->variable message of the k-th neighbor: min over u of cost(v, u) + q_k[u]
+        beliefs   unary costs plus the sum of the r messages, the agent takes the first value with the lowest belief
+        q_out[k]  beliefs minus r[k], normalized to a minimum of 0 and damped with the previous message
+
+    The cost tables are layers of a stack shared by all the agents and the Neighbors objects (see
+    DCOP.stack_cost_tables), with rows indexed by the value of the lower id, and the messages of the neighbors of each
+    orientation are computed together on the layers gathered from the stack.
+    With value propagation, from iteration max_sum_value_propagation the function node of a neighbor with a lower id
+    costs the assigned value of that neighbor instead of minimizing over its values. The agent stops after
+    incomplete_iterations iterations.
+    """
+    trace_fields = Agent.trace_fields
+
+    def __init__(self, id_, D, dcop_id, damping=None, value_propagation=None):
+        Agent.__init__(self,id_,D)
+        self.damping = damping if damping is not None else Globals_.max_sum_damping
+        self.value_propagation = value_propagation if value_propagation is not None \
+            else Globals_.max_sum_value_propagation
+        self.neighbors_assignments = {}
+        self.constraints = {}
+        # the same generator as MGM.agent_random, so the anytime assignment starts from MGM's initial assignment
+        self.agent_random = random.Random((((dcop_id+1)+100)+((self.id_+1)+10))*17)
+        self.variable = self.agent_random.randint(0, D-1)
+        # a small preference per value that breaks the ties of symmetric constraints
+        self.values_noise = np.array([self.agent_random.random() for _ in range(D)]) * Globals_.max_sum_noise
+        self.unary_costs = np.zeros(D, dtype=np.int64)
+        self.neighbors_position = {}
+        self.tables = np.zeros((0, D, D), dtype=Globals_.cost_table_dtype)
+        self.tables_index = {}
+        self.q_in = np.zeros((0, D))
+        self.q_out = np.zeros((0, D))
+
+    def set_constraints(self):
+        """Keeps the stack of the cost tables of the edges (see DCOP.stack_cost_tables) and the layers of the neighbors,
+        split by orientation: the rows of a downstream neighbor's table are the agent's values, the columns of an
+        upstream one. Lazy cost tables are materialized once, into a stack of the agent's edges."""
+        n_objs = list(self.neighbors_obj_dict.values())
+        for neighbor_id, n_obj in self.neighbors_obj_dict.items():
+            self.constraints[neighbor_id] = n_obj.cost_table
+        D = len(self.values_noise)
+        if len(n_objs) != 0 and all(n_obj.tables_stack is not None for n_obj in n_objs):
+            self.tables = n_objs[0].tables_stack
+            self.tables_index = {n_id: n_obj.table_index for n_id, n_obj in self.neighbors_obj_dict.items()}
+        else:
+            # lazy cost tables (see problems.LazyCostTable) generate the full table on materialize
+            tables = []
+            for n_obj in n_objs:
+                materialize = getattr(n_obj.cost_table, "materialize", None)
+                tables.append(materialize() if materialize is not None else n_obj.cost_table)
+            self.tables = np.array(tables, dtype=Globals_.cost_table_dtype).reshape(len(tables), D, D)
+            self.tables_index = {n_id: k for k, n_id in enumerate(self.neighbors_obj_dict)}
+        self.neighbors_position = {n_id: k for k, n_id in enumerate(self.neighbors_agents_id)}
+        upstream_ids = [n_id for n_id in self.neighbors_agents_id if n_id < self.id_]
+        downstream_ids = [n_id for n_id in self.neighbors_agents_id if n_id > self.id_]
+        self.upstream_ids = upstream_ids
+        self.upstream_positions = np.array([self.neighbors_position[n_id] for n_id in upstream_ids], dtype=np.int64)
+        self.upstream_layers = np.array([self.tables_index[n_id] for n_id in upstream_ids], dtype=np.int64)
+        self.downstream_positions = np.array([self.neighbors_position[n_id] for n_id in downstream_ids], dtype=np.int64)
+        self.downstream_layers = np.array([self.tables_index[n_id] for n_id in downstream_ids], dtype=np.int64)
+        if len(self.q_in) != len(self.neighbors_agents_id):
+            self.q_in = np.zeros((len(self.neighbors_agents_id), D))
+            self.q_out = np.zeros((len(self.neighbors_agents_id), D))
+
+    def initialize(self):
+        """Sets up constraints and sends the initial (zero) messages and assignment to neighbors."""
+        self.set_constraints()
+        self.send_msgs()
+
+    def send_msgs(self):
+        """Sends every neighbor its variable->function message and the agent's assignment."""
+        msgs = []
+        for k, n_id in enumerate(self.neighbors_agents_id):
+            msgs.append(Msg(sender=self.id_, receiver=n_id, information=(self.q_out[k], self.variable),
+                            msg_type=MaxSum_Msg.q_and_assignment))
+        self.outbox.insert(msgs)
+
+    def update_msgs_in_context(self, msgs):
+        for msg in msgs:
+            q, assignment = msg.information
+            self.q_in[self.neighbors_position[msg.sender]] = q
+            self.neighbors_assignments[msg.sender] = assignment
+
+    def change_status_after_update_msgs_in_context(self, msgs):
+        pass
+
+    def is_compute_in_this_iteration(self):
+        return not self.is_algorithm_complete()
+
+    def compute(self):
+        """Computes the function->variable messages of all the neighbors, the beliefs, the assignment and the next
+        variable->function messages."""
+        D = len(self.values_noise)
+        r = np.empty((len(self.neighbors_agents_id), D))
+        if len(self.downstream_layers) != 0:
+            tables = self.tables[self.downstream_layers]
+            r[self.downstream_positions] = (tables + self.q_in[self.downstream_positions, np.newaxis, :]).min(axis=2)
+        if len(self.upstream_layers) != 0:
+            if self.value_propagation is not None and self.local_clock >= self.value_propagation:
+                assignments = [self.neighbors_assignments[n_id] for n_id in self.upstream_ids]
+                r[self.upstream_positions] = self.tables[self.upstream_layers, assignments, :]
+            else:
+                tables = self.tables[self.upstream_layers]
+                r[self.upstream_positions] = (tables + self.q_in[self.upstream_positions, :, np.newaxis]).min(axis=1)
+        beliefs = self.get_unary_costs() + r.sum(axis=0)
+        self.atomic_operations = self.atomic_operations + len(self.neighbors_agents_id) * D * D
+
+        q = beliefs - r
+        q = q - q.min(axis=1, keepdims=True)
+        self.q_out = self.damping * self.q_out + (1 - self.damping) * q
+        if len(self.domain) == len(beliefs):
+            self.variable = int(np.argmin(beliefs))
+        else:
+            self.variable = self.domain[int(np.argmin(beliefs[self.domain]))]
+
+    def get_values_costs_with(self, neighbor_id, neighbor_asgmt):
+        """The costs of all the values of the agent with the neighbor assigned neighbor_asgmt."""
+        table = self.tables[self.tables_index[neighbor_id]]
+        if self.id_ < neighbor_id:
+            return table[:, neighbor_asgmt]
+        return table[neighbor_asgmt, :]
+
+    def get_unary_costs(self):
+        """The unary costs of every value, with the values' preferences."""
+        return self.unary_costs + self.values_noise
+
+    def change_status_after_send_msgs(self):
+        pass
+
+    def calc_local_cost(self):
+        """The local cost of the current assignment with the neighbors' assignments context."""
+        local_cost = 0
+        for neighbor_id, neighbor_variable in self.neighbors_assignments.items():
+            local_cost += self.get_values_costs_with(neighbor_id, neighbor_variable)[self.variable]
+        self.atomic_operations = self.atomic_operations + len(self.neighbors_assignments)
+        return local_cost
+
+    def is_algorithm_complete(self):
+        """Agents without neighbors have nothing to do; the others stop after incomplete_iterations iterations."""
+        if len(self.neighbors_agents_id) == 0:
+            return True
+        return IncompleteAlgorithm.is_algorithm_complete(self)
+
+    def __str__(self):
+        return f'MaxSum_Agent_{self.id_} - {self.variable}'
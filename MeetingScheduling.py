@@ -1,73 +1,138 @@
-from Meeting_Agent import Meeting
+import bisect
+import itertools
+
+from Meeting_Agent import Meeting, DSA_Meeting, MaxSum_Meeting
 from problems import *
 
 
+class SortedExcludingView:
+    """
+    Read-only sequence of the items of a sorted list that are not in a small excluded set, in the same order,
+    without building the filtered list. random.choice on the view draws the same item as on the filtered list.
+    """
+    def __init__(self, sorted_items, excluded):
+        self.sorted_items = sorted_items
+        self.excluded_positions = []
+        for item in excluded:
+            position = bisect.bisect_left(sorted_items, item)
+            if position < len(sorted_items) and sorted_items[position] == item:
+                self.excluded_positions.append(position)
+        self.excluded_positions.sort()
+
+    def __len__(self):
+        return len(self.sorted_items) - len(self.excluded_positions)
+
+    def __getitem__(self, index):
+        if index < 0 or index >= len(self):
+            raise IndexError("index out of range")
+        for position in self.excluded_positions:
+            if position <= index:
+                index = index + 1
+            else:
+                break
+        return self.sorted_items[index]
+
+
 class DCOP_MeetingScheduling(DCOP):
-    def __init__(self, id_, A, D, dcop_name, algorithm, min_meeting_participant=2):
+    def __init__(self, id_, A, D, dcop_name, algorithm, min_meeting_participant=2, instance=None):
         DCOP.__init__(self, id_, A, D, dcop_name, algorithm)
         self.M = meetings
         self.meetings_per_agent = meetings_per_agent
         self.min_meeting_participant = min_meeting_participant
+        if instance is not None:
+            self.M = instance.meetings
+            self.meetings_per_agent = instance.meetings_per_agent
+            self.min_meeting_participant = instance.min_meeting_participant
 
-        if A * meetings_per_agent < meetings * min_meeting_participant:
+        if A * self.meetings_per_agent < self.M * self.min_meeting_participant:
             raise ValueError("Not enough agents to fulfill minimum meeting participants.")
-        if meetings_per_agent > meetings:
+        if self.meetings_per_agent > self.M:
             raise ValueError("meetings_per_agent cannot exceed the total number of meetings.")
 
         self.rnd_meetings_assignments = random.Random((id_+6)*17)
 
+        if instance is None:
+            # Generate agent assignments to meetings
+            self.agent_meetings = {agent_id: set() for agent_id in range(1, self.A + 1)}
+            self.meeting_participants = {meeting_id: set() for meeting_id in range(1, self.M + 1)}
 
-        # Generate agent assignments to meetings
-        self.agent_meetings = {agent_id: set() for agent_id in range(1, self.A + 1)}
-        self.meeting_participants = {meeting_id: set() for meeting_id in range(1, self.M + 1)}
-
-        # Assign minimum participants to each meeting
-        self.assign_minimum_participants_to_meetings()
+            # Assign minimum participants to each meeting
+            self.assign_minimum_participants_to_meetings()
 
-        # Assign each agent to the required number of meetings
-        self.assign_agents_to_meetings()
+            # Assign each agent to the required number of meetings
+            self.assign_agents_to_meetings()
 
-        # Create unary costs for each agent
-        self.create_unary_costs_for_agents()
+            # Create unary costs for each agent
+            self.create_unary_costs_for_agents()
+        else:
+            # Read the assignments and the unary costs that were generated when the instance was saved
+            self.load_meetings_assignments(instance)
 
         # Meeting costs for individual agents
         self.meeting_individual_costs = self.create_meeting_agent_costs()
 
         # Aggregate meeting costs
-        self.meeting_total_costs = self.aggregate_meeting_costs()
+        if instance is None:
+            self.meeting_total_costs = self.aggregate_meeting_costs()
+        else:
+            self.meeting_total_costs = instance.get_meeting_total_costs()
 
         # Find pairs of meetings with mutual participants
-        self.meeting_neighbors = self.find_meeting_with_mutual_participants()
+        if instance is None:
+            self.meeting_neighbors = self.find_meeting_with_mutual_participants()
+        else:
+            self.meeting_neighbors = [tuple(edge) for edge in instance.get_edges()]
 
         self.original_agents = self.agents
         self.agents = []  # meeting agents
         self.create_meetings()
         self.neighbors = []
-        self.create_meetings_neighbors()
+        if instance is None:
+            self.create_meetings_neighbors()
+        else:
+            self.load_neighbors(instance)
+        self.create_neighbors_index()
+        if self.algorithm == Algorithm.max_sum:
+            self.stack_cost_tables()
         self.connect_agents_to_neighbors()
         self.mailer = Mailer(self.agents)
         self.global_clock = 0
         self.inform_root()
         self.records_dcop = {}
 
+    def load_meetings_assignments(self, instance):
+        """
+        Restores the participants of each meeting and the unary costs of each agent from a stored instance.
+        """
+        self.agent_meetings = {agent_id: set() for agent_id in range(1, self.A + 1)}
+        self.meeting_participants = instance.get_meeting_participants()
+        for meeting_id, participants in self.meeting_participants.items():
+            for agent_id in participants:
+                self.agent_meetings[agent_id].add(meeting_id)
+        agents_unary_costs = instance.get_agents_unary_costs()
+        for agent in self.agents:
+            agent.unary_constraint = agents_unary_costs[agent.id_]
+
     def assign_minimum_participants_to_meetings(self):
         """
         Ensures each meeting has at least the minimum number of participants.
+        Agents with free capacity are kept in a sorted list that is updated as seats are assigned, so a seat costs
+        O(log A) instead of a scan over all agents. Candidates are drawn exactly as from the filtered list of eligible
+        agents, so instances are unchanged.
         """
+        agents_with_capacity = list(range(1, self.A + 1))
         meeting_id=1 # Start with the first meeting
         while meeting_id<=self.M:
             while len(self.meeting_participants[meeting_id]) < self.min_meeting_participant:
-                # Find agents eligible to join the current meeting
-                available_agents = [
-                    agent_id for agent_id in range(1, self.A + 1)
-                    if len(self.agent_meetings[agent_id]) < self.meetings_per_agent and
-                         agent_id not in self.meeting_participants[meeting_id]]
+                # Agents eligible to join the current meeting
+                available_agents = SortedExcludingView(agents_with_capacity, self.meeting_participants[meeting_id])
                 # If no eligible agents are found, handle the issue
-                if not available_agents:
+                if len(available_agents) == 0:
                     # Check if the overall parameters can theoretically allow for a valid assignment
                     if self.meetings_per_agent*self.A >= self.M*self.min_meeting_participant:
                         self.agent_meetings = {agent_id: set() for agent_id in range(1, self.A + 1)}
                         self.meeting_participants = {meeting_id: set() for meeting_id in range(1, self.M + 1)}
+                        agents_with_capacity = list(range(1, self.A + 1))
                         meeting_id = 0
                         break  # Exit the current loop to restart the assignment process
                     else:
@@ -77,6 +142,8 @@ class DCOP_MeetingScheduling(DCOP):
                 candidate_agent = self.rnd_meetings_assignments.choice(available_agents)
                 self.meeting_participants[meeting_id].add(candidate_agent)
                 self.agent_meetings[candidate_agent].add(meeting_id)
+                if len(self.agent_meetings[candidate_agent]) == self.meetings_per_agent:
+                    del agents_with_capacity[bisect.bisect_left(agents_with_capacity, candidate_agent)]
 
             # Move to the next meeting after successfully assigning participants
             meeting_id += 1
@@ -84,28 +151,31 @@ class DCOP_MeetingScheduling(DCOP):
     def assign_agents_to_meetings(self):
         """
         Ensures each agent is assigned to the required number of meetings.
+        Meetings that can still take participants are kept in a sorted list that is updated incrementally.
         """
+        meetings_with_capacity = [meeting_id for meeting_id in range(1, self.M + 1)
+                                  if len(self.meeting_participants[meeting_id]) < self.A]
         for agent_id in range(1, self.A + 1):
             while len(self.agent_meetings[agent_id]) < self.meetings_per_agent:
                 # Select meetings that do not already include the agent and do not include more agents than possible
-                available_meetings = [
-                    meeting_id for meeting_id in range(1, self.M + 1)
-                    if
-                    len(self.meeting_participants[meeting_id]) < self.A and agent_id not in self.meeting_participants[meeting_id]
-                ]
-                if not available_meetings:
+                available_meetings = SortedExcludingView(meetings_with_capacity, self.agent_meetings[agent_id])
+                if len(available_meetings) == 0:
                     raise ValueError("Not enough meetings available to meet constraints.")
                 candidate_meeting = self.rnd_meetings_assignments.choice(available_meetings)
                 self.meeting_participants[candidate_meeting].add(agent_id)
                 self.agent_meetings[agent_id].add(candidate_meeting)
+                if len(self.meeting_participants[candidate_meeting]) == self.A:
+                    del meetings_with_capacity[bisect.bisect_left(meetings_with_capacity, candidate_meeting)]
 
     def create_unary_costs_for_agents(self):
         """
-        Calls the `create_unary_costs` method for each agent in the DCOP_MeetingScheduling instance.
-        This initializes the unary costs for all agents.
+        Draws the preferred time slot of each agent and computes the unary costs of all agents as one (A, D) array,
+        10 per time slot of distance from the preferred one.
         """
-        for agent in self.agents:
-            agent.create_unary_costs(self.dcop_id)
+        preferred_time_slots = np.array([agent.get_preferred_time_slot(self.dcop_id) for agent in self.agents])
+        self.agents_unary_costs = 10 * np.abs(np.arange(self.D)[np.newaxis, :] - preferred_time_slots[:, np.newaxis])
+        for agent, costs in zip(self.agents, self.agents_unary_costs.tolist()):
+            agent.unary_constraint = dict(enumerate(costs))
 
     def create_meeting_agent_costs(self):
         """
@@ -133,40 +203,36 @@ class DCOP_MeetingScheduling(DCOP):
     def aggregate_meeting_costs(self):
         """
         Aggregates the sum of unary costs for all agents for each meeting at every time slot.
-        Utilizes the `create_meeting_agent_costs` method to get agent costs for meetings.
+        The sum is taken over the rows of the agents' unary costs array, one row per (meeting, participant) seat.
         Returns:
             dict: A dictionary where keys are meeting IDs and values are dictionaries of time slots and their aggregated costs.
         """
-        # Initialize a dictionary for each meeting with time slot costs starting from 0
-        meeting_costs = {meeting_id: {time_slot: 0 for time_slot in range(self.D)}
-                         for meeting_id in range(1, self.M + 1)}
-
-        # Get the agent costs for each meeting
-        meeting_agent_costs = self.meeting_individual_costs
+        seats_meetings = []
+        seats_agents = []
+        for meeting_id, participants in self.meeting_participants.items():
+            for agent_id in participants:
+                seats_meetings.append(meeting_id - 1)
+                seats_agents.append(agent_id - 1)
 
-        # Aggregate costs for each time slot in each meeting
-        for meeting_id, agent_costs in meeting_agent_costs.items():
-            for agent_id, time_slot_costs in agent_costs.items():
-                for time_slot, cost in time_slot_costs.items():
-                    meeting_costs[meeting_id][time_slot] += cost
+        meeting_costs = np.zeros((self.M, self.D), dtype=self.agents_unary_costs.dtype)
+        np.add.at(meeting_costs, np.array(seats_meetings, dtype=np.int64),
+                  self.agents_unary_costs[np.array(seats_agents, dtype=np.int64)])
 
-        return meeting_costs
+        return {meeting_index + 1: dict(enumerate(costs)) for meeting_index, costs in enumerate(meeting_costs.tolist())}
 
     def find_meeting_with_mutual_participants(self):
         """
         Finds pairs of meetings that share at least one mutual participant.
+        Pairs are read from the agent -> meetings index, so the cost is O(sum of meetings_per_agent^2)
+        instead of comparing all pairs of meetings.
         Returns:
             list: A sorted list of unique pairs of meeting IDs that share mutual participants.
         """
         meeting_pairs = set()  # Use a set to avoid duplicate pairs
 
-        # Iterate through all pairs of meetings
-        for meeting1, participants1 in self.meeting_participants.items():
-            for meeting2, participants2 in self.meeting_participants.items():
-                if meeting1 < meeting2:  # Avoid duplicate and self-comparison
-                    # Check if the two meetings share at least one participant
-                    if participants1 & participants2:  # Set intersection to find mutual participants
-                        meeting_pairs.add((meeting1, meeting2))  # Add the pair as a neighbor
+        # Every two meetings of the same agent share that agent
+        for agent_meetings in self.agent_meetings.values():
+            meeting_pairs.update(itertools.combinations(sorted(agent_meetings), 2))
 
         # Convert to a sorted list if needed for consistent order
         meeting_pairs = sorted(meeting_pairs)
@@ -180,6 +246,12 @@ class DCOP_MeetingScheduling(DCOP):
             if self.algorithm == Algorithm.MGM:
                 self.agents.append(Meeting(i + 1, self.D, self.dcop_id, self.meeting_individual_costs[i + 1],
                                            self.meeting_total_costs[i + 1]))
+            if self.algorithm == Algorithm.dsa_c:
+                self.agents.append(DSA_Meeting(i + 1, self.D, self.dcop_id, self.meeting_individual_costs[i + 1],
+                                               self.meeting_total_costs[i + 1]))
+            if self.algorithm == Algorithm.max_sum:
+                self.agents.append(MaxSum_Meeting(i + 1, self.D, self.dcop_id, self.meeting_individual_costs[i + 1],
+                                                  self.meeting_total_costs[i + 1]))
 
     def create_meetings_neighbors(self):
         """
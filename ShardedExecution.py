@@ -0,0 +1,359 @@
+"""
+Multi-process execution of a DCOP: the agents are partitioned into shards, every shard runs in a forked worker
+process, and the messages that cross shards are exchanged at every synchronous tick through a transport (shared
+memory ring buffers, or TCP/Unix sockets, see Transport). Messages are delivered in the order of their senders in dcop.agents, as in the single process loop, so the
+results are the same. The best assignment of anytime algorithms is tracked with the parts of the global cost that the
+shards hold (see ShardAnytime).
+"""
+import heapq
+import io
+import multiprocessing
+import pickle
+import time
+import traceback
+
+import numpy as np
+
+import Globals_
+from Globals_ import Msg
+from Transport import SharedMemoryTransport, SocketTransport
+
+
+def partition_agents(dcop, parts):
+    """
+    Splits the agents into parts of (almost) equal size with few cut edges. Every part is grown from a seed by
+    repeatedly adding the unassigned agent with the most neighbors already in the part, then boundary agents move to
+    the part that holds most of their neighbors when it reduces the cut and keeps the parts balanced.
+    Returns the part of every agent, by position in dcop.agents.
+    """
+    n = len(dcop.agents)
+    position = {a.id_: i for i, a in enumerate(dcop.agents)}
+    indptr = dcop.neighbors_indptr
+    neighbors = np.fromiter((position[n_id] for n_id in dcop.neighbors_ids.tolist()), dtype=np.int64,
+                            count=len(dcop.neighbors_ids))
+    size = -(-n // parts)
+    part = np.full(n, -1, dtype=np.int64)
+
+    next_seed = 0
+    for p in range(parts):
+        heap = []
+        gain = {}
+        count = 0
+        while count < size:
+            if len(heap) == 0:
+                while next_seed < n and part[next_seed] != -1:
+                    next_seed = next_seed + 1
+                if next_seed == n:
+                    break
+                heapq.heappush(heap, (0, next_seed))
+            g, v = heapq.heappop(heap)
+            if part[v] != -1 or -g != gain.get(v, 0):
+                continue
+            part[v] = p
+            count = count + 1
+            for u in neighbors[indptr[v]:indptr[v + 1]].tolist():
+                if part[u] == -1:
+                    gain[u] = gain.get(u, 0) + 1
+                    heapq.heappush(heap, (-gain[u], u))
+
+    sizes = np.bincount(part, minlength=parts)
+    slack = max(1, size // 32)
+    for v in range(n):
+        own = part[v]
+        if sizes[own] <= size - slack:
+            continue
+        counts = np.bincount(part[neighbors[indptr[v]:indptr[v + 1]]], minlength=parts)
+        counts[sizes >= size + slack] = -1
+        best = int(np.argmax(counts))
+        if counts[best] > counts[own]:
+            part[v] = best
+            sizes[own] = sizes[own] - 1
+            sizes[best] = sizes[best] + 1
+    return part
+
+
+def create_transport():
+    """Creates the transport selected by Globals_.sharded_transport."""
+    if Globals_.sharded_transport == "shared_memory":
+        return SharedMemoryTransport(Globals_.sharded_ring_buffer_bytes)
+    if Globals_.sharded_transport in ("tcp", "unix"):
+        return SocketTransport(Globals_.sharded_transport, Globals_.sharded_tcp_host)
+    raise Exception("unknown sharded transport " + str(Globals_.sharded_transport))
+
+
+class ShardOutbox():
+    """Outbox of the agents of a shard, it keeps the messages sent in an iteration until the tick boundary."""
+
+    def __init__(self):
+        self.sent = []
+
+    def insert(self, list_of_msgs):
+        self.sent.extend(list_of_msgs)
+
+
+class ShardAnytime():
+    """
+    The part of the AnytimeTracker of a sharded run that a shard holds. The shard knows the assignment of its agents
+    and, from the boundary assignments sent with the messages of every tick, of the agents of other shards that
+    neighbor them, which is enough for the part of the global cost it holds (see AnytimeTracker.get_partial_cost).
+    The parts are summed over the shards with the counts of the tick, and every shard keeps the assignment of its
+    agents at the tick with the lowest global cost.
+    """
+
+    def __init__(self, tracker, dcop, part, worker):
+        self.tracker = tracker
+        self.dcop = dcop
+        agents = part == worker
+        self.positions = np.flatnonzero(agents)
+        self.entries = tracker.get_held_entries(agents)
+        self.x = np.array([a.variable for a in dcop.agents], dtype=np.int64)
+        src_part = part[tracker.src]
+        dst_part = part[tracker.dst]
+        self.sent_positions = {}
+        self.received_positions = {}
+        for other in range(int(part.max()) + 1):
+            if other != worker:
+                self.sent_positions[other] = np.unique(tracker.src[(src_part == worker) & (dst_part == other)])
+                self.received_positions[other] = np.unique(tracker.src[(src_part == other) & (dst_part == worker)])
+        self.best_x = None
+        self.best_cost = None
+        self.best_clock = None
+
+    def refresh(self):
+        """Reads the assignments of the agents of the shard after an iteration."""
+        agents = self.dcop.agents
+        self.x[self.positions] = [agents[position].variable for position in self.positions.tolist()]
+
+    def get_boundary_variables(self, dst):
+        return self.x[self.sent_positions[dst]].tobytes()
+
+    def set_boundary_variables(self, src, variables):
+        self.x[self.received_positions[src]] = np.frombuffer(variables, dtype=np.int64)
+
+    def get_cost(self):
+        return self.tracker.get_partial_cost(self.x, self.entries, self.positions)
+
+    def update(self, global_clock, cost):
+        if self.best_cost is None or cost < self.best_cost:
+            self.best_x = self.x[self.positions].copy()
+            self.best_cost = cost
+            self.best_clock = global_clock
+
+    def write_back(self):
+        for position, value in zip(self.positions.tolist(), self.best_x.tolist()):
+            self.dcop.agents[position].anytime_variable = value
+        return self.best_cost, self.best_clock
+
+
+def get_structure_registry(dcop):
+    """The objects of the DCOP structure, which do not change during a run, in an order that is the same in every
+    copy of the DCOP (forked or created again with the same parameters)."""
+    registry = [dcop] + dcop.agents + dcop.neighbors + [n.cost_table for n in dcop.neighbors]
+    for a in dcop.agents:
+        registry.extend((a.domain, a.neighbors_obj_dict, a.neighbors_obj, a.neighbors_agents_id))
+    return registry
+
+
+class RefPickler(pickle.Pickler):
+    """Pickles the objects of the DCOP structure (agents, neighbors, cost tables) as references to the copies every
+    process already holds."""
+
+    def __init__(self, file, refs):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.refs = refs
+
+    def persistent_id(self, obj):
+        return self.refs.get(id(obj))
+
+
+class RefUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, registry):
+        pickle.Unpickler.__init__(self, file)
+        self.registry = registry
+
+    def persistent_load(self, pid):
+        return self.registry[pid]
+
+
+class ShardedEngine():
+    """Runs DCOP.execute over Globals_.sharded_workers forked processes (see the module docstring). The transport
+    defaults to the one selected by Globals_.sharded_transport."""
+
+    not_transferred = ("inbox", "outbox")
+
+    def __init__(self, dcop, workers, transport=None):
+        self.dcop = dcop
+        self.workers = workers
+        self.transport = transport if transport is not None else create_transport()
+        self.part = partition_agents(dcop, workers)
+        self.shards = [np.flatnonzero(self.part == w).tolist() for w in range(workers)]
+        self.agents_position = {a.id_: i for i, a in enumerate(dcop.agents)}
+        self.part_by_id = {a.id_: int(self.part[i]) for i, a in enumerate(dcop.agents)}
+        self.registry = get_structure_registry(dcop)
+        self.refs = {id(obj): i for i, obj in enumerate(self.registry)}
+        # created before the workers are forked, so they share its arrays
+        self.anytime = dcop.create_anytime_tracker()
+
+    def dumps(self, obj):
+        file = io.BytesIO()
+        RefPickler(file, self.refs).dump(obj)
+        return file.getvalue()
+
+    def loads(self, data):
+        return RefUnpickler(io.BytesIO(data), self.registry).load()
+
+    def execute(self):
+        ctx = multiprocessing.get_context("fork")
+        self.transport.setup(ctx, self.workers)
+        processes = []
+        connections = []
+        start_time = time.perf_counter()
+        try:
+            for w in range(self.workers):
+                receiver, sender = ctx.Pipe(duplex=False)
+                process = ctx.Process(target=self.run_shard, args=(w, sender))
+                process.start()
+                sender.close()
+                processes.append(process)
+                connections.append(receiver)
+            results = [self.loads(connection.recv_bytes()) for connection in connections]
+        finally:
+            for process in processes:
+                process.join()
+            self.transport.close()
+        solve_time = time.perf_counter() - start_time
+
+        for result in results:
+            if result[0] == "error":
+                raise Exception("shard " + str(result[1]) + " failed:\n" + result[2])
+        for _, global_clock, last_iteration_clock, bytes_sent, msgs_per_tick, anytime, agents_states in results:
+            for position, state in agents_states.items():
+                for k, v in state.items():
+                    setattr(self.dcop.agents[position], k, v)
+        self.dcop.global_clock = global_clock
+        # every shard counted the messages delivered to its agents at the same ticks
+        self.dcop.mailer.msgs_per_tick.extend(sum(counts) for counts in zip(*(result[4] for result in results)))
+        if self.anytime is not None:
+            best_cost, best_clock = anytime
+            self.anytime.set_state(([a.anytime_variable for a in self.dcop.agents], best_cost, best_clock))
+            self.anytime.write_back()
+            self.dcop.anytime = self.anytime
+        for a in self.dcop.agents:
+            a.global_clock = last_iteration_clock
+        self.dcop.sharded_metrics = {"workers": self.workers, "transport": type(self.transport).__name__,
+                                     "solve_time": solve_time, "bytes_sent": sum(result[3] for result in results)}
+
+    def run_shard(self, worker, connection):
+        try:
+            self.transport.connect(worker)
+            result = self.run_shard_iterations(worker)
+        except BaseException:
+            self.transport.abort()
+            result = ("error", worker, traceback.format_exc())
+        connection.send_bytes(self.dumps(result))
+        connection.close()
+
+    def run_shard_iterations(self, worker):
+        """Runs the iterations of the agents of the shard, the transport must be connected, and returns the state of
+        its agents with the amount of messages they received at every tick. Workers started on separate hosts call it
+        directly, with a SocketTransport given the addresses of all the workers."""
+        dcop = self.dcop
+        shard = self.shards[worker]
+        mailer = type(dcop.mailer)(dcop.agents)
+        outbox = ShardOutbox()
+        for a in dcop.agents:
+            a.outbox = outbox
+        dcop.mailer = mailer
+        dcop.agents_position = self.agents_position
+
+        for position in shard:
+            dcop.agents[position].initialize()
+        dcop.incomplete_agents = set()
+        for position in shard:
+            if not dcop.agents[position].is_algorithm_complete():
+                dcop.incomplete_agents.add(dcop.agents[position].id_)
+
+        anytime = None
+        if self.anytime is not None:
+            anytime = ShardAnytime(self.anytime, dcop, self.part, worker)
+        global_clock = 0
+        last_iteration_clock = 0
+        msgs_per_tick = []
+        while True:
+            msgs, incomplete = self.exchange_msgs(worker, outbox, global_clock, anytime)
+            cost = anytime.get_cost() if anytime is not None else 0
+            if incomplete == 0:
+                if anytime is not None:
+                    anytime.update(global_clock, self.exchange_sums(2 * global_clock + 1, [cost])[0])
+                break
+            global_clock = global_clock + 1
+            msgs.sort(key=lambda msg: self.agents_position[msg.sender])
+            mailer.insert(msgs)
+            receivers = mailer.place_messages_in_agents_inbox()
+            amount_of_receivers, cost = self.exchange_sums(2 * global_clock - 1, [len(receivers), cost])
+            if anytime is not None:
+                anytime.update(global_clock - 1, cost)
+            if amount_of_receivers == 0:
+                if worker == 0:
+                    print("DCOP:",str(dcop.dcop_id),"global clock:",str(global_clock), "is over because there are no messages in system ")
+                break
+            msgs_per_tick.append(len(msgs))
+            dcop.global_clock = global_clock
+            dcop.agents_perform_iteration(global_clock, receivers)
+            last_iteration_clock = global_clock
+
+        anytime_state = anytime.write_back() if anytime is not None else None
+        agents_states = {}
+        for position in shard:
+            a = dcop.agents[position]
+            agents_states[position] = {k: v for k, v in vars(a).items() if k not in self.not_transferred}
+        return "done", global_clock, last_iteration_clock, self.transport.bytes_sent, msgs_per_tick, anytime_state, \
+            agents_states
+
+    def exchange_msgs(self, worker, outbox, global_clock, anytime=None):
+        """Sends every other shard the messages addressed to its agents, with the amount of incomplete agents of this
+        shard and the assignments of its boundary agents for anytime runs, and returns the messages addressed to this
+        shard and the amount of incomplete agents of all shards."""
+        msgs_by_shard = [[] for _ in range(self.workers)]
+        for msg in outbox.sent:
+            msgs_by_shard[self.part_by_id[msg.receiver]].append(msg)
+        outbox.sent = []
+        incomplete = len(self.dcop.incomplete_agents)
+        if anytime is not None:
+            anytime.refresh()
+        payloads = {}
+        for dst in range(self.workers):
+            if dst != worker:
+                variables = anytime.get_boundary_variables(dst) if anytime is not None else None
+                payloads[dst] = self.dumps((incomplete, encode_msgs(msgs_by_shard[dst]), variables))
+        received = self.transport.exchange(2 * global_clock, payloads)
+
+        msgs = msgs_by_shard[worker]
+        for src, payload in received.items():
+            src_incomplete, encoded_msgs, variables = self.loads(payload)
+            incomplete = incomplete + src_incomplete
+            msgs.extend(decode_msgs(encoded_msgs))
+            if anytime is not None:
+                anytime.set_boundary_variables(src, variables)
+        return msgs, incomplete
+
+    def exchange_sums(self, exchange, values):
+        """Returns the sums of the int values over all shards."""
+        values = np.array(values, dtype=np.int64)
+        payload = values.tobytes()
+        payloads = {dst: payload for dst in range(self.workers) if dst != self.transport.worker}
+        received = self.transport.exchange(exchange, payloads)
+        for payload in received.values():
+            values = values + np.frombuffer(payload, dtype=np.int64)
+        return values.tolist()
+
+
+def encode_msgs(msgs):
+    """Messages travel between shards as plain tuples, which pickle more compactly than Msg objects."""
+    return [(msg.sender, msg.receiver, msg.msg_type, msg.information) for msg in msgs]
+
+
+def decode_msgs(encoded_msgs):
+    return [Msg(sender=sender, receiver=receiver, information=information, msg_type=msg_type)
+            for sender, receiver, msg_type, information in encoded_msgs]
@@ -0,0 +1,323 @@
+"""
+Multi-threaded execution of a DCOP: the agents are partitioned over a bounded pool of worker threads (see
+ShardedExecution.partition_agents), and every worker blocks on an UnboundedBuffer inbox that receives the items
+addressed to all of its agents. Neighbors exchange the messages of each iteration in envelopes (possibly empty ones),
+and an agent runs its next iteration once the envelopes of all its neighbors arrived, so the algorithms see the same
+iterations as in DCOP.execute.
+
+DCOP.execute stops after the first tick at which no agent is incomplete or no message was sent. An envelope also tells
+whether its sender is incomplete and whether it sent any message in the iteration, so an agent that sees an incomplete
+agent and a sent message among itself and its neighbors knows that the next iteration runs, and goes on without
+waiting for any other agent. Only the agents of quiet neighborhoods need the global decision, which is detected with a
+token that circulates over the workers in the style of Safra's algorithm: a worker forwards the token of a tick once
+all its agents finished that tick, adding the amount of its incomplete agents and of the messages they sent, and the
+last worker decides the tick and sends the verdict to every worker, which starts the token of the next tick at the
+first one. No agent runs past a tick whose verdict is to stop, so the run ends at the same tick as DCOP.execute.
+Agents write their assignment of every tick to an array of the tick, which the deciding worker hands to the
+AnytimeTracker of anytime algorithms.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from ShardedExecution import partition_agents
+
+
+class AgentsAborted(Exception):
+    pass
+
+
+class ThreadOutbox():
+    """Outbox of an agent in a threaded run, it keeps the messages of the current iteration."""
+
+    def __init__(self):
+        self.sent = []
+
+    def insert(self, list_of_msgs):
+        self.sent.extend(list_of_msgs)
+
+
+class ThreadedAgentContext():
+    """The envelopes an agent received and did not use yet, by tick, and its state in the run."""
+
+    def __init__(self, agent, position, worker):
+        self.agent = agent
+        self.position = position
+        self.worker = worker
+        self.degree = len(agent.neighbors_agents_id)
+        self.envelopes = {}
+        self.tick = 0
+        self.incomplete = False
+        self.sent = False
+        self.scheduled = False
+        self.finish_time = 0.0
+        self.compute_time = 0.0
+        self.wait_time = 0.0
+        self.iterations = 0
+
+
+class ThreadedWorker():
+    """A worker thread and the agents it runs; ticks holds the [finished agents, incomplete agents, messages sent] of
+    the ticks its agents did not all finish or whose token did not pass yet."""
+
+    def __init__(self, index, buffer):
+        self.index = index
+        self.buffer = buffer
+        self.contexts = []
+        self.ready = deque()
+        self.ticks = {}
+        self.token = None
+        self.last_proceed = -1
+        self.stopped = False
+        self.wait_time = 0.0
+
+
+class ThreadedRunner():
+    """Runs a DCOP on a pool of worker threads (see the module docstring), all the cores when workers is None.
+    buffer_class is the blocking inbox class."""
+
+    def __init__(self, dcop, buffer_class, workers=None):
+        self.dcop = dcop
+        workers = workers if workers is not None else os.cpu_count()
+        workers = max(1, min(workers, len(dcop.agents)))
+        part = partition_agents(dcop, workers)
+        self.agents_position = {a.id_: i for i, a in enumerate(dcop.agents)}
+        self.workers = []
+        self.contexts = {}
+        for w in range(workers):
+            positions = [i for i in range(len(dcop.agents)) if part[i] == w]
+            if len(positions) == 0:
+                continue
+            worker = ThreadedWorker(len(self.workers), buffer_class())
+            for position in positions:
+                context = ThreadedAgentContext(dcop.agents[position], position, worker)
+                worker.contexts.append(context)
+                self.contexts[context.agent.id_] = context
+            self.workers.append(worker)
+        self.workers[0].token = ("token", 0, 0, 0)
+        self.anytime = dcop.create_anytime_tracker()
+        # the assignments of the ticks that are not decided yet, for the best assignment of anytime algorithms
+        self.ticks_variables = {}
+        self.amount_of_msgs = 0
+        self.msgs_per_tick = []
+        self.last_tick = None
+        self.stopped_complete = None
+
+    def execute(self):
+        dcop = self.dcop
+        start_time = time.perf_counter()
+        threads = [threading.Thread(target=self.run_worker, args=(worker,)) for worker in self.workers]
+        self.errors = []
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            # the agents send through the mailer again, so the dcop can be executed after the run
+            for a in dcop.agents:
+                a.outbox = dcop.mailer
+        wall_time = time.perf_counter() - start_time
+        for error in self.errors:
+            if not isinstance(error, AgentsAborted):
+                raise error
+
+        dcop.global_clock = self.last_tick if self.stopped_complete else self.last_tick + 1
+        for a in dcop.agents:
+            a.global_clock = self.last_tick
+        dcop.mailer.msgs_per_tick.extend(self.msgs_per_tick)
+        if self.anytime is not None:
+            self.anytime.write_back()
+            dcop.anytime = self.anytime
+        agents_timing = {}
+        for a_id, context in self.contexts.items():
+            agents_timing[a_id] = {"compute_time": context.compute_time, "wait_time": context.wait_time,
+                                   "iterations": context.iterations, "worker": context.worker.index}
+        dcop.threaded_metrics = {"global_clock": dcop.global_clock,
+                                 "wall_time": wall_time,
+                                 "workers": len(self.workers),
+                                 "msgs": self.amount_of_msgs,
+                                 "throughput": self.amount_of_msgs / wall_time if wall_time > 0 else 0.0,
+                                 "contentions": sum(worker.buffer.contentions for worker in self.workers),
+                                 "workers_wait_time": [worker.wait_time for worker in self.workers],
+                                 "agents_timing": agents_timing}
+        if not self.stopped_complete:
+            print("DCOP:",str(dcop.dcop_id),"global clock:",str(dcop.global_clock), "is over because there are no messages in system ")
+        return dcop.threaded_metrics
+
+    def run_worker(self, worker):
+        try:
+            for context in worker.contexts:
+                a = context.agent
+                a.outbox = ThreadOutbox()
+                start_time = time.perf_counter()
+                a.initialize()
+                context.compute_time = context.compute_time + time.perf_counter() - start_time
+                self.finish_tick(worker, context)
+            while not worker.stopped:
+                if len(worker.ready) != 0:
+                    self.run_iteration(worker, worker.ready.popleft())
+                else:
+                    for item in self.receive(worker):
+                        self.handle(worker, item)
+        except BaseException as error:
+            self.errors.append(error)
+            # release the workers that wait for this one
+            for other in self.workers:
+                other.buffer.insert([None])
+
+    def receive(self, worker):
+        start_time = time.perf_counter()
+        items = worker.buffer.extract()
+        worker.wait_time = worker.wait_time + time.perf_counter() - start_time
+        if items is None:
+            raise AgentsAborted()
+        return items
+
+    def handle(self, worker, item):
+        kind = item[0]
+        if kind == "envelope":
+            self.receive_envelope(worker, self.contexts[item[3]], item)
+        elif kind == "token":
+            worker.token = item
+            self.forward_token(worker)
+        else:
+            self.receive_verdict(worker, item[1], item[2])
+
+    def run_iteration(self, worker, context):
+        a = context.agent
+        context.scheduled = False
+        tick = context.tick + 1
+        envelopes = context.envelopes.pop(tick - 1, [])
+        envelopes.sort(key=lambda e: self.agents_position[e[2]])
+        msgs = []
+        for envelope in envelopes:
+            msgs.extend(envelope[4])
+        start_time = time.perf_counter()
+        context.wait_time = context.wait_time + start_time - context.finish_time
+        if len(msgs) != 0:
+            a.inbox.insert(msgs)
+            a.inbox.swap()
+        a.execute_iteration(tick)
+        context.compute_time = context.compute_time + time.perf_counter() - start_time
+        context.iterations = context.iterations + 1
+        context.tick = tick
+        self.finish_tick(worker, context)
+
+    def finish_tick(self, worker, context):
+        """Sends the envelopes of the tick the agent finished, counts it for the token and schedules the agent again
+        if it can go on."""
+        a = context.agent
+        tick = context.tick
+        context.incomplete = not a.is_algorithm_complete()
+        context.sent = len(a.outbox.sent) != 0
+        msgs_by_receiver = {n_id: [] for n_id in a.neighbors_agents_id}
+        for msg in a.outbox.sent:
+            if msg.receiver not in msgs_by_receiver:
+                raise Exception("A_" + str(a.id_) + " sent a message to A_" + str(msg.receiver) + " which is not its neighbor")
+            msgs_by_receiver[msg.receiver].append(msg)
+        amount_of_msgs = len(a.outbox.sent)
+        a.outbox.sent = []
+        if self.anytime is not None:
+            variables = self.ticks_variables.get(tick)
+            if variables is None:
+                variables = self.ticks_variables.setdefault(tick, np.zeros(len(self.contexts), dtype=np.int64))
+            variables[context.position] = a.variable
+
+        remote = {}
+        for receiver, msgs in msgs_by_receiver.items():
+            envelope = ("envelope", tick, a.id_, receiver, msgs, context.incomplete, context.sent)
+            receiver_context = self.contexts[receiver]
+            if receiver_context.worker is worker:
+                self.receive_envelope(worker, receiver_context, envelope)
+            else:
+                remote.setdefault(receiver_context.worker.index, []).append(envelope)
+        for index, envelopes in remote.items():
+            self.workers[index].buffer.insert(envelopes)
+
+        counts = worker.ticks.get(tick)
+        if counts is None:
+            counts = worker.ticks[tick] = [0, 0, 0]
+        counts[0] = counts[0] + 1
+        counts[1] = counts[1] + (1 if context.incomplete else 0)
+        counts[2] = counts[2] + amount_of_msgs
+        context.finish_time = time.perf_counter()
+        self.schedule(worker, context)
+        if counts[0] == len(worker.contexts):
+            self.forward_token(worker)
+
+    def receive_envelope(self, worker, context, envelope):
+        envelopes = context.envelopes.get(envelope[1])
+        if envelopes is None:
+            envelopes = context.envelopes[envelope[1]] = []
+        envelopes.append(envelope)
+        if envelope[1] == context.tick:
+            self.schedule(worker, context)
+
+    def schedule(self, worker, context):
+        """Adds the agent to the ready agents of its worker when it has the envelopes of all its neighbors for its tick
+        and it knows that the next tick runs: from the verdict of the tick, or from an incomplete agent and a sent
+        message among itself and its neighbors."""
+        if context.scheduled or worker.stopped:
+            return
+        envelopes = context.envelopes.get(context.tick, ())
+        if len(envelopes) < context.degree:
+            return
+        if context.tick > worker.last_proceed:
+            incomplete = context.incomplete or any(envelope[5] for envelope in envelopes)
+            sent = context.sent or any(envelope[6] for envelope in envelopes)
+            if not (incomplete and sent):
+                return
+        context.scheduled = True
+        worker.ready.append(context)
+
+    def forward_token(self, worker):
+        """Passes the token to the next worker once all the agents of this worker finished its tick; the last worker
+        decides the tick."""
+        token = worker.token
+        if token is None:
+            return
+        tick = token[1]
+        counts = worker.ticks.get(tick)
+        if counts is None or counts[0] < len(worker.contexts):
+            return
+        del worker.ticks[tick]
+        worker.token = None
+        token = ("token", tick, token[2] + counts[1], token[3] + counts[2])
+        if worker.index == len(self.workers) - 1:
+            self.decide(worker, token)
+        else:
+            self.workers[worker.index + 1].buffer.insert([token])
+
+    def decide(self, worker, token):
+        """The run goes on after the tick if an agent is incomplete and a message was sent, as in DCOP.execute."""
+        _, tick, incomplete, msgs = token
+        self.amount_of_msgs = self.amount_of_msgs + msgs
+        if self.anytime is not None:
+            self.anytime.update_assignment(tick, self.ticks_variables.pop(tick))
+        proceed = incomplete != 0 and msgs != 0
+        if proceed:
+            # the messages of the tick are delivered at the next one, counted as DCOP.execute does
+            self.msgs_per_tick.append(msgs)
+        else:
+            self.last_tick = tick
+            self.stopped_complete = incomplete == 0
+        for other in self.workers:
+            if other is not worker:
+                other.buffer.insert([("verdict", tick, proceed)])
+        self.receive_verdict(worker, tick, proceed)
+
+    def receive_verdict(self, worker, tick, proceed):
+        if not proceed:
+            worker.stopped = True
+            return
+        worker.last_proceed = tick
+        for context in worker.contexts:
+            if context.tick == tick:
+                self.schedule(worker, context)
+        if worker.index == 0:
+            worker.token = ("token", tick + 1, 0, 0)
+            self.forward_token(worker)
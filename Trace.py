@@ -0,0 +1,199 @@
+"""
+Message traces of DCOP.execute. The recorder appends to a binary log a record for every message (the tick it was
+sent in, sender, receiver, type and a fingerprint of its information) and, for every tick, a record with the traced
+fields (Agent.trace_fields) that changed in the agents that ran the iteration. The replayer reads the log and rebuilds
+the traced state of the agents at any tick without running the algorithm. The records of a tick are buffered and
+written together at the end of the tick.
+
+Records start with a kind byte:
+    msgs:  kind, count (uint32), then count times: tick (uint32), sender, receiver (int64), type id (uint16),
+           fingerprint (uint64)
+    type:  kind, type id (uint16), name length (uint16), name (utf-8), written the first time a type is seen
+    state: kind, tick (uint32), length (uint32), pickled {agent id: {field: value}} of the changed fields
+"""
+import hashlib
+import pickle
+import struct
+
+import numpy as np
+
+from Globals_ import splitmix64, uint64_mask
+
+trace_magic = b"DCOPTRC1"
+msgs_kind = 0
+type_kind = 1
+state_kind = 2
+
+msgs_record = struct.Struct("<BI")
+type_record = struct.Struct("<BHH")
+state_record = struct.Struct("<BII")
+msg_dtype = np.dtype([("tick", "<u4"), ("sender", "<i8"), ("receiver", "<i8"), ("type", "<u2"), ("fingerprint", "<u8")])
+
+
+def get_fingerprint(information):
+    """64 bit fingerprint of the information of a message, stable across runs."""
+    if information is None:
+        return 0
+    if isinstance(information, (int, np.integer)):
+        return splitmix64(int(information))
+    digest = hashlib.blake2b(pickle.dumps(information, pickle.HIGHEST_PROTOCOL), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & uint64_mask
+
+
+def is_same_value(last_value, value):
+    return last_value is value or (type(last_value) is type(value) and last_value == value)
+
+
+class TraceRecorder():
+    """Appends the records of a run to the log at path; DCOP.execute drives it when Globals_.trace_path is set."""
+
+    def __init__(self, path):
+        self.file = open(path, "wb", buffering=1 << 20)
+        self.file.write(trace_magic)
+        self.tick = 0
+        self.tick_msgs = []
+        self.tick_states = {}
+        self.types = {}
+        self.agents_state = {}
+
+    def record_msgs(self, list_of_msgs):
+        """Messages are immutable once sent, so they are kept until the end of the tick and written in one batch."""
+        self.tick_msgs.extend(list_of_msgs)
+
+    def set_tick(self, tick):
+        self.flush_msgs()
+        self.flush_states()
+        self.tick = tick
+
+    def flush_msgs(self):
+        msgs = self.tick_msgs
+        if len(msgs) == 0:
+            return
+        self.tick_msgs = []
+        records = np.empty(len(msgs), dtype=msg_dtype)
+        records["tick"] = self.tick
+        records["sender"] = [msg.sender for msg in msgs]
+        records["receiver"] = [msg.receiver for msg in msgs]
+        types = self.types
+        records["type"] = [types[msg.msg_type] if msg.msg_type in types else self.add_type(msg.msg_type) for msg in msgs]
+        infos = [msg.information for msg in msgs]
+        if all(isinstance(information, (int, np.integer)) for information in infos):
+            records["fingerprint"] = splitmix64(np.array(infos, dtype=np.int64).astype(np.uint64))
+        else:
+            records["fingerprint"] = [get_fingerprint(information) for information in infos]
+        self.file.write(msgs_record.pack(msgs_kind, len(msgs)) + records.tobytes())
+
+    def add_type(self, msg_type):
+        type_id = len(self.types)
+        self.types[msg_type] = type_id
+        name = str(msg_type).encode("utf-8")
+        self.file.write(type_record.pack(type_kind, type_id, len(name)) + name)
+        return type_id
+
+    def record_state(self, agent):
+        """Keeps the traced fields of the agent that changed since its last record, written at the end of the tick."""
+        last_state = self.agents_state.get(agent.id_)
+        if last_state is None:
+            last_state = {}
+            self.agents_state[agent.id_] = last_state
+        changes = None
+        for field in agent.trace_fields:
+            value = getattr(agent, field, None)
+            if type(value) is list:
+                value = tuple(value)
+            if field not in last_state or not is_same_value(last_state[field], value):
+                if changes is None:
+                    changes = {}
+                changes[field] = value
+                last_state[field] = value
+        if changes is not None:
+            self.tick_states[agent.id_] = changes
+
+    def flush_states(self):
+        if len(self.tick_states) == 0:
+            return
+        payload = pickle.dumps(self.tick_states, pickle.HIGHEST_PROTOCOL)
+        self.tick_states = {}
+        self.file.write(state_record.pack(state_kind, self.tick, len(payload)) + payload)
+
+    def close(self):
+        self.flush_msgs()
+        self.flush_states()
+        self.file.close()
+
+
+class TraceReplayer():
+    """Reads a log written by TraceRecorder. Messages are kept as columns (numpy arrays) for filtering."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        if data[:len(trace_magic)] != trace_magic:
+            raise Exception(path + " is not a message trace")
+        self.type_names = {}
+        self.agents_changes = {}
+        msgs = []
+        offset = len(trace_magic)
+        while offset < len(data):
+            kind = data[offset]
+            if kind == msgs_kind:
+                count = msgs_record.unpack_from(data, offset)[1]
+                offset = offset + msgs_record.size
+                msgs.append(np.frombuffer(data, dtype=msg_dtype, count=count, offset=offset))
+                offset = offset + count * msg_dtype.itemsize
+            elif kind == type_kind:
+                _, type_id, name_size = type_record.unpack_from(data, offset)
+                offset = offset + type_record.size
+                self.type_names[type_id] = data[offset:offset + name_size].decode("utf-8")
+                offset = offset + name_size
+            elif kind == state_kind:
+                _, tick, payload_size = state_record.unpack_from(data, offset)
+                offset = offset + state_record.size
+                for agent_id, changes in pickle.loads(data[offset:offset + payload_size]).items():
+                    self.agents_changes.setdefault(agent_id, []).append((tick, changes))
+                offset = offset + payload_size
+            else:
+                raise Exception("unknown record kind " + str(kind) + " at offset " + str(offset))
+
+        msgs = np.concatenate(msgs) if len(msgs) != 0 else np.empty(0, dtype=msg_dtype)
+        self.msgs_tick = msgs["tick"].astype(np.int64)
+        self.msgs_sender = msgs["sender"].copy()
+        self.msgs_receiver = msgs["receiver"].copy()
+        self.msgs_type = msgs["type"].astype(np.int64)
+        self.msgs_fingerprint = msgs["fingerprint"].copy()
+
+    def get_last_tick(self):
+        last_tick = int(self.msgs_tick.max()) if len(self.msgs_tick) != 0 else 0
+        for changes in self.agents_changes.values():
+            last_tick = max(last_tick, changes[-1][0])
+        return last_tick
+
+    def get_agent_state(self, agent_id, tick):
+        """The traced fields of the agent at the end of the iteration tick (tick 0 is the state after initialize)."""
+        state = {}
+        for change_tick, changes in self.agents_changes.get(agent_id, ()):
+            if change_tick > tick:
+                break
+            state.update(changes)
+        return state
+
+    def get_states(self, tick):
+        return {agent_id: self.get_agent_state(agent_id, tick) for agent_id in self.agents_changes}
+
+    def get_msgs(self, tick=None, sender=None, receiver=None):
+        """The (tick, sender, receiver, type, fingerprint) of the messages that match the given filters."""
+        mask = np.ones(len(self.msgs_tick), dtype=bool)
+        if tick is not None:
+            mask &= self.msgs_tick == tick
+        if sender is not None:
+            mask &= self.msgs_sender == sender
+        if receiver is not None:
+            mask &= self.msgs_receiver == receiver
+        ans = []
+        for i in np.flatnonzero(mask).tolist():
+            ans.append((int(self.msgs_tick[i]), int(self.msgs_sender[i]), int(self.msgs_receiver[i]),
+                        self.type_names[int(self.msgs_type[i])], int(self.msgs_fingerprint[i])))
+        return ans
+
+    def get_msgs_per_tick(self):
+        return np.bincount(self.msgs_tick, minlength=self.get_last_tick() + 1)
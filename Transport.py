@@ -0,0 +1,281 @@
+"""
+Transports of the sharded engine (see ShardedExecution). A transport performs the all-to-all exchange of a tick:
+every shard calls exchange with one payload for every other shard and gets back the payload every other shard
+addressed to it. Payloads are sent as frames of a 4 byte tick, a 4 byte length and the payload bytes, one frame per
+pair of shards per exchange, so all the messages of a tick between two shards travel in a single batch.
+"""
+import os
+import selectors
+import shutil
+import socket
+import struct
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from multiprocessing import shared_memory
+
+frame_header = struct.Struct("<II")
+connect_attempts = 300
+
+
+class ShardTransport(ABC):
+    """setup runs in the parent before the workers start, connect in every worker, close in the parent at the end."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def setup(self, ctx, workers):
+        self.workers = workers
+
+    def connect(self, worker):
+        self.worker = worker
+
+    @abstractmethod
+    def exchange(self, tick, payloads): pass
+
+    @abstractmethod
+    def abort(self): pass
+
+    def close(self):
+        pass
+
+
+class SharedRingBuffer():
+    """
+    Single producer, single consumer ring of length-prefixed frames in shared memory. The header holds the total
+    amount of bytes written, updated only by the producer, and of bytes read, updated only by the consumer, so both
+    can use the ring at the same time.
+    """
+    counter = struct.Struct("<Q")
+    header_size = 16
+    length = struct.Struct("<Q")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity + self.header_size)
+        self.counter.pack_into(self.shm.buf, 0, 0)
+        self.counter.pack_into(self.shm.buf, 8, 0)
+
+    def write(self, payload):
+        head = self.counter.unpack_from(self.shm.buf, 0)[0]
+        tail = self.counter.unpack_from(self.shm.buf, 8)[0]
+        frame_size = self.length.size + len(payload)
+        if head - tail + frame_size > self.capacity:
+            raise Exception("ring buffer of " + str(self.capacity) + " bytes is full, increase Globals_.sharded_ring_buffer_bytes")
+        self.copy_in(head, self.length.pack(len(payload)))
+        self.copy_in(head + self.length.size, payload)
+        self.counter.pack_into(self.shm.buf, 0, head + frame_size)
+
+    def read(self):
+        head = self.counter.unpack_from(self.shm.buf, 0)[0]
+        tail = self.counter.unpack_from(self.shm.buf, 8)[0]
+        if head == tail:
+            return None
+        payload_size = self.length.unpack(self.copy_out(tail, self.length.size))[0]
+        payload = self.copy_out(tail + self.length.size, payload_size)
+        self.counter.pack_into(self.shm.buf, 8, tail + self.length.size + payload_size)
+        return payload
+
+    def copy_in(self, offset, data):
+        start = self.header_size + offset % self.capacity
+        first = min(len(data), self.header_size + self.capacity - start)
+        self.shm.buf[start:start + first] = data[:first]
+        self.shm.buf[self.header_size:self.header_size + len(data) - first] = data[first:]
+
+    def copy_out(self, offset, size):
+        start = self.header_size + offset % self.capacity
+        first = min(size, self.header_size + self.capacity - start)
+        return bytes(self.shm.buf[start:start + first]) + bytes(self.shm.buf[self.header_size:self.header_size + size - first])
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedMemoryTransport(ShardTransport):
+    """Workers forked on one host exchange frames through a ring buffer per ordered pair of shards and a barrier."""
+
+    def __init__(self, capacity):
+        ShardTransport.__init__(self)
+        self.capacity = capacity
+        self.buffers = {}
+
+    def setup(self, ctx, workers):
+        ShardTransport.setup(self, ctx, workers)
+        self.barrier = ctx.Barrier(workers)
+        for src in range(workers):
+            for dst in range(workers):
+                if src != dst:
+                    self.buffers[(src, dst)] = SharedRingBuffer(self.capacity)
+
+    def exchange(self, tick, payloads):
+        for dst, payload in payloads.items():
+            self.buffers[(self.worker, dst)].write(frame_header.pack(tick, len(payload)) + payload)
+            self.bytes_sent = self.bytes_sent + frame_header.size + len(payload)
+        self.barrier.wait()
+        received = {}
+        for src in range(self.workers):
+            if src != self.worker:
+                received[src] = check_frame(tick, self.buffers[(src, self.worker)].read())
+        return received
+
+    def abort(self):
+        self.barrier.abort()
+
+    def close(self):
+        for buffer in self.buffers.values():
+            buffer.close()
+
+
+class SocketTransport(ShardTransport):
+    """
+    Workers exchange frames over one persistent connection per pair of shards, on TCP (family "tcp") or on Unix
+    sockets (family "unix"). The listening sockets are created by setup, or given as addresses when the workers run
+    on several hosts; the worker with the lower index connects to the other one.
+    """
+
+    def __init__(self, family="tcp", host="127.0.0.1", addresses=None):
+        ShardTransport.__init__(self)
+        self.family = family
+        self.host = host
+        self.addresses = addresses
+        self.listeners = {}
+        self.socket_dir = None
+        self.connections = {}
+
+    def get_socket_family(self):
+        return socket.AF_UNIX if self.family == "unix" else socket.AF_INET
+
+    def setup(self, ctx, workers):
+        ShardTransport.setup(self, ctx, workers)
+        if self.addresses is not None:
+            return
+        self.addresses = []
+        if self.family == "unix":
+            self.socket_dir = tempfile.mkdtemp(prefix="dcop_shards_")
+        for w in range(workers):
+            listener = socket.socket(self.get_socket_family(), socket.SOCK_STREAM)
+            if self.family == "unix":
+                listener.bind(os.path.join(self.socket_dir, "shard_" + str(w) + ".sock"))
+            else:
+                listener.bind((self.host, 0))
+            listener.listen(workers)
+            self.listeners[w] = listener
+            self.addresses.append(listener.getsockname())
+
+    def connect(self, worker):
+        ShardTransport.connect(self, worker)
+        listener = self.listeners.get(worker)
+        if listener is None:
+            listener = socket.socket(self.get_socket_family(), socket.SOCK_STREAM)
+            listener.bind(self.addresses[worker])
+            listener.listen(self.workers)
+        for w, other in self.listeners.items():
+            if w != worker:
+                other.close()
+        for dst in range(worker + 1, self.workers):
+            connection = self.connect_to(dst)
+            connection.sendall(struct.pack("<I", worker))
+            self.connections[dst] = connection
+        for _ in range(worker):
+            connection, _ = listener.accept()
+            src = struct.unpack("<I", receive_exactly(connection, 4))[0]
+            self.connections[src] = connection
+        listener.close()
+        for connection in self.connections.values():
+            if self.family == "tcp":
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.setblocking(False)
+        self.incoming = {peer: bytearray() for peer in self.connections}
+        self.selector = selectors.DefaultSelector()
+
+    def connect_to(self, dst):
+        """Connects to the listener of dst, waiting for it when the workers are started separately."""
+        for attempt in range(connect_attempts):
+            connection = socket.socket(self.get_socket_family(), socket.SOCK_STREAM)
+            try:
+                connection.connect(self.addresses[dst])
+                return connection
+            except (ConnectionRefusedError, FileNotFoundError):
+                connection.close()
+                if attempt == connect_attempts - 1:
+                    raise
+                time.sleep(0.1)
+
+    def exchange(self, tick, payloads):
+        """Sends and receives the frames of all the peers at once, so large batches cannot block the exchange."""
+        outgoing = {}
+        for dst, payload in payloads.items():
+            outgoing[dst] = memoryview(frame_header.pack(tick, len(payload)) + payload)
+            self.bytes_sent = self.bytes_sent + frame_header.size + len(payload)
+        received = {}
+        for peer in self.connections:
+            self.take_frame(peer, tick, received)
+        for peer, connection in self.connections.items():
+            events = (selectors.EVENT_READ if peer not in received else 0) | \
+                     (selectors.EVENT_WRITE if peer in outgoing else 0)
+            if events != 0:
+                self.selector.register(connection, events, peer)
+        try:
+            while len(received) < len(self.connections) or len(outgoing) != 0:
+                for key, events in self.selector.select():
+                    peer = key.data
+                    if events & selectors.EVENT_WRITE and peer in outgoing:
+                        sent = key.fileobj.send(outgoing[peer])
+                        outgoing[peer] = outgoing[peer][sent:]
+                        if len(outgoing[peer]) == 0:
+                            del outgoing[peer]
+                    if events & selectors.EVENT_READ and peer not in received:
+                        chunk = key.fileobj.recv(1 << 20)
+                        if len(chunk) == 0:
+                            raise Exception("shard " + str(peer) + " closed the connection")
+                        self.incoming[peer].extend(chunk)
+                        self.take_frame(peer, tick, received)
+                    events_left = (selectors.EVENT_READ if peer not in received else 0) | \
+                                  (selectors.EVENT_WRITE if peer in outgoing else 0)
+                    if events_left == 0:
+                        self.selector.unregister(key.fileobj)
+                    elif events_left != key.events:
+                        self.selector.modify(key.fileobj, events_left, peer)
+        finally:
+            for key in list(self.selector.get_map().values()):
+                self.selector.unregister(key.fileobj)
+        return received
+
+    def take_frame(self, peer, tick, received):
+        """Moves the frame of the exchange out of the bytes received from peer, once it is complete. A peer that
+        finished the exchange may already have sent part of its next frame, which stays in incoming."""
+        incoming = self.incoming[peer]
+        if peer in received or len(incoming) < frame_header.size:
+            return
+        frame_size = frame_header.size + frame_header.unpack_from(incoming, 0)[1]
+        if len(incoming) >= frame_size:
+            received[peer] = check_frame(tick, bytes(incoming[:frame_size]))
+            del incoming[:frame_size]
+
+    def abort(self):
+        for connection in self.connections.values():
+            connection.close()
+
+    def close(self):
+        for listener in self.listeners.values():
+            listener.close()
+        if self.socket_dir is not None:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+
+def receive_exactly(connection, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if len(chunk) == 0:
+            raise Exception("connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def check_frame(tick, frame):
+    frame_tick, payload_size = frame_header.unpack_from(frame, 0)
+    if frame_tick != tick:
+        raise Exception("received the frame of exchange " + str(frame_tick) + " in exchange " + str(tick))
+    return frame[frame_header.size:frame_header.size + payload_size]
@@ -17,6 +17,7 @@ class DFS_MSG(Enum):
 
 
 class DFS(Agent,ABC):
+    trace_fields = Agent.trace_fields + ("status", "dfs_father", "dfs_children")
 
     def __init__(self, id_, D):
         Agent.__init__(self,id_,D,)
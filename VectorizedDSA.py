@@ -0,0 +1,168 @@
+"""
+Vectorized DSA: runs the whole population of DSA agents of a DCOP in lockstep on numpy arrays instead of passing
+messages, on the arrays of VectorizedMGM.BatchedArrays. In DCOP.execute every agent with neighbors receives the
+assignments of its neighbors, decides and sends its own assignment at every tick, so a round is a single tick:
+
+    local_costs[i, v]  unary cost of v plus the sum over the neighbors j of cost(v, x[j])
+    candidate          the first value with the lowest cost when it improves on the current value, otherwise the
+                       first other value with the same cost as the current value (for the variants that allow it)
+    moves              agents with a candidate whose activation draw (see DSA.get_activation_draws) is below their
+                       activation probability
+
+Every instance runs incomplete_iterations rounds, as the message passing agents do, and the assignments, clocks and
+message counts are written back to the agents.
+
+DSA does not improve monotonically, so both backends are anytime: AnytimeTracker (message passing) and BatchedDSA
+compute the global cost of every instance after every tick and keep the assignment with the lowest one (the first,
+on equal costs) in the anytime_variable of the agents, with its cost and tick in dcop.anytime_cost and
+dcop.anytime_clock.
+"""
+import numpy as np
+
+import Globals_
+from DSA import dsa_variants, get_activation_draws
+from VectorizedMGM import BatchedArrays
+
+
+def set_anytime(dcop, x, cost, clock):
+    for a, value in zip(dcop.agents, x.tolist()):
+        a.anytime_variable = value
+    dcop.anytime_cost = cost
+    dcop.anytime_clock = clock
+
+
+class AnytimeTracker(BatchedArrays):
+    """Keeps the assignment with the lowest global cost of a message passing run, updated after every tick; DSA and
+    Max-Sum runs use it in every execution mode (see DCOP.create_anytime_tracker)."""
+
+    def __init__(self, dcop):
+        BatchedArrays.__init__(self, [dcop])
+        self.best_x = None
+        self.best_cost = None
+        self.best_clock = None
+
+    def update(self, global_clock):
+        x = np.array([a.variable for a in self.dcops[0].agents], dtype=np.int64)
+        self.update_assignment(global_clock, x)
+
+    def update_assignment(self, global_clock, x):
+        """Keeps the assignment x (by position in dcop.agents) of the tick if it costs less than the best one."""
+        cost = int(self.get_global_costs(x)[0])
+        if self.best_cost is None or cost < self.best_cost:
+            self.best_x = x
+            self.best_cost = cost
+            self.best_clock = global_clock
+
+    def get_held_entries(self, agents):
+        """The CSR entries of the edges held by the given agents (a mask by position): the entries of the edges whose
+        lower id agent is one of them."""
+        return self.lower_entries[agents[self.src[self.lower_entries]]]
+
+    def get_partial_cost(self, x, entries, positions):
+        """The part of the global cost of x held by the agents at positions: their unary costs and the costs of the
+        edges of entries (see get_held_entries). The parts of a partition of the agents sum to the global cost."""
+        src = self.src[entries]
+        dst = self.dst[entries]
+        cost = int(np.take(self.tables, (entries * self.D + x[dst]) * self.D + x[src]).sum(dtype=np.int64))
+        return cost + int(self.unary[positions, x[positions]].sum(dtype=np.int64))
+
+    def write_back(self):
+        set_anytime(self.dcops[0], self.best_x, self.best_cost, self.best_clock)
+
+    def get_state(self):
+        return self.best_x.tolist(), self.best_cost, self.best_clock
+
+    def set_state(self, state):
+        best_x, self.best_cost, self.best_clock = state
+        self.best_x = np.array(best_x, dtype=np.int64)
+
+
+class BatchedDSA(BatchedArrays):
+    """Runs the DSA agents of all the dcops as arrays (see the module docstring)."""
+
+    def execute(self):
+        agents = [a for dcop in self.dcops for a in dcop.agents]
+        x = np.array([a.variable for a in agents], dtype=np.int64)
+        keys = np.array([a.activation_key for a in agents], dtype=np.uint64)
+        probabilities = np.array([a.activation_probability for a in agents], dtype=np.float64)
+        variants = np.array([dsa_variants.index(a.variant) for a in agents], dtype=np.int64)
+        iterations = Globals_.incomplete_iterations
+        neighbors_x = x.copy()
+        values_costs = np.zeros((len(agents), self.D), dtype=np.int64)
+        best_x = x.copy()
+        best_cost = self.get_global_costs(x)
+        best_clock = np.zeros(len(self.dcops), dtype=np.int64)
+        running = np.bincount(self.instance, weights=self.active, minlength=len(self.dcops)) > 0
+        rounds = np.where(running, iterations, 0)
+        if running.any():
+            self.set_live(np.flatnonzero(running))
+            positions = np.arange(len(self.live_agents))
+            live_keys = keys[self.live_agents]
+            live_probabilities = probabilities[self.live_agents]
+            live_variants = variants[self.live_agents]
+            tie_variants = (live_variants == dsa_variants.index("B")) | (live_variants == dsa_variants.index("C"))
+            for round_ in range(1, iterations + 1):
+                local_costs = self.get_local_costs(x)
+                live_x = x[self.live_agents]
+                current_costs = local_costs[positions, live_x]
+                domain_costs = self.get_domain_costs(local_costs)
+                best = np.argmin(domain_costs, axis=1)
+                min_costs = local_costs[positions, best]
+                ties = domain_costs == min_costs[:, None]
+                ties[positions, live_x] = False
+                other = np.argmax(ties, axis=1)
+                improves = min_costs < current_costs
+                allowed = tie_variants & ((live_variants == dsa_variants.index("C")) | (current_costs > 0))
+                tie_moves = (min_costs == current_costs) & ties[positions, other] & allowed
+                candidate = np.where(improves, best, other)
+                moves = (improves | tie_moves) & self.live_active & \
+                    (get_activation_draws(live_keys, round_) < live_probabilities)
+                if round_ == iterations:
+                    neighbors_x = x.copy()
+                    values_costs[self.live_agents] = local_costs - self.unary[self.live_agents]
+                x[self.live_agents[moves]] = candidate[moves]
+
+                costs = self.get_global_costs(x)
+                improved = costs < best_cost
+                if improved.any():
+                    best_cost[improved] = costs[improved]
+                    best_clock[improved] = round_
+                    improved_agents = improved[self.instance]
+                    best_x[improved_agents] = x[improved_agents]
+
+        for b, dcop in enumerate(self.dcops):
+            a0, a1 = int(self.agents_indptr[b]), int(self.agents_indptr[b + 1])
+            self.write_back(b, x[a0:a1], neighbors_x, int(rounds[b]), values_costs[a0:a1])
+            set_anytime(dcop, best_x[a0:a1], int(best_cost[b]), int(best_clock[b]))
+
+    def write_back(self, b, x, neighbors_x, rounds, values_costs):
+        """Sets the agents and the dcop b to the state in which DCOP.execute ends: after the last tick, with the
+        assignments of the previous tick received."""
+        dcop = self.dcops[b]
+        a0 = int(self.agents_indptr[b])
+        e0, e1 = int(self.entries_indptr[b]), int(self.entries_indptr[b + 1])
+        dcop.global_clock = rounds
+        x_list = x.tolist()
+        dst_ids = self.ids[self.dst[e0:e1]].tolist()
+        entries_x = neighbors_x[self.dst[e0:e1]].tolist()
+        indptr = (self.indptr[a0:a0 + len(dcop.agents) + 1] - e0).tolist()
+        for i, a in enumerate(dcop.agents):
+            a.global_clock = rounds
+            a.variable = x_list[i]
+            if not self.active[a0 + i]:
+                continue
+            a.set_constraints()
+            start, end = indptr[i], indptr[i + 1]
+            a.neighbors_assignments = dict(zip(dst_ids[start:end], entries_x[start:end]))
+            a.values_costs = values_costs[i].copy()
+            a.local_clock = a.local_clock + rounds
+            a.atomic_operations = a.atomic_operations + rounds * (end - start) * (self.D + 1)
+        dcop.mailer.msgs_per_tick = [e1 - e0] * rounds
+        dcop.mailer.msgs_in_tick = e1 - e0 if rounds > 0 else 0
+
+
+class VectorizedDSA(BatchedDSA):
+    """Runs the DSA agents of a single dcop as arrays, used by DCOP.execute when Globals_.vectorized_dsa is set."""
+
+    def __init__(self, dcop):
+        BatchedDSA.__init__(self, [dcop])
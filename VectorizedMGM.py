@@ -0,0 +1,233 @@
+"""
+Vectorized MGM: runs the whole population of MGM (or Meeting) agents of a DCOP in lockstep on numpy arrays instead of
+passing messages. In DCOP.execute every agent with neighbors computes its local reduction at the odd ticks and the
+agents with the best reduction in their neighborhood move at the even ticks, so a round of two ticks becomes:
+
+    local_costs[i, v]  unary cost of v plus the sum over the neighbors j of cost(v, x[j]), gathered from the cost
+                       tables of the edges in CSR order (see DCOP.create_neighbors_index) and summed per agent
+    lr, potential      reduction of the best value (the first one with the lowest cost) over the current value
+    winners            agents with lr > 0 and no neighbor with a larger lr, or an equal lr and a lower id
+
+The run stops after the first round without any positive reduction, as DCOP.execute does, and the assignments,
+reductions, clocks and message counts are written back to the agents, so they are the same as those of a message
+passing run. Runs are not traced or checkpointed.
+
+BatchedMGM solves many independent DCOPs at once: their agents and CSR entries are concatenated into one disjoint
+graph (BatchedArrays, shared with VectorizedDSA), and every instance stops at its own round, tracked with a mask of
+the running instances. The instances that stopped keep their state and are dropped from the arrays once they make up
+half of them.
+"""
+import numpy as np
+
+import Globals_
+from Meeting_Agent import MeetingUnaryCosts
+from MGM import MGM_Status
+
+
+class BatchedArrays():
+    """The agents, CSR entries, directed cost tables and unary costs of all the dcops concatenated into arrays; all the
+    dcops must have the same D. Agents whose domain was narrowed to a subset of range(D) (as the explanations do) keep
+    the full cost tables, and domain_mask marks the values they may take."""
+
+    def __init__(self, dcops):
+        self.dcops = dcops
+        agents = [a for dcop in dcops for a in dcop.agents]
+        self.D = dcops[0].D if len(dcops) != 0 else 0
+        if any(dcop.D != self.D for dcop in dcops):
+            raise ValueError("vectorized dcops need equal domain sizes")
+        self.domain_mask = None
+        if any(len(a.domain) != self.D for a in agents):
+            self.domain_mask = np.zeros((len(agents), self.D), dtype=bool)
+            for i, a in enumerate(agents):
+                self.domain_mask[i, a.domain] = True
+        self.agents_indptr = np.zeros(len(dcops) + 1, dtype=np.int64)
+        np.cumsum([len(dcop.agents) for dcop in dcops], out=self.agents_indptr[1:])
+        self.entries_indptr = np.zeros(len(dcops) + 1, dtype=np.int64)
+        np.cumsum([len(dcop.neighbors_ids) for dcop in dcops], out=self.entries_indptr[1:])
+        self.ids = np.array([a.id_ for a in agents], dtype=np.int64)
+        self.instance = np.repeat(np.arange(len(dcops), dtype=np.int64), np.diff(self.agents_indptr))
+
+        self.indptr = np.zeros(len(agents) + 1, dtype=np.int64)
+        dst = []
+        for b, dcop in enumerate(dcops):
+            a0 = int(self.agents_indptr[b])
+            self.indptr[a0 + 1:a0 + len(dcop.agents) + 1] = dcop.neighbors_indptr[1:] + self.entries_indptr[b]
+            position = {a.id_: a0 + i for i, a in enumerate(dcop.agents)}
+            dst.append(np.fromiter((position[n_id] for n_id in dcop.neighbors_ids.tolist()), dtype=np.int64,
+                                   count=len(dcop.neighbors_ids)))
+        self.degrees = np.diff(self.indptr)
+        self.src = np.repeat(np.arange(len(agents), dtype=np.int64), self.degrees)
+        self.dst = np.concatenate(dst) if len(dst) != 0 else np.zeros(0, dtype=np.int64)
+        self.active = self.degrees > 0
+        self.tables = self.get_directed_tables().reshape(len(self.dst) * self.D, self.D)
+        self.lower_entries = np.flatnonzero(self.ids[self.src] < self.ids[self.dst])
+        self.unary = np.zeros((len(agents), self.D), dtype=np.int64)
+        for i, a in enumerate(agents):
+            if isinstance(a, MeetingUnaryCosts):
+                self.unary[i] = [a.unary_constraint[v] for v in range(self.D)]
+
+    def get_directed_tables(self):
+        """The cost table of every CSR entry (i, j) as [value of j, value of i], so that the costs of all the values of
+        i given the value of j are a contiguous row; the rows of all the entries are gathered with a single take."""
+        tables = []
+        entries = []
+        for dcop in self.dcops:
+            edge_index = {id(n): e + len(tables) for e, n in enumerate(dcop.neighbors)}
+            for n in dcop.neighbors:
+                # lazy cost tables (see problems.LazyCostTable) generate the full table on materialize
+                materialize = getattr(n.cost_table, "materialize", None)
+                tables.append(materialize() if materialize is not None else n.cost_table)
+            for a in dcop.agents:
+                for n in dcop.neighbors_by_agent[a.id_].values():
+                    entries.append(edge_index[id(n)])
+        tables = np.array(tables, dtype=Globals_.cost_table_dtype).reshape(len(tables), self.D, self.D)
+        entries = np.array(entries, dtype=np.int64)
+        # rows of a table are the values of the lower id, so entries of the lower id take the transposed table
+        lower = self.ids[self.src] < self.ids[self.dst]
+        directed = np.empty((len(entries), self.D, self.D), dtype=Globals_.cost_table_dtype)
+        directed[lower] = tables[entries[lower]].transpose(0, 2, 1)
+        directed[~lower] = tables[entries[~lower]]
+        return directed
+
+    def set_live(self, instances):
+        """Restricts the arrays of the rounds to the agents and the CSR entries of the given instances."""
+        self.live_instances = instances
+        self.live_agents = np.concatenate([np.arange(self.agents_indptr[b], self.agents_indptr[b + 1])
+                                           for b in instances.tolist()])
+        live_degrees = self.degrees[self.live_agents]
+        live_offsets = np.cumsum(live_degrees) - live_degrees
+        self.live_entries = np.repeat(self.indptr[self.live_agents] - live_offsets, live_degrees) + \
+            np.arange(int(live_degrees.sum()))
+        self.live_active = live_degrees > 0
+        self.live_starts = live_offsets[self.live_active]
+        self.live_dst_agents = self.dst[self.live_entries]
+        self.live_src_agents = self.src[self.live_entries]
+        self.live_src_ids = self.ids[self.live_src_agents]
+        self.live_dst_ids = self.ids[self.live_dst_agents]
+        self.live_rows_base = self.live_entries * self.D
+        sizes = self.agents_indptr[instances + 1] - self.agents_indptr[instances]
+        self.live_instances_starts = np.cumsum(sizes) - sizes
+
+    def get_local_costs(self, x):
+        """(live agents, D) costs of every value of every live agent given the assignment x of its neighbors."""
+        local_costs = self.unary[self.live_agents]
+        if len(self.live_starts) != 0:
+            rows = np.take(self.tables, self.live_rows_base + x[self.live_dst_agents], axis=0)
+            local_costs[self.live_active] += np.add.reduceat(rows, self.live_starts, axis=0, dtype=np.int64)
+        return local_costs
+
+    def get_domain_costs(self, local_costs):
+        """local_costs of the live agents with the values outside their domains costing more than any value inside, so
+        that the first value with the lowest cost is taken from the domain."""
+        if self.domain_mask is None:
+            return local_costs
+        return np.where(self.domain_mask[self.live_agents], local_costs, np.iinfo(local_costs.dtype).max)
+
+    def get_global_costs(self, x):
+        """The cost of the assignment x of every instance: the costs of its edges, read once from the entry of the lower
+        id, and the unary costs of its agents."""
+        src = self.src[self.lower_entries]
+        dst = self.dst[self.lower_entries]
+        cells = ((self.lower_entries * self.D + x[dst]) * self.D + x[src])
+        costs = np.zeros(len(self.dcops), dtype=np.int64)
+        np.add.at(costs, self.instance[src], np.take(self.tables, cells))
+        np.add.at(costs, self.instance, self.unary[np.arange(len(x)), x])
+        return costs
+
+
+class BatchedMGM(BatchedArrays):
+    """Runs the MGM agents of all the dcops as arrays (see the module docstring)."""
+
+    def get_winners(self, lr):
+        """Live agents with a positive lr that no neighbor beats, by lr and then by the lower id; lr is indexed by the
+        agents of all the instances."""
+        src_lr = lr[self.live_src_agents]
+        dst_lr = lr[self.live_dst_agents]
+        beaten = (dst_lr > src_lr) | ((dst_lr == src_lr) & (self.live_src_ids > self.live_dst_ids))
+        winners = (lr[self.live_agents] > 0) & self.live_active
+        if len(self.live_starts) != 0:
+            winners[self.live_active] &= ~np.logical_or.reduceat(beaten, self.live_starts)
+        return winners
+
+    def execute(self):
+        agents = [a for dcop in self.dcops for a in dcop.agents]
+        x = np.array([a.variable for a in agents], dtype=np.int64)
+        potential = np.array([a.lr_potential_asgmt for a in agents], dtype=np.int64)
+        lr = np.zeros(len(agents), dtype=np.int64)
+        previous_lr = np.zeros(len(agents), dtype=np.int64)
+        values_costs = np.zeros((len(agents), self.D), dtype=np.int64)
+        rounds = np.zeros(len(self.dcops), dtype=np.int64)
+        running = np.bincount(self.instance, weights=self.active, minlength=len(self.dcops)) > 0
+        if running.any():
+            self.set_live(np.flatnonzero(running))
+        round_ = 0
+        while running.any():
+            round_ = round_ + 1
+            live_running = running[self.instance[self.live_agents]]
+            agents_running = self.live_agents[live_running]
+            local_costs = self.get_local_costs(x)
+            positions = np.arange(len(self.live_agents))
+            live_x = x[self.live_agents]
+            current_costs = local_costs[positions, live_x]
+            best = np.argmin(self.get_domain_costs(local_costs), axis=1)
+            improves = (local_costs[positions, best] < current_costs) & self.live_active
+            live_lr = np.where(improves, current_costs - local_costs[positions, best], 0)
+            lr[agents_running] = live_lr[live_running]
+            potential[agents_running] = np.where(improves, best, potential[self.live_agents])[live_running]
+            values_costs[agents_running] = (local_costs - self.unary[self.live_agents])[live_running]
+            rounds[self.live_instances[running[self.live_instances]]] = round_
+
+            # instances without a positive reduction stop at this round
+            positive = np.logical_or.reduceat(live_lr > 0, self.live_instances_starts)
+            running[self.live_instances[~positive]] = False
+            live_running = running[self.instance[self.live_agents]]
+            agents_moving = self.live_agents[live_running]
+            previous_lr[agents_moving] = lr[agents_moving]
+            winners = self.get_winners(lr) & live_running
+            x[self.live_agents[winners]] = potential[self.live_agents[winners]]
+            live_instances = self.live_instances[running[self.live_instances]]
+            if 0 < len(live_instances) <= len(self.live_instances) // 2:
+                self.set_live(live_instances)
+
+        for b, dcop in enumerate(self.dcops):
+            a0, a1 = int(self.agents_indptr[b]), int(self.agents_indptr[b + 1])
+            self.write_back(b, x[a0:a1], lr[a0:a1], potential[a0:a1], previous_lr, int(rounds[b]), values_costs[a0:a1])
+
+    def write_back(self, b, x, lr, potential, previous_lr, rounds, values_costs):
+        """Sets the agents and the dcop b to the state in which DCOP.execute ends: after the odd tick of the last round,
+        with the reductions of the previous round received and the assignments of the last round."""
+        dcop = self.dcops[b]
+        a0 = int(self.agents_indptr[b])
+        e0, e1 = int(self.entries_indptr[b]), int(self.entries_indptr[b + 1])
+        global_clock = 2 * rounds - 1 if rounds > 0 else 0
+        dcop.global_clock = global_clock
+        x_list = x.tolist()
+        dst_ids = self.ids[self.dst[e0:e1]].tolist()
+        neighbors_x = x[self.dst[e0:e1] - a0].tolist()
+        neighbors_lr = previous_lr[self.dst[e0:e1]].tolist() if rounds > 1 else None
+        indptr = (self.indptr[a0:a0 + len(dcop.agents) + 1] - e0).tolist()
+        for i, a in enumerate(dcop.agents):
+            a.global_clock = global_clock
+            a.variable = x_list[i]
+            if not self.active[a0 + i]:
+                continue
+            a.set_constraints()
+            start, end = indptr[i], indptr[i + 1]
+            a.neighbors_assignments = dict(zip(dst_ids[start:end], neighbors_x[start:end]))
+            if neighbors_lr is not None:
+                a.neighbors_lost_reduction = dict(zip(dst_ids[start:end], neighbors_lr[start:end]))
+            a.values_costs = values_costs[i].copy()
+            a.lr = int(lr[i])
+            a.lr_potential_asgmt = int(potential[i])
+            a.status = MGM_Status.wait_for_neighbors_lost_reduction
+            a.local_clock = a.local_clock + rounds
+            a.atomic_operations = a.atomic_operations + rounds * (end - start) * (self.D + 1)
+        dcop.mailer.msgs_per_tick = [e1 - e0] * global_clock
+        dcop.mailer.msgs_in_tick = e1 - e0 if rounds > 0 else 0
+
+
+class VectorizedMGM(BatchedMGM):
+    """Runs the MGM agents of a single dcop as arrays, used by DCOP.execute when Globals_.vectorized_mgm is set."""
+
+    def __init__(self, dcop):
+        BatchedMGM.__init__(self, [dcop])
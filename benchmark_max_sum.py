@@ -0,0 +1,55 @@
+"""
+Scaling benchmark of Max-Sum against MGM on dense random uniform DCOPs with a small domain. For every number of agents,
+MGM (message passing and vectorized, see VectorizedMGM) runs until no agent can improve and Max-Sum (without and with
+value propagation) runs a fixed number of iterations. Every row is the mean over the repetitions of the run time, the
+ticks, the time per tick, the messages, the global cost of the final assignment and the lowest global cost of the run
+with the tick it was reached (the anytime assignment of Max-Sum, the final one of MGM).
+"""
+import contextlib
+import io
+import time
+
+import Globals_
+from Explanation import calc_global_cost
+from Globals_ import *
+from problems import DCOP_RandomUniform
+
+sizes = (25, 50, 100)
+D = 3
+repetitions = 3
+max_sum_iterations = 100
+value_propagation = 30
+
+algorithms = (("MGM", Algorithm.MGM, False, None),
+              ("MGM vectorized", Algorithm.MGM, True, None),
+              ("Max-Sum", Algorithm.max_sum, False, None),
+              ("Max-Sum VP", Algorithm.max_sum, False, value_propagation))
+
+
+def run(dcop_id, A, algorithm, vectorized, max_sum_value_propagation):
+    Globals_.vectorized_mgm = vectorized
+    Globals_.max_sum_value_propagation = max_sum_value_propagation
+    dcop = DCOP_RandomUniform(dcop_id, A, D, "Dense Uniform", algorithm)
+    # DCOP.execute reports when a run ends without messages
+    with contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        dcop.execute()
+        run_time = time.perf_counter() - start_time
+    cost = calc_global_cost(dcop)
+    best_cost = dcop.anytime_cost if dcop.anytime_cost is not None else cost
+    best_clock = dcop.anytime_clock if dcop.anytime_clock is not None else dcop.global_clock
+    return run_time, dcop.global_clock, sum(dcop.mailer.msgs_per_tick), cost, best_cost, best_clock
+
+
+if __name__ == '__main__':
+    Globals_.incomplete_iterations = max_sum_iterations
+    print("dense random uniform, p1 =", dense_p1, "D =", D, "repetitions =", repetitions)
+    print(f"{'A':>5} {'algorithm':<15} {'time[s]':>8} {'ticks':>7} {'ms/tick':>8} {'msgs':>10} {'cost':>10} "
+          f"{'best cost':>10} {'best tick':>9}")
+    for A in sizes:
+        for name, algorithm, vectorized, max_sum_value_propagation in algorithms:
+            results = [run(dcop_id, A, algorithm, vectorized, max_sum_value_propagation)
+                       for dcop_id in range(repetitions)]
+            run_time, ticks, msgs, cost, best_cost, best_clock = [sum(column) / repetitions for column in zip(*results)]
+            print(f"{A:>5} {name:<15} {run_time:>8.3f} {ticks:>7.1f} {1000 * run_time / max(ticks, 1):>8.3f} "
+                  f"{msgs:>10.0f} {cost:>10.1f} {best_cost:>10.1f} {best_clock:>9.1f}")
@@ -0,0 +1,54 @@
+"""
+Memory benchmark of the messages sent in an MGM round: every agent of a 1,000-agent scale free DCOP sends its
+assignment to all its neighbors, once with the slotted Msg and once with the dict-backed message it replaced, and the
+traced allocations are reported in bytes per message.
+"""
+import gc
+import tracemalloc
+
+import MGM
+from Globals_ import *
+from problems import DCOP_ScaleFree
+
+A = 1000
+D = 10
+
+
+class DictMsg():
+    """The dict-backed message, as Msg was before it had __slots__."""
+
+    def __init__(self, sender, receiver, information, msg_type):
+        self.sender = sender
+        self.receiver = receiver
+        self.information = information
+        self.msg_type = msg_type
+
+
+def measure_round(dcop, msg_class):
+    MGM.Msg = msg_class
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for a in dcop.agents:
+        a.send_assignments_msgs()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    amount_of_msgs = dcop.mailer.msgs_in_tick
+    dcop.mailer.place_messages_in_agents_inbox()
+    for a in dcop.agents:
+        a.inbox.extract()
+    return amount_of_msgs, (after - before) / amount_of_msgs
+
+
+if __name__ == '__main__':
+    dcop = DCOP_ScaleFree(0, A, D, "Scale Free", Algorithm.MGM)
+    for a in dcop.agents:
+        a.initialize()
+    dcop.mailer.place_messages_in_agents_inbox()
+    for a in dcop.agents:
+        a.inbox.extract()
+
+    for name, msg_class in (("dict Msg", DictMsg), ("slotted Msg", Msg)):
+        amount_of_msgs, bytes_per_msg = measure_round(dcop, msg_class)
+        print(name + ":", amount_of_msgs, "msgs,", round(bytes_per_msg, 1), "bytes per msg")
+    MGM.Msg = Msg
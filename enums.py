@@ -5,6 +5,7 @@ class DcopType(Enum):
     dense_random_uniform = 2
     graph_coloring = 3
     meeting_scheduling = 4
+    scale_free_network = 5
   
 
 
@@ -13,3 +14,4 @@ class Algorithm(Enum):
     branch_and_bound = 1
     dsa_c = 2
     MGM = 3
+    max_sum = 4
@@ -3,44 +3,45 @@ from MGM_Explanation import Meeting_Scheduling_Explanation
 from problems import *
 from Explanation import calc_global_cost
 from MeetingScheduling import DCOP_MeetingScheduling
+from InstanceStore import InstanceCache
+from ExperimentRunner import ExperimentRunner, dcop_types, get_sweep_jobs
 
 
-def create_selected_dcop(i,dcop_type,algorithm):
-    if dcop_type == DcopType.sparse_random_uniform:
-        A = 5
-        D = 10
-        dcop_name = "Sparse Uniform"
-        return DCOP_RandomUniform(i,A,D,dcop_name,algorithm)
-    if dcop_type == DcopType.dense_random_uniform:
-        A = 5
-        D = 10
-        dcop_name = "Dense Uniform"
-        return DCOP_RandomUniform(i,A,D,dcop_name,algorithm)
-    if dcop_type == DcopType.graph_coloring:
-        A = 5
-        D = 10
-        dcop_name = "Graph Coloring"
-        return DCOP_GraphColoring(i,A,D,dcop_name,algorithm)
-    if dcop_type == DcopType.meeting_scheduling:
-        A = 10
-        dcop_name = "Meeting Scheduling"
-        return DCOP_MeetingScheduling(i, A, time_slots_D, dcop_name, algorithm)
+def get_selected_dcop_parameters(dcop_type):
+    return dcop_types[dcop_type]
+
+
+def create_selected_dcop(i,dcop_type,algorithm,cache=None):
+    """Creates the selected DCOP, through the instance cache when one is given."""
+    dcop_class, A, D, dcop_name = get_selected_dcop_parameters(dcop_type)
+    if cache is not None:
+        return cache.get_dcop(dcop_class, i, A, D, dcop_name, algorithm)
+    return dcop_class(i,A,D,dcop_name,algorithm)
 
 
 if __name__ == '__main__':
     dcop_type = DcopType.meeting_scheduling
     algorithm = Algorithm.MGM
-    for i in range(repetitions):
-        dcop = create_selected_dcop(i,dcop_type,algorithm)
-        #print(f"Initially global cost is: {calc_global_cost(dcop)}")
-        dcop.execute()
-        print()
-        print(dcop)
-        print()
-        First_Explanation= Meeting_Scheduling_Explanation(dcop, [1,2,3,4,5,6,7,9,10], [8], {}, [])
-        First_Explanation.update_agents_before_generate_no_good()
-        First_Explanation.generate_no_good()
-        First_Explanation.explain(informative=True)
+    if experiment_workers is not None:
+        runner = ExperimentRunner(experiment_results_path, experiment_workers, experiment_seed, instance_cache_dir,
+                                  instance_cache_max_bytes)
+        runner.run(get_sweep_jobs([dcop_type], [algorithm], repetitions))
+        print(runner.metrics)
+    else:
+        instance_cache = None
+        if instance_cache_dir is not None:
+            instance_cache = InstanceCache(instance_cache_dir, instance_cache_max_bytes)
+        for i in range(repetitions):
+            dcop = create_selected_dcop(i,dcop_type,algorithm,instance_cache)
+            #print(f"Initially global cost is: {calc_global_cost(dcop)}")
+            dcop.execute()
+            print()
+            print(dcop)
+            print()
+            First_Explanation= Meeting_Scheduling_Explanation(dcop, [1,2,3,4,5,6,7,9,10], [8], {}, [])
+            First_Explanation.update_agents_before_generate_no_good()
+            First_Explanation.generate_no_good()
+            First_Explanation.explain(informative=True)
 
 """
 Participants 2 (or 6) is dissatisfied with the current scheduling. 
@@ -1,11 +1,27 @@
+import math
+import os
 import random
 import threading
+import time
+
+import numpy as np
+from collections import OrderedDict, deque
+from itertools import chain
 
 import Globals_
 from Algorithm_BnB import BranchAndBound
 from Agents import *
 from Globals_ import *
 from MGM import MGM
+from DSA import DSA_C
+from MaxSum import MaxSum
+from ShardedExecution import ShardedEngine
+from AsyncExecution import AsyncRunner
+from ThreadedExecution import ThreadedRunner
+from Trace import TraceRecorder
+from Checkpoint import load_checkpoint, save_checkpoint
+from VectorizedMGM import VectorizedMGM
+from VectorizedDSA import AnytimeTracker, VectorizedDSA
 
 
 from enums import *
@@ -42,8 +58,59 @@ class AgentPair():
         forth = other.a2_domain == self.a2_domain
         return first and second and third and forth
 
+class LazyCostTable():
+    """
+    Read-only stand-in for the D1xD2 cost table of an edge that generates cells on demand. Costs come from the same
+    counter based random as the materialized tables, so a lazy table holds exactly the values an eager one would.
+    Indexed as table[d_a1, d_a2], with rows of a1 (the lower id); recently used rows are kept in an LRU cache.
+    """
+    def __init__(self, a1, a2, cost_generator, cost_key, cached_rows):
+        self.a1 = a1
+        self.a2 = a2
+        self.cost_generator = cost_generator
+        self.cost_key = cost_key
+        self.shape = (len(a1.domain), len(a2.domain))
+        self.cached_rows = cached_rows
+        self.rows = OrderedDict()
+        self.d_a2 = np.asarray(a2.domain)[np.newaxis, :]
+
+    def generate(self, d_a1, d_a2):
+        costs = self.cost_generator(CounterRandom(self.cost_key, d_a1, d_a2), self.a1, self.a2, d_a1, d_a2)
+        return np.asarray(costs, dtype=cost_table_dtype)
+
+    def get_row(self, d_a1):
+        row = self.rows.get(d_a1)
+        if row is not None:
+            self.rows.move_to_end(d_a1)
+            return row
+        row = self.generate(np.array([[d_a1]]), self.d_a2)[0]
+        row.flags.writeable = False
+        if self.cached_rows > 0:
+            self.rows[d_a1] = row
+            if len(self.rows) > self.cached_rows:
+                self.rows.popitem(last=False)
+        return row
+
+    def __getitem__(self, index):
+        """A cell, or a full row (table[d_a1, :]) or column (table[:, d_a2])."""
+        d_a1, d_a2 = index
+        if isinstance(d_a1, slice):
+            return self.generate(np.arange(self.shape[0])[d_a1, np.newaxis], np.array([[d_a2]]))[:, 0]
+        if self.cached_rows > 0:
+            return self.get_row(d_a1)[d_a2]
+        if isinstance(d_a2, slice):
+            return self.generate(np.array([[d_a1]]), self.d_a2[:, d_a2])[0]
+        return self.generate(np.array([[d_a1]]), np.array([[d_a2]]))[0, 0]
+
+    def materialize(self):
+        return self.generate(np.asarray(self.a1.domain)[:, np.newaxis], self.d_a2)
+
+    def copy(self):
+        return self
+
+
 class Neighbors():
-    def __init__(self, a1:Agent, a2:Agent, cost_generator,dcop_id):
+    def __init__(self, a1:Agent, a2:Agent, cost_generator,dcop_id,cost_table=None):
 
         if a1.id_<a2.id_:
             self.a1 = a1
@@ -53,11 +120,18 @@ class Neighbors():
             self.a2 = a1
 
         self.dcop_id = dcop_id
-        self.rnd_cost = random.Random((((dcop_id+1)+100)+((a1.id_+1)+10)+((a2.id_+1)*1))*17)
-        for _ in range(5):
-            self.rnd_cost.random()
-        self.cost_table = {}
-        self.create_dictionary_of_costs(cost_generator)
+        self.cost_key = get_cost_key(dcop_id, self.a1.id_, self.a2.id_)
+        self.cost_table = None
+        # the stack of the cost tables of all the edges and the layer of this edge, see DCOP.stack_cost_tables
+        self.tables_stack = None
+        self.table_index = None
+        if cost_table is not None:
+            self.cost_table = cost_table
+        elif Globals_.lazy_cost_tables:
+            self.cost_table = LazyCostTable(self.a1, self.a2, cost_generator, self.cost_key,
+                                            Globals_.lazy_cost_table_cached_rows)
+        else:
+            self.create_dictionary_of_costs(cost_generator)
 
 
 
@@ -68,32 +142,33 @@ class Neighbors():
             return False
 
     def get_cost(self, first_agent_id_input, first_agent_variable, second_agent_id_input, second_agent_variable):
-
         if first_agent_id_input<second_agent_id_input:
-            ap =(first_agent_id_input,first_agent_variable,second_agent_id_input,second_agent_variable)
+            ans = self.cost_table[first_agent_variable, second_agent_variable]
         else:
-            ap =(second_agent_id_input, second_agent_variable, first_agent_id_input,first_agent_variable)
-        ans = self.cost_table[ap]
-        return ans
+            ans = self.cost_table[second_agent_variable, first_agent_variable]
+        return int(ans)
 
 
     def create_dictionary_of_costs(self,cost_generator):
-        for d_a1 in self.a1.domain:
-            for d_a2 in self.a2.domain:
-                first_tuple = ("A_"+str(self.a1.id_),d_a1)
-                second_tuple = ("A_"+str(self.a2.id_),d_a2)
-                ap = (first_tuple,second_tuple)
-                #ap = (self.a1.id_,d_a1,self.a2.id_,d_a2)#AgentPair(self.a1.id_, d_a1, self.a2.id_, d_a2)
-                cost = cost_generator(self.rnd_cost,self.a1,self.a2,d_a1,d_a2)
-                self.cost_table[ap] = cost
+        """Fills the D1xD2 cost table of the edge in a single call to the vectorized cost generator,
+        rows are indexed by the value of a1 (the lower id) and columns by the value of a2."""
+        d_a1 = np.asarray(self.a1.domain)[:, np.newaxis]
+        d_a2 = np.asarray(self.a2.domain)[np.newaxis, :]
+        costs = cost_generator(CounterRandom(self.cost_key,d_a1,d_a2),self.a1,self.a2,d_a1,d_a2)
+        self.cost_table = np.ascontiguousarray(costs, dtype=cost_table_dtype)
+        self.cost_table.flags.writeable = False
 
 
     def get_constraint(self,first_tuple,second_tuple):
-        if first_tuple[0]<second_tuple[0]:
-            k = (("A_"+str(first_tuple[0]),first_tuple[1]),("A_"+str(second_tuple[0]),second_tuple[1]))
+        first_id, first_value = first_tuple
+        second_id, second_value = second_tuple
+        if first_id<second_id:
+            k = encode_constraint(first_id, first_value, second_id, second_value)
+            cost = self.cost_table[first_value, second_value]
         else:
-            k = (("A_"+str(second_tuple[0]),second_tuple[1]),("A_"+str(first_tuple[0]),first_tuple[1]))
-        return k,self.cost_table[k]
+            k = encode_constraint(second_id, second_value, first_id, first_value)
+            cost = self.cost_table[second_value, first_value]
+        return k,int(cost)
 
 
     def is_agent_in_obj(self,agent_id_input):
@@ -110,62 +185,131 @@ class Neighbors():
             return self.a1.id_
 
 class UnboundedBuffer():
+    """
+    Blocking inbox of a worker thread of a threaded run (see ThreadedExecution): insert notifies the waiting
+    reader, and extract waits until there is something to return. contentions counts the inserts and extracts that
+    found the lock taken.
+    """
 
     def __init__(self):
         self.buffer = []
         self.cond = threading.Condition(threading.RLock())
+        self.contentions = 0
+
+    def acquire(self):
+        if not self.cond.acquire(blocking=False):
+            self.contentions = self.contentions + 1
+            self.cond.acquire()
 
     def insert(self, list_of_msgs):
-        #with self.cond:
-        for msg in list_of_msgs:
-            self.buffer.append(msg)
-        #    self.cond.notify_all()
+        self.acquire()
+        try:
+            for msg in list_of_msgs:
+                self.buffer.append(msg)
+            self.cond.notify_all()
+        finally:
+            self.cond.release()
 
     def extract(self):
-       #with self.cond:
-        #    while len(self.buffer) == 0:
-        #        self.cond.wait()
-        ans = []
-        for msg in self.buffer:
-            if msg is None:
-                return None
-            else:
-                ans.append(msg)
-        self.buffer = []
-        return ans
+        self.acquire()
+        try:
+            while len(self.buffer) == 0:
+                self.cond.wait()
+            ans = []
+            for msg in self.buffer:
+                if msg is None:
+                    return None
+                else:
+                    ans.append(msg)
+            self.buffer = []
+            return ans
+        finally:
+            self.cond.release()
 
     def is_buffer_empty(self):
 
         return len(self.buffer) == 0
 
+class ReceiverQueue():
+    """
+    Double-buffered inbox of a single agent: messages sent during an iteration are appended to pending, and at the
+    tick boundary pending becomes the delivered queue the agent extracts, so no message list is copied.
+    """
+
+    def __init__(self):
+        self.pending = deque()
+        self.delivered = ()
+        self.spare = deque()
+
+    def insert(self, list_of_msgs):
+        self.pending.extend(list_of_msgs)
+
+    def swap(self):
+        if len(self.delivered) != 0:
+            # the agent did not extract its last delivery, keep it ahead of the new messages
+            self.delivered.extend(self.pending)
+            self.pending.clear()
+            return
+        recycled = self.spare
+        recycled.clear()
+        self.delivered = self.pending
+        self.pending = recycled
+        self.spare = None
+
+    def extract(self):
+        msgs = self.delivered
+        if len(msgs) != 0:
+            self.spare = msgs
+            self.delivered = ()
+        return msgs
+
+    def is_buffer_empty(self):
+        return len(self.delivered) == 0
+
+
 class Mailer():
+    """
+    Routes every message to the queue of its receiver when it is sent, and delivers the queues of the agents that
+    received messages at the tick boundary. Agents send through Mailer.insert.
+    """
     def __init__(self,agents):
-        self.inbox = UnboundedBuffer()
         self.agents_outbox = {}
+        self.receivers = []
+        self.msgs_in_tick = 0
+        self.msgs_per_tick = []
+        self.recorder = None
         for a in agents:
-            outbox = UnboundedBuffer()
+            outbox = ReceiverQueue()
             self.agents_outbox[a.id_] = outbox
             a.inbox = outbox
-            a.outbox = self.inbox
+            a.outbox = self
+
+    def insert(self, list_of_msgs):
+        if self.recorder is not None:
+            self.recorder.record_msgs(list_of_msgs)
+        agents_outbox = self.agents_outbox
+        receivers = self.receivers
+        for msg in list_of_msgs:
+            pending = agents_outbox[msg.receiver].pending
+            if len(pending) == 0:
+                receivers.append(msg.receiver)
+            pending.append(msg)
+        self.msgs_in_tick = self.msgs_in_tick + len(list_of_msgs)
 
     def place_messages_in_agents_inbox(self):
-        msgs_to_send = self.inbox.extract()
-        if len(msgs_to_send) == 0: return True
-        msgs_by_receiver_dict = self.create_msgs_by_receiver_dict(msgs_to_send)
-        for receiver,msgs_list in msgs_by_receiver_dict.items():
-            self.agents_outbox[receiver].insert(msgs_list)
-
-    def create_msgs_by_receiver_dict(self,msgs_to_send):
-        msgs_by_receiver_dict = {}
-        for msg in msgs_to_send:
-            receiver = msg.receiver
-            if receiver not in msgs_by_receiver_dict.keys():
-                msgs_by_receiver_dict[receiver] = []
-            msgs_by_receiver_dict[receiver].append(msg)
-        return msgs_by_receiver_dict
+        """Delivers the messages sent in the last iteration and returns the ids of the agents that received any
+        (an empty list when there are no messages in the system)."""
+        receivers = self.receivers
+        if len(receivers) == 0: return receivers
+        self.receivers = []
+        for receiver in receivers:
+            self.agents_outbox[receiver].swap()
+        self.msgs_per_tick.append(self.msgs_in_tick)
+        self.msgs_in_tick = 0
+        return receivers
 
 class DCOP(ABC):
-    def __init__(self,id_,A,D,dcop_name,algorithm):
+    def __init__(self,id_,A,D,dcop_name,algorithm,instance=None):
         self.dcop_id = id_
         self.A = A
         self.D = D
@@ -176,9 +320,28 @@ class DCOP(ABC):
         self.neighbors = []
         self.rnd_neighbors = random.Random((id_+5)*17)
         self.rnd_cost= random.Random((id_+7)*177)
-        self.create_neighbors()
+        start_time = time.perf_counter()
+        if instance is None:
+            self.create_neighbors()
+        else:
+            self.load_neighbors(instance)
+        self.generation_time = time.perf_counter() - start_time
+        if Globals_.debug_generation_time:
+            print("DCOP:",str(self.dcop_id),"created",len(self.neighbors),"neighbors in",self.generation_time,"seconds")
+        self.neighbors_by_agent = {}
+        self.neighbors_indptr = None
+        self.neighbors_ids = None
+        self.create_neighbors_index()
+        if self.algorithm == Algorithm.max_sum:
+            self.stack_cost_tables()
         self.connect_agents_to_neighbors()
         self.mailer = Mailer(self.agents)
+        self.recorder = None
+        self.runs = 0  # the amount of executions of the DCOP, which names their traces
+        self.anytime = None  # AnytimeTracker of DSA and Max-Sum runs
+        # the cost and tick of the best assignment of anytime runs (see VectorizedDSA.set_anytime), None for the others
+        self.anytime_cost = None
+        self.anytime_clock = None
         self.global_clock = 0
         self.inform_root()
         self.records_dcop = {}
@@ -190,6 +353,10 @@ class DCOP(ABC):
                 self.agents.append(BranchAndBound(i + 1, self.D))
             if self.algorithm == Algorithm.MGM:
                 self.agents.append(MGM(i + 1, self.D, self.dcop_id))
+            if self.algorithm == Algorithm.dsa_c:
+                self.agents.append(DSA_C(i + 1, self.D, self.dcop_id))
+            if self.algorithm == Algorithm.max_sum:
+                self.agents.append(MaxSum(i + 1, self.D, self.dcop_id))
 
 
 
@@ -199,33 +366,192 @@ class DCOP(ABC):
         return sorted_agents[0]
 
 
+    def load_neighbors(self, instance):
+        """Creates the neighbors from the edges and cost tables of a stored instance (see InstanceStore) instead of
+        generating them. The cost tables are read-only views into the instance file."""
+        if instance.A != self.A or instance.D != self.D:
+            raise ValueError("instance was saved with A="+str(instance.A)+", D="+str(instance.D))
+        agents_by_id = {a.id_: a for a in self.agents}
+        for edge_index, (a1_id, a2_id) in enumerate(instance.get_edges()):
+            cost_table = instance.get_cost_table(edge_index)
+            self.neighbors.append(Neighbors(agents_by_id[a1_id], agents_by_id[a2_id], None, self.dcop_id, cost_table))
+
+    def create_neighbors_index(self):
+        """Builds the adjacency index in a single pass over the edges: neighbors_by_agent maps each agent id to an
+        ordered {neighbor id: Neighbors} dict, and neighbors_indptr/neighbors_ids hold the same adjacency in CSR form,
+        with rows ordered as self.agents."""
+        self.neighbors_by_agent = {a.id_: {} for a in self.agents}
+        for n in self.neighbors:
+            self.neighbors_by_agent[n.a1.id_][n.a2.id_] = n
+            self.neighbors_by_agent[n.a2.id_][n.a1.id_] = n
+
+        degrees = [len(self.neighbors_by_agent[a.id_]) for a in self.agents]
+        self.neighbors_indptr = np.zeros(len(self.agents) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=self.neighbors_indptr[1:])
+        self.neighbors_ids = np.fromiter(chain.from_iterable(self.neighbors_by_agent[a.id_].keys() for a in self.agents),
+                                         dtype=np.int64, count=int(self.neighbors_indptr[-1]))
+
+    def stack_cost_tables(self):
+        """Max-Sum agents read the full tables of all their neighbors at every iteration, so the tables of all the edges
+        are stacked into one read-only (edges, D, D) array of Globals_.cost_table_dtype, and the table of every
+        Neighbors object becomes a view of its layer. Agents gather the layers of their neighbors from the stack instead
+        of keeping copies. Lazy cost tables are not stacked."""
+        tables = [n.cost_table for n in self.neighbors]
+        if len(tables) == 0 or any(isinstance(table, LazyCostTable) or table.shape != (self.D, self.D) for table in tables):
+            return
+        stack = np.stack(tables).astype(Globals_.cost_table_dtype, copy=False)
+        stack.flags.writeable = False
+        for i, n in enumerate(self.neighbors):
+            n.cost_table = stack[i]
+            n.tables_stack = stack
+            n.table_index = i
+
+    def create_random_graph(self, p1):
+        """Yields the index pairs (i, j), i < j, of an Erdos-Renyi G(A, p1) graph over self.agents in row-major order.
+        Instead of drawing a number per pair, the gap to the next edge is drawn from a geometric distribution, so the
+        cost is O(A+E). Globals_.legacy_random_graph restores the per-pair draws and their edge sets."""
+        if Globals_.legacy_random_graph:
+            for i in range(self.A):
+                for j in range(i+1,self.A):
+                    if self.rnd_neighbors.random()<p1:
+                        yield i, j
+            return
+        if p1 <= 0:
+            return
+        if p1 >= 1:
+            for i in range(self.A):
+                for j in range(i+1,self.A):
+                    yield i, j
+            return
+
+        log_q = math.log(1.0 - p1)
+        i, j = 0, 0
+        while True:
+            j = j + 1 + int(math.log(1.0 - self.rnd_neighbors.random()) / log_q)
+            while j >= self.A and i < self.A - 1:
+                i = i + 1
+                j = j - self.A + i + 1
+            if i >= self.A - 1:
+                return
+            yield i, j
+
     def connect_agents_to_neighbors(self):
         for a in self.agents:
-            neighbors_of_a = self.get_all_neighbors_obj_of_agent(a)
-            a.set_neighbors(neighbors_of_a)
+            a.set_neighbors(self.neighbors_by_agent[a.id_])
 
     def get_all_neighbors_obj_of_agent(self, agent:Agent):
-        ans = []
-        for n in self.neighbors:
-            if n.is_agent_in_obj(agent.id_):
-                ans.append(n)
-        return ans
+        return list(self.neighbors_by_agent[agent.id_].values())
 
     def execute(self):
         self.draw_global_things()
+        if Globals_.sharded_workers is not None and Globals_.sharded_workers > 1:
+            ShardedEngine(self, Globals_.sharded_workers).execute()
+            return
+        if Globals_.vectorized_mgm and self.algorithm == Algorithm.MGM:
+            VectorizedMGM(self).execute()
+            return
+        if Globals_.vectorized_dsa and self.algorithm == Algorithm.dsa_c:
+            VectorizedDSA(self).execute()
+            return
 
         self.global_clock = 0
-        self.agents_init()
-        while not self.all_agents_complete():
+        self.runs = self.runs + 1
+        if Globals_.trace_path is not None:
+            self.recorder = TraceRecorder(self.get_trace_path())
+            self.mailer.recorder = self.recorder
+        try:
+            self.agents_init()
+            if self.recorder is not None:
+                for a in self.agents:
+                    self.recorder.record_state(a)
+            self.anytime = self.create_anytime_tracker()
+            if self.anytime is not None:
+                self.anytime.update(self.global_clock)
+            self.init_scheduler()
+            self.run_iterations(0)
+        finally:
+            self.close_recorder()
+
+    def get_trace_path(self):
+        """Globals_.trace_path for the current run. "{run}" is replaced by the number of the run of the DCOP (from 1);
+        when the path has no "{run}", the runs after the first add it before the extension, so running the DCOP again
+        (as the explanations do) does not overwrite the trace of the first run."""
+        path = Globals_.trace_path.format(dcop_id=self.dcop_id, run=self.runs)
+        if self.runs > 1 and "{run}" not in Globals_.trace_path:
+            root, extension = os.path.splitext(path)
+            path = root + "_run" + str(self.runs) + extension
+        return path
+
+    def close_recorder(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+            self.mailer.recorder = None
+
+    def create_anytime_tracker(self):
+        """The AnytimeTracker of the run for the algorithms that do not improve monotonically (DSA and Max-Sum),
+        None for the others."""
+        if self.algorithm in (Algorithm.dsa_c, Algorithm.max_sum):
+            return AnytimeTracker(self)
+        return None
+
+    @staticmethod
+    def resume(path):
+        """Continues the run saved in the checkpoint at path (see Checkpoint) and returns its DCOP."""
+        dcop, last_iteration_clock = load_checkpoint(path)
+        dcop.init_scheduler()
+        dcop.run_iterations(last_iteration_clock)
+        return dcop
+
+    def run_iterations(self, last_iteration_clock):
+        """The iterations loop of execute, from the current global clock. A checkpoint is taken every
+        Globals_.checkpoint_every iterations when it is set. The best assignment of anytime runs is tracked after every
+        iteration (see VectorizedDSA.AnytimeTracker)."""
+        while len(self.incomplete_agents) != 0:
             self.global_clock = self.global_clock + 1
-            is_empty = self.mailer.place_messages_in_agents_inbox()
-            if is_empty:
+            receivers = self.mailer.place_messages_in_agents_inbox()
+            if len(receivers) == 0:
                 print("DCOP:",str(self.dcop_id),"global clock:",str(self.global_clock), "is over because there are no messages in system ")
                 break
-            self.agents_perform_iteration(self.global_clock)
+            if self.recorder is not None:
+                self.recorder.set_tick(self.global_clock)
+            self.agents_perform_iteration(self.global_clock, receivers)
+            if self.anytime is not None:
+                self.anytime.update(self.global_clock)
+            last_iteration_clock = self.global_clock
+            if Globals_.checkpoint_every is not None and self.global_clock % Globals_.checkpoint_every == 0:
+                save_checkpoint(self, Globals_.checkpoint_path.format(dcop_id=self.dcop_id), last_iteration_clock)
             #self.draw_global_things()
+        # agents without messages skip their iterations, which would only have advanced their clock
+        for a in self.agents:
+            a.global_clock = last_iteration_clock
+        if self.anytime is not None:
+            self.anytime.write_back()
         #self.collect_records()
 
+    def execute_async(self, delay_model, operation_time=0.0):
+        """Runs the algorithm as an asynchronous simulation with the given delay model (see AsyncExecution) and
+        returns its concurrency metrics."""
+        self.draw_global_things()
+        return AsyncRunner(self, delay_model, operation_time).execute()
+
+    def execute_threaded(self, workers=None):
+        """Runs the agents on a pool of worker threads (all the cores when workers is None) that block on
+        UnboundedBuffer inboxes (see ThreadedExecution) and returns the timing metrics of the run."""
+        self.draw_global_things()
+        return ThreadedRunner(self, UnboundedBuffer, workers).execute()
+
+    def init_scheduler(self):
+        """
+        Only agents that received messages can act or change their completeness in an iteration, so the loop keeps
+        the set of incomplete agents up to date from the agents that were active instead of polling every agent.
+        """
+        self.agents_position = {a.id_: i for i, a in enumerate(self.agents)}
+        self.incomplete_agents = set()
+        for a in self.agents:
+            if not a.is_algorithm_complete():
+                self.incomplete_agents.add(a.id_)
+
     def __str__(self):
         return self.dcop_name+",id_"+str(self.dcop_id)+",A_"+str(self.A)+",D_"+str(self.D)
 
@@ -256,9 +582,17 @@ class DCOP(ABC):
                 else:
                     a.dfs_tree_token = None
 
-    def agents_perform_iteration(self,global_clock):
-        for a in self.agents:
+    def agents_perform_iteration(self,global_clock,receivers):
+        """Executes the iteration of the agents that received messages, in the order of self.agents."""
+        for position in sorted(self.agents_position[receiver] for receiver in receivers):
+            a = self.agents[position]
             a.execute_iteration(global_clock)
+            if self.recorder is not None:
+                self.recorder.record_state(a)
+            if a.is_algorithm_complete():
+                self.incomplete_agents.discard(a.id_)
+            else:
+                self.incomplete_agents.add(a.id_)
 
     def draw_global_things(self):
         if Globals_.draw_dfs_tree_flag:
@@ -281,29 +615,55 @@ class DCOP(ABC):
 
 
 class DCOP_RandomUniform(DCOP):
-    def __init__(self, id_,A,D,dcop_name,algorithm):
-        DCOP.__init__(self,id_,A,D,dcop_name,algorithm)
+    def __init__(self, id_,A,D,dcop_name,algorithm,instance=None):
+        DCOP.__init__(self,id_,A,D,dcop_name,algorithm,instance)
 
     def create_neighbors(self):
-        for i in range(self.A):
-            a1 = self.agents[i]
-            for j in range(i+1,self.A):
-                a2 = self.agents[j]
-                rnd_number = self.rnd_neighbors.random()
-                if rnd_number<dense_p1:
-                    self.neighbors.append(Neighbors(a1, a2, dense_random_uniform_cost_function, self.dcop_id))
+        for i, j in self.create_random_graph(dense_p1):
+            self.neighbors.append(Neighbors(self.agents[i], self.agents[j], dense_random_uniform_cost_function, self.dcop_id))
 
 
 class DCOP_GraphColoring(DCOP):
 
-    def __init__(self, id_,A,D,dcop_name,algorithm):
-        DCOP.__init__(self,id_,A,D,dcop_name,algorithm)
+    def __init__(self, id_,A,D,dcop_name,algorithm,instance=None):
+        DCOP.__init__(self,id_,A,D,dcop_name,algorithm,instance)
 
     def create_neighbors(self):
-        for i in range(self.A):
-            a1 = self.agents[i]
-            for j in range(i+1,self.A):
-                a2 = self.agents[j]
-                rnd_number = self.rnd_neighbors.random()
-                if rnd_number<graph_coloring_p1:
-                    self.neighbors.append(Neighbors(a1, a2, graph_coloring_cost_function, self.dcop_id))
\ No newline at end of file
+        for i, j in self.create_random_graph(graph_coloring_p1):
+            self.neighbors.append(Neighbors(self.agents[i], self.agents[j], graph_coloring_cost_function, self.dcop_id))
+
+
+class DCOP_ScaleFree(DCOP):
+
+    def __init__(self, id_,A,D,dcop_name,algorithm,instance=None):
+        DCOP.__init__(self,id_,A,D,dcop_name,algorithm,instance)
+
+    def create_neighbors(self):
+        for i, j in self.create_scale_free_graph(scale_free_hubs, scale_others_number_of_neighbors):
+            self.neighbors.append(Neighbors(self.agents[i], self.agents[j], scale_free_network_cost_function, self.dcop_id))
+
+    def create_scale_free_graph(self, hubs, others_number_of_neighbors):
+        """Yields the index pairs of a Barabasi-Albert graph over self.agents. The first `hubs` agents form a clique,
+        and every other agent connects to `others_number_of_neighbors` distinct earlier agents chosen with probability
+        proportional to their degree. Sampling from a list that holds each agent once per incident edge keeps the
+        cost O(A+E)."""
+        hubs = min(hubs, self.A)
+        repeated_nodes = []
+        for i in range(hubs):
+            for j in range(i+1, hubs):
+                repeated_nodes.append(i)
+                repeated_nodes.append(j)
+                yield i, j
+
+        for new_node in range(hubs, self.A):
+            amount_of_targets = min(others_number_of_neighbors, new_node)
+            targets = set()
+            while len(targets) < amount_of_targets:
+                if len(repeated_nodes) == 0:
+                    targets.add(self.rnd_neighbors.randrange(new_node))
+                else:
+                    targets.add(self.rnd_neighbors.choice(repeated_nodes))
+            for target in sorted(targets):
+                repeated_nodes.append(target)
+                repeated_nodes.append(new_node)
+                yield target, new_node
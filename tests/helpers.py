@@ -0,0 +1,18 @@
+"""Helpers shared by the tests: the DCOPs of the experiments, created with the defaults of ExperimentRunner."""
+from ExperimentRunner import dcop_types
+
+
+def create_dcop(dcop_type, algorithm, dcop_id=0):
+    dcop_class, A, D, dcop_name = dcop_types[dcop_type]
+    return dcop_class(dcop_id, A, D, dcop_name, algorithm)
+
+
+def get_results(dcop):
+    return {"variables": [a.variable for a in dcop.agents], "global_clock": dcop.global_clock,
+            "msgs_per_tick": list(dcop.mailer.msgs_per_tick)}
+
+
+def run_plain(dcop_type, algorithm):
+    dcop = create_dcop(dcop_type, algorithm)
+    dcop.execute()
+    return get_results(dcop)
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import Globals_
+import problems
+from Checkpoint import save_checkpoint
+from enums import Algorithm, DcopType
+from helpers import create_dcop, get_results
+from problems import DCOP
+
+
+class Interrupted(Exception):
+    pass
+
+
+def get_run_results(dcop):
+    results = get_results(dcop)
+    results.update({"anytime_variables": [a.anytime_variable for a in dcop.agents],
+                    "anytime_cost": dcop.anytime_cost, "anytime_clock": dcop.anytime_clock})
+    return results
+
+
+def test_resume_matches_the_uninterrupted_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    monkeypatch.setattr(Globals_, "checkpoint_path", str(tmp_path / "checkpoint_{dcop_id}.ckpt"))
+
+    def save_and_interrupt(dcop, path, last_iteration_clock):
+        save_checkpoint(dcop, path, last_iteration_clock)
+        raise Interrupted()
+
+    for algorithm in (Algorithm.MGM, Algorithm.dsa_c, Algorithm.max_sum):
+        random.seed(1)
+        dcop = create_dcop(DcopType.scale_free_network, algorithm)
+        dcop.execute()
+        expected = get_run_results(dcop)
+        assert dcop.global_clock > 7
+
+        random.seed(1)
+        monkeypatch.setattr(Globals_, "checkpoint_every", 7)
+        monkeypatch.setattr(problems, "save_checkpoint", save_and_interrupt)
+        with pytest.raises(Interrupted):
+            create_dcop(DcopType.scale_free_network, algorithm).execute()
+        monkeypatch.setattr(Globals_, "checkpoint_every", None)
+        monkeypatch.setattr(problems, "save_checkpoint", save_checkpoint)
+
+        dcop = DCOP.resume(str(tmp_path / "checkpoint_0.ckpt"))
+        assert get_run_results(dcop) == expected
@@ -0,0 +1,110 @@
+import pytest
+
+import Globals_
+from enums import Algorithm, DcopType
+from AsyncExecution import UniformDelay
+from helpers import create_dcop, get_results, run_plain
+
+
+def run_sharded(dcop_type, algorithm, transport, monkeypatch):
+    monkeypatch.setattr(Globals_, "sharded_workers", 3)
+    monkeypatch.setattr(Globals_, "sharded_transport", transport)
+    dcop = create_dcop(dcop_type, algorithm)
+    dcop.execute()
+    monkeypatch.setattr(Globals_, "sharded_workers", None)
+    return get_results(dcop)
+
+
+def test_sharded_msgs_per_tick(monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    for algorithm in (Algorithm.MGM, Algorithm.dsa_c):
+        expected = run_plain(DcopType.scale_free_network, algorithm)
+        assert sum(expected["msgs_per_tick"]) > 0
+        assert run_sharded(DcopType.scale_free_network, algorithm, "shared_memory", monkeypatch) == expected
+
+
+def test_async_run_then_execute(monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    for algorithm in (Algorithm.MGM, Algorithm.dsa_c):
+        expected = create_dcop(DcopType.scale_free_network, algorithm)
+        expected.execute()
+        first_run = get_results(expected)
+        expected.execute()
+
+        dcop = create_dcop(DcopType.scale_free_network, algorithm)
+        dcop.execute_async(UniformDelay(0.5, 2.0))
+        assert get_results(dcop) == first_run
+        assert all(a.outbox is dcop.mailer for a in dcop.agents)
+        dcop.execute()
+        assert get_results(dcop) == get_results(expected)
+
+
+def test_threaded_run_then_execute(monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    for algorithm in (Algorithm.MGM, Algorithm.dsa_c):
+        expected = create_dcop(DcopType.scale_free_network, algorithm)
+        expected.execute()
+        first_variables = [a.variable for a in expected.agents]
+        expected.execute()
+
+        dcop = create_dcop(DcopType.scale_free_network, algorithm)
+        dcop.execute_threaded()
+        assert [a.variable for a in dcop.agents] == first_variables
+        assert all(a.outbox is dcop.mailer for a in dcop.agents)
+        dcop.execute()
+        assert [a.variable for a in dcop.agents] == [a.variable for a in expected.agents]
+
+
+def test_threaded_matches_plain(monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    for dcop_type in (DcopType.scale_free_network, DcopType.meeting_scheduling):
+        for algorithm in (Algorithm.MGM, Algorithm.dsa_c, Algorithm.max_sum):
+            expected = run_plain(dcop_type, algorithm)
+            for workers in (1, 3, 8):
+                dcop = create_dcop(dcop_type, algorithm)
+                metrics = dcop.execute_threaded(workers)
+                assert get_results(dcop) == expected
+                assert metrics["msgs"] >= sum(expected["msgs_per_tick"])
+                assert sum(timing["iterations"] for timing in metrics["agents_timing"].values()) > 0
+
+
+def test_threaded_run_raises_agent_errors():
+    dcop = create_dcop(DcopType.scale_free_network, Algorithm.MGM)
+
+    def fail(global_clock):
+        raise ValueError("agent failed")
+
+    dcop.agents[7].execute_iteration = fail
+    with pytest.raises(ValueError):
+        dcop.execute_threaded(3)
+
+
+def get_anytime_results(dcop):
+    return {"anytime_variables": [a.anytime_variable for a in dcop.agents], "anytime_cost": dcop.anytime_cost,
+            "anytime_clock": dcop.anytime_clock}
+
+
+def test_anytime_matches_across_modes(monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    for algorithm in (Algorithm.dsa_c, Algorithm.max_sum):
+        dcop = create_dcop(DcopType.scale_free_network, algorithm)
+        dcop.execute()
+        expected = get_anytime_results(dcop)
+        assert expected["anytime_cost"] is not None
+
+        for transport in ("shared_memory", "tcp", "unix"):
+            monkeypatch.setattr(Globals_, "sharded_workers", 3)
+            monkeypatch.setattr(Globals_, "sharded_transport", transport)
+            dcop = create_dcop(DcopType.scale_free_network, algorithm)
+            dcop.execute()
+            monkeypatch.setattr(Globals_, "sharded_workers", None)
+            assert get_anytime_results(dcop) == expected
+
+        for workers in (1, 3):
+            dcop = create_dcop(DcopType.scale_free_network, algorithm)
+            dcop.execute_threaded(workers)
+            assert get_anytime_results(dcop) == expected
+
+        dcop = create_dcop(DcopType.scale_free_network, algorithm)
+        dcop.execute_async(UniformDelay(0.5, 2.0))
+        assert get_anytime_results(dcop) == expected
@@ -0,0 +1,54 @@
+import json
+
+import Globals_
+from enums import Algorithm, DcopType
+from ExperimentRunner import ExperimentRunner, get_job_key, get_sweep_jobs
+
+# the fields of a record that depend on the machine and on the worker
+timing_fields = ("create_time", "run_time", "worker")
+
+
+def get_outcomes(records):
+    return [{k: v for k, v in record.items() if k not in timing_fields} for record in records]
+
+
+def get_jobs():
+    return get_sweep_jobs((DcopType.sparse_random_uniform, DcopType.graph_coloring), (Algorithm.MGM, Algorithm.dsa_c), 2)
+
+
+def test_results_do_not_depend_on_the_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    jobs = get_jobs()
+    expected = get_outcomes(ExperimentRunner(str(tmp_path / "serial.jsonl"), workers=1, seed=3).run(jobs))
+    assert all("error" not in record for record in expected)
+    assert any(record["anytime_cost"] is not None for record in expected)
+    assert get_outcomes(ExperimentRunner(str(tmp_path / "pool.jsonl"), workers=2, seed=3).run(jobs)) == expected
+    # the seed of a job depends on the sweep seed and on the job alone, not on the jobs that ran before it
+    records = ExperimentRunner(str(tmp_path / "reversed.jsonl"), workers=1, seed=3).run(jobs[::-1])
+    assert get_outcomes(records[::-1]) == expected
+    other_seed = ExperimentRunner(str(tmp_path / "other_seed.jsonl"), workers=1, seed=4).run(jobs)
+    assert [record["seed"] for record in other_seed] != [record["seed"] for record in expected]
+
+
+def test_run_resumes_from_the_results_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    jobs = get_jobs()
+    path = str(tmp_path / "results.jsonl")
+    expected = get_outcomes(ExperimentRunner(str(tmp_path / "full.jsonl"), workers=1).run(jobs))
+
+    runner = ExperimentRunner(path, workers=1)
+    runner.run(jobs[:3])
+    # a job that failed runs again, and a line cut by an interruption is dropped
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": get_job_key(jobs[3]), "error": "interrupted"}) + "\n")
+        f.write('{"key": "' + get_job_key(jobs[4]))
+    records = runner.run(jobs)
+    assert runner.metrics["skipped"] == 3 and runner.metrics["errors"] == 0
+    assert get_outcomes(records) == expected
+
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == len(jobs) + 1
+    assert [line["key"] for line in lines if "error" not in line] == [get_job_key(job) for job in jobs]
+    runner.run(jobs)
+    assert runner.metrics["skipped"] == len(jobs)
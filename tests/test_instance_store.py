@@ -0,0 +1,47 @@
+import os
+
+import Globals_
+import InstanceStore
+from enums import Algorithm, DcopType
+from ExperimentRunner import dcop_types
+from InstanceStore import InstanceCache
+
+
+def get_key(cache):
+    dcop_class, A, D, dcop_name = dcop_types[DcopType.scale_free_network]
+    return cache.get_key(dcop_class, 0, A, D, dcop_name)
+
+
+def test_cache_key_follows_the_generators(tmp_path, monkeypatch):
+    cache = InstanceCache(str(tmp_path))
+    key = get_key(cache)
+    assert get_key(InstanceCache(str(tmp_path))) == key
+    monkeypatch.setattr(Globals_, "scale_max_cost", Globals_.scale_max_cost + 1)
+    assert get_key(cache) != key
+    monkeypatch.undo()
+    monkeypatch.setattr(InstanceStore, "generator_version", InstanceStore.generator_version + 1)
+    assert get_key(cache) != key
+
+
+def test_cached_instance_matches_generated(tmp_path):
+    dcop_class, A, D, dcop_name = dcop_types[DcopType.scale_free_network]
+    expected = dcop_class(0, A, D, dcop_name, Algorithm.MGM)
+    for _ in range(2):
+        dcop = InstanceCache(str(tmp_path)).get_dcop(dcop_class, 0, A, D, dcop_name, Algorithm.MGM)
+        assert [(n.a1.id_, n.a2.id_) for n in dcop.neighbors] == [(n.a1.id_, n.a2.id_) for n in expected.neighbors]
+        assert all((n.cost_table == m.cost_table).all() for n, m in zip(dcop.neighbors, expected.neighbors))
+
+
+def test_cache_tolerates_files_removed_by_other_workers(tmp_path, monkeypatch):
+    dcop_class, A, D, dcop_name = dcop_types[DcopType.scale_free_network]
+    cache = InstanceCache(str(tmp_path), max_bytes=0)
+    other = InstanceCache(str(tmp_path))
+    other.get_dcop(dcop_class, 0, A, D, dcop_name, Algorithm.MGM)
+    path = other.get_path(other.get_key(dcop_class, 0, A, D, dcop_name))
+    # another worker evicted the file after this one listed the directory
+    listdir = os.listdir
+    monkeypatch.setattr(os, "listdir", lambda directory: listdir(directory) + ["evicted.dcop"])
+    os.remove(path)
+    dcop = cache.get_dcop(dcop_class, 0, A, D, dcop_name, Algorithm.MGM)
+    assert cache.get_statistics() == {"hits": 0, "misses": 1, "evictions": 1}
+    assert len(dcop.neighbors) != 0 and not os.path.exists(path)
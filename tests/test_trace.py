@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+import Globals_
+from enums import Algorithm, DcopType
+from Trace import TraceReplayer
+from helpers import create_dcop
+
+
+def test_trace_replay_then_execute_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    monkeypatch.setattr(Globals_, "trace_path", str(tmp_path / "trace_{dcop_id}.bin"))
+    dcop = create_dcop(DcopType.scale_free_network, Algorithm.MGM)
+    dcop.execute()
+    assert dcop.recorder is None
+    path = str(tmp_path / "trace_0.bin")
+    replayer = TraceReplayer(path)
+    states = replayer.get_states(replayer.get_last_tick())
+    assert {a.id_: states[a.id_]["variable"] for a in dcop.agents} == {a.id_: a.variable for a in dcop.agents}
+    assert replayer.get_msgs_per_tick()[1:].tolist() == dcop.mailer.msgs_per_tick[:replayer.get_last_tick()]
+
+    # the explanations change assignments and run the DCOP again, with or without a trace
+    trace = open(path, "rb").read()
+    monkeypatch.setattr(Globals_, "trace_path", None)
+    for a in dcop.agents[:5]:
+        a.variable = (a.variable + 1) % len(a.domain)
+    dcop.execute()
+    monkeypatch.setattr(Globals_, "trace_path", str(tmp_path / "trace_{dcop_id}.bin"))
+    dcop.execute()
+    assert open(path, "rb").read() == trace
+    assert len(TraceReplayer(str(tmp_path / "trace_0_run3.bin")).get_states(0)) == len(dcop.agents)
+    assert sorted(os.listdir(tmp_path)) == ["trace_0.bin", "trace_0_run3.bin"]
+
+
+def test_trace_is_closed_when_the_run_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(Globals_, "trace_path", str(tmp_path / "trace_{dcop_id}.bin"))
+    dcop = create_dcop(DcopType.scale_free_network, Algorithm.MGM)
+
+    def fail(global_clock):
+        raise ValueError("agent failed")
+
+    dcop.agents[7].execute_iteration = fail
+    with pytest.raises(ValueError):
+        dcop.execute()
+    assert dcop.recorder is None and dcop.mailer.recorder is None
+    assert len(TraceReplayer(str(tmp_path / "trace_0.bin")).get_states(0)) == len(dcop.agents)
@@ -0,0 +1,116 @@
+import multiprocessing
+import random
+
+import pytest
+
+import Globals_
+from enums import Algorithm, DcopType
+from helpers import create_dcop, get_results, run_plain
+from ShardedExecution import ShardedEngine
+from Transport import SharedMemoryTransport, SharedRingBuffer, SocketTransport, frame_header
+
+# empty payloads, payloads smaller than a frame header, and batches larger than the socket buffers
+payload_sizes = (0, 1, frame_header.size - 1, 1000, 3 * 2 ** 20)
+ring_payload_sizes = (0, 1, frame_header.size - 1, 1000, 20000)
+
+
+def get_payload(src, dst, exchange, sizes):
+    size = sizes[(exchange + src + 2 * dst) % len(sizes)]
+    return random.Random(src * 1000003 + dst * 1009 + exchange).randbytes(size)
+
+
+def run_exchanges(transport, worker, workers, exchanges, sizes, connection):
+    try:
+        transport.connect(worker)
+        for exchange in range(exchanges):
+            payloads = {dst: get_payload(worker, dst, exchange, sizes) for dst in range(workers) if dst != worker}
+            received = transport.exchange(exchange, payloads)
+            expected = {src: get_payload(src, worker, exchange, sizes) for src in range(workers) if src != worker}
+            if received != expected:
+                raise Exception("exchange " + str(exchange) + " received other payloads")
+        connection.send(("done", transport.bytes_sent))
+    except BaseException as error:
+        transport.abort()
+        connection.send(("error", repr(error)))
+    connection.close()
+
+
+def exchange_on_workers(transport, workers, exchanges, sizes):
+    """Runs exchanges of known payloads between forked workers; returns the bytes every worker sent."""
+    ctx = multiprocessing.get_context("fork")
+    transport.setup(ctx, workers)
+    processes = []
+    connections = []
+    try:
+        for w in range(workers):
+            receiver, sender = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=run_exchanges, args=(transport, w, workers, exchanges, sizes, sender))
+            process.start()
+            sender.close()
+            processes.append(process)
+            connections.append(receiver)
+        results = [connection.recv() for connection in connections]
+    finally:
+        for process in processes:
+            process.join()
+        transport.close()
+    assert [result[0] for result in results] == ["done"] * workers, results
+    return [result[1] for result in results]
+
+
+def get_bytes_sent(worker, workers, exchanges, sizes):
+    return sum(frame_header.size + len(get_payload(worker, dst, exchange, sizes))
+               for exchange in range(exchanges) for dst in range(workers) if dst != worker)
+
+
+@pytest.mark.parametrize("family", ["tcp", "unix"])
+def test_socket_transport_exchanges(family):
+    workers, exchanges = 3, 12
+    bytes_sent = exchange_on_workers(SocketTransport(family), workers, exchanges, payload_sizes)
+    assert bytes_sent == [get_bytes_sent(w, workers, exchanges, payload_sizes) for w in range(workers)]
+
+
+def test_shared_memory_transport_exchanges():
+    # the frames of the exchanges wrap around the end of the small rings
+    workers, exchanges = 3, 40
+    bytes_sent = exchange_on_workers(SharedMemoryTransport(2 ** 16), workers, exchanges, ring_payload_sizes)
+    assert bytes_sent == [get_bytes_sent(w, workers, exchanges, ring_payload_sizes) for w in range(workers)]
+
+
+def test_ring_buffer_wraps_and_fills():
+    ring = SharedRingBuffer(64)
+    try:
+        for size in (0, 30, 50, 7, 56, 1, 40):
+            payload = bytes(range(size))
+            ring.write(payload)
+            assert ring.read() == payload
+        assert ring.read() is None
+        ring.write(bytes(20))
+        with pytest.raises(Exception):
+            ring.write(bytes(40))
+        assert ring.read() == bytes(20)
+    finally:
+        ring.close()
+
+
+@pytest.mark.parametrize("transport", ["shared_memory", "tcp", "unix"])
+def test_sharded_matches_plain(transport, monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    for algorithm in (Algorithm.MGM, Algorithm.max_sum):
+        expected = run_plain(DcopType.scale_free_network, algorithm)
+        for workers in (2, 4):
+            monkeypatch.setattr(Globals_, "sharded_transport", transport)
+            dcop = create_dcop(DcopType.scale_free_network, algorithm)
+            ShardedEngine(dcop, workers).execute()
+            assert get_results(dcop) == expected
+            assert dcop.sharded_metrics["bytes_sent"] > 0
+
+
+def test_sharded_matches_plain_on_small_rings(monkeypatch):
+    # the frames wrap around the rings of the shared memory transport many times during the run
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    monkeypatch.setattr(Globals_, "sharded_ring_buffer_bytes", 2 ** 10)
+    expected = run_plain(DcopType.scale_free_network, Algorithm.MGM)
+    dcop = create_dcop(DcopType.scale_free_network, Algorithm.MGM)
+    ShardedEngine(dcop, 3, SharedMemoryTransport(Globals_.sharded_ring_buffer_bytes)).execute()
+    assert get_results(dcop) == expected
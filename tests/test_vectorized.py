@@ -0,0 +1,130 @@
+import numpy as np
+
+import Globals_
+from enums import Algorithm, DcopType
+from Explanation import calc_global_cost
+from helpers import create_dcop
+from MGM_Explanation import Meeting_Scheduling_Explanation
+from VectorizedMGM import BatchedMGM, VectorizedMGM
+
+
+def explain_meeting_scheduling(dcop_id):
+    dcop = create_dcop(DcopType.meeting_scheduling, Algorithm.MGM, dcop_id)
+    dcop.execute()
+    context = [a.variable for a in dcop.agents]
+    explanation = Meeting_Scheduling_Explanation(dcop, [1, 2, 3, 4, 5, 6, 7, 9, 10], [8], {}, [])
+    explanation.update_agents_before_generate_no_good()
+    explanation.generate_no_good()
+    return context, explanation.no_good, explanation.no_good_global_cost
+
+
+def test_explanation_with_vectorized_mgm(monkeypatch):
+    for dcop_id in range(3):
+        expected = explain_meeting_scheduling(dcop_id)
+        monkeypatch.setattr(Globals_, "vectorized_mgm", True)
+        assert explain_meeting_scheduling(dcop_id) == expected
+        monkeypatch.setattr(Globals_, "vectorized_mgm", False)
+
+
+def get_mgm_state(dcop):
+    agents = [(a.variable, a.global_clock, a.local_clock, a.lr, a.lr_potential_asgmt, a.status,
+               a.neighbors_assignments, a.neighbors_lost_reduction, a.values_costs.tolist(),
+               a.atomic_operations) for a in dcop.agents]
+    return agents, dcop.global_clock, dcop.mailer.msgs_per_tick, dcop.mailer.msgs_in_tick
+
+
+def test_batched_mgm_matches_one_at_a_time():
+    # the instances stop at different rounds, and some have agents without neighbors
+    batches = [[(dcop_type, dcop_id) for dcop_type in (DcopType.sparse_random_uniform, DcopType.dense_random_uniform,
+                                                       DcopType.graph_coloring, DcopType.scale_free_network)
+                for dcop_id in range(5)],
+               [(DcopType.meeting_scheduling, dcop_id) for dcop_id in range(5)]]
+    isolated_agents = 0
+    for batch in batches:
+        expected = []
+        for dcop_type, dcop_id in batch:
+            dcop = create_dcop(dcop_type, Algorithm.MGM, dcop_id)
+            dcop.execute()
+            expected.append(get_mgm_state(dcop))
+        assert len({state[1] for state in expected}) > 1
+
+        dcops = [create_dcop(dcop_type, Algorithm.MGM, dcop_id) for dcop_type, dcop_id in batch]
+        isolated_agents = isolated_agents + sum(len(a.neighbors_agents_id) == 0 for dcop in dcops for a in dcop.agents)
+        BatchedMGM(dcops).execute()
+        assert [get_mgm_state(dcop) for dcop in dcops] == expected
+    assert isolated_agents > 0
+
+
+def run_dsa_with_narrowed_domains(dcop_id):
+    dcop = create_dcop(DcopType.dense_random_uniform, Algorithm.dsa_c, dcop_id)
+    for a in dcop.agents:
+        a.domain = [v for v in a.domain if v % 3 != a.id_ % 3 or v == a.variable]
+    dcop.execute()
+    return [a.variable for a in dcop.agents], [a.anytime_variable for a in dcop.agents]
+
+
+def test_vectorized_dsa_with_narrowed_domains(monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 50)
+    for dcop_id in range(3):
+        expected = run_dsa_with_narrowed_domains(dcop_id)
+        monkeypatch.setattr(Globals_, "vectorized_dsa", True)
+        assert run_dsa_with_narrowed_domains(dcop_id) == expected
+        monkeypatch.setattr(Globals_, "vectorized_dsa", False)
+
+
+def run_dsa(dcop_type, dcop_id):
+    dcop = create_dcop(dcop_type, Algorithm.dsa_c, dcop_id)
+    dcop.execute()
+    return ([a.variable for a in dcop.agents], [a.anytime_variable for a in dcop.agents], dcop.anytime_cost,
+            dcop.anytime_clock, dcop.global_clock, dcop.mailer.msgs_per_tick)
+
+
+def test_vectorized_dsa_variants(monkeypatch):
+    # the variants differ on the ties of graph coloring and meeting scheduling
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 50)
+    monkeypatch.setattr(Globals_, "dsa_activation_probability", 0.4)
+    results = {}
+    for variant in ("A", "B", "C"):
+        monkeypatch.setattr(Globals_, "dsa_variant", variant)
+        results[variant] = []
+        for dcop_type in (DcopType.graph_coloring, DcopType.meeting_scheduling, DcopType.scale_free_network):
+            for dcop_id in range(3):
+                expected = run_dsa(dcop_type, dcop_id)
+                assert expected[2] is not None
+                monkeypatch.setattr(Globals_, "vectorized_dsa", True)
+                assert run_dsa(dcop_type, dcop_id) == expected
+                monkeypatch.setattr(Globals_, "vectorized_dsa", False)
+                results[variant].append(expected)
+    assert results["A"] != results["B"] != results["C"] != results["A"]
+
+
+def test_vectorized_mgm_keeps_the_cost_table_dtype(monkeypatch):
+    monkeypatch.setattr(Globals_, "cost_table_dtype", np.int64)
+    dcop = create_dcop(DcopType.dense_random_uniform, Algorithm.MGM)
+    for n in dcop.neighbors:
+        n.cost_table = n.cost_table.astype(np.int64) << 32
+    arrays = VectorizedMGM(dcop)
+    assert arrays.tables.dtype == np.int64
+    x = np.array([a.variable for a in dcop.agents], dtype=np.int64)
+    assert int(arrays.get_global_costs(x)[0]) == calc_global_cost(dcop)
+
+
+def run_max_sum(dcop_type, lazy_cost_tables, monkeypatch):
+    monkeypatch.setattr(Globals_, "lazy_cost_tables", lazy_cost_tables)
+    dcop = create_dcop(dcop_type, Algorithm.max_sum)
+    dcop.execute()
+    return dcop, [a.variable for a in dcop.agents], dcop.anytime_cost
+
+
+def test_max_sum_shares_the_cost_tables(monkeypatch):
+    monkeypatch.setattr(Globals_, "incomplete_iterations", 20)
+    for dcop_type in (DcopType.scale_free_network, DcopType.meeting_scheduling):
+        dcop, variables, anytime_cost = run_max_sum(dcop_type, False, monkeypatch)
+        stack = dcop.neighbors[0].tables_stack
+        assert stack is not None and stack.dtype == Globals_.cost_table_dtype
+        for a in dcop.agents:
+            if len(a.neighbors_agents_id) != 0:
+                assert a.tables is stack
+            for n_obj in a.neighbors_obj_dict.values():
+                assert n_obj.cost_table.base is stack
+        assert run_max_sum(dcop_type, True, monkeypatch)[1:] == (variables, anytime_cost)